@@ -0,0 +1,264 @@
+import logging
+import smtplib
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.template import Context, Template
+from django.utils import timezone
+
+from customers.models import Customer
+
+from .gateways import SmsDeliveryError, get_sms_gateway
+from .models import Campaign, CampaignMessage
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignService:
+    """
+    Маркетинговые рассылки.
+    launch() материализует получателей в CampaignMessage и ставит пачки
+    в очередь Celery; send_batch() отправляет пачку через одно SMTP-соединение
+    или общий SMS-клиент воркера и пишет статусы одним bulk_update.
+    """
+
+    INSERT_BATCH = 5000
+
+    # --- получатели ---
+
+    @staticmethod
+    def recipients(campaign: Campaign):
+        """Клиенты по сохраненному фильтру с учетом согласия и канала"""
+        filters = campaign.filters or {}
+        queryset = Customer.objects.filter(marketing_consent=True)
+
+        if campaign.channel == Campaign.Channel.EMAIL:
+            queryset = queryset.exclude(email="")
+        # Явно выбранный другой канал — не пишем в этот
+        queryset = queryset.exclude(
+            preferred_channel__in=[
+                channel
+                for channel in Customer.PreferredChannel.values
+                if channel != campaign.channel
+            ]
+        )
+
+        if filters.get("segment"):
+            queryset = queryset.filter(segment__segment=filters["segment"])
+        if filters.get("shop_id"):
+            queryset = queryset.filter(
+                shop_history__shop_id=filters["shop_id"]
+            ).distinct()
+        if filters.get("birthday_month"):
+            queryset = queryset.filter(birth_date__month=filters["birthday_month"])
+        return queryset
+
+    @classmethod
+    def launch(cls, campaign: Campaign) -> int:
+        from .tasks import send_campaign_batch
+
+        address_field = (
+            "email" if campaign.channel == Campaign.Channel.EMAIL else "phone"
+        )
+        rows = (
+            cls.recipients(campaign)
+            .order_by("id")
+            .values_list("id", address_field)
+            .iterator(chunk_size=cls.INSERT_BATCH)
+        )
+        with transaction.atomic():
+            # Условный UPDATE: из двух одновременных запусков проходит один
+            started_at = timezone.now()
+            claimed = Campaign.objects.filter(
+                id=campaign.id, status=Campaign.Status.DRAFT
+            ).update(status=Campaign.Status.SENDING, started_at=started_at)
+            if claimed != 1:
+                raise ValueError("Рассылка уже запущена")
+
+            total = 0
+            while True:
+                chunk = list(islice(rows, cls.INSERT_BATCH))
+                if not chunk:
+                    break
+                CampaignMessage.objects.bulk_create(
+                    [
+                        CampaignMessage(
+                            campaign=campaign, customer_id=pk, address=str(address)
+                        )
+                        for pk, address in chunk
+                    ],
+                    ignore_conflicts=True,
+                )
+                total += len(chunk)
+
+            Campaign.objects.filter(id=campaign.id).update(total_count=total)
+            campaign.status = Campaign.Status.SENDING
+            campaign.total_count = total
+            campaign.started_at = started_at
+
+        # Пачки по диапазонам id: задача не держит списки id в брокере
+        bounds = CampaignMessage.objects.filter(campaign=campaign).aggregate(
+            first=Min("id"), last=Max("id")
+        )
+        if bounds["first"] is None:
+            cls.finish(campaign.id)
+            return 0
+
+        size = settings.CAMPAIGNS_BATCH_SIZE
+        for start in range(bounds["first"], bounds["last"] + 1, size):
+            send_campaign_batch.delay(campaign.id, start, start + size - 1)
+        return total
+
+    # --- отправка ---
+
+    @classmethod
+    def send_batch(cls, campaign_id: int, first_id: int, last_id: int) -> dict:
+        """Отправить сообщения пачки; возвращает счетчики и признак retry"""
+        campaign = Campaign.objects.get(id=campaign_id)
+        if campaign.status != Campaign.Status.SENDING:
+            return {"sent": 0, "failed": 0, "retry": False}
+
+        messages = list(
+            CampaignMessage.objects.filter(
+                campaign_id=campaign_id,
+                id__range=(first_id, last_id),
+                status=CampaignMessage.Status.PENDING,
+            )
+            .select_related("customer")
+            .only(
+                "id",
+                "address",
+                "attempts",
+                "customer__first_name",
+                "customer__last_name",
+            )
+        )
+        if not messages:
+            return {"sent": 0, "failed": 0, "retry": False}
+
+        renderer = CampaignRenderer(campaign)
+        if campaign.channel == Campaign.Channel.EMAIL:
+            cls._send_emails(campaign, messages, renderer)
+        else:
+            cls._send_sms(messages, renderer)
+
+        now = timezone.now()
+        sent = failed = retry = 0
+        for message in messages:
+            message.attempts += 1
+            if message.status == CampaignMessage.Status.SENT:
+                message.sent_at = now
+                sent += 1
+            elif (
+                message.status == CampaignMessage.Status.FAILED
+                or message.attempts >= settings.CAMPAIGNS_MAX_ATTEMPTS
+            ):
+                message.status = CampaignMessage.Status.FAILED
+                failed += 1
+            else:
+                retry += 1
+
+        with transaction.atomic():
+            CampaignMessage.objects.bulk_update(
+                messages, ["status", "attempts", "error", "external_id", "sent_at"]
+            )
+            Campaign.objects.filter(id=campaign_id).update(
+                sent_count=F("sent_count") + sent,
+                failed_count=F("failed_count") + failed,
+            )
+        if not retry:
+            cls.finish(campaign_id)
+        return {"sent": sent, "failed": failed, "retry": bool(retry)}
+
+    @staticmethod
+    def _send_emails(campaign, messages, renderer):
+        connection = get_connection()
+        try:
+            connection.open()
+        except (smtplib.SMTPException, OSError) as e:
+            # SMTP недоступен — вся пачка остается pending для retry
+            for message in messages:
+                message.error = str(e)[:255]
+            return
+        try:
+            for message in messages:
+                subject, body = renderer.render(message.customer)
+                email = EmailMessage(
+                    subject,
+                    body,
+                    settings.DEFAULT_FROM_EMAIL,
+                    [message.address],
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([email])
+                    message.status = CampaignMessage.Status.SENT
+                except smtplib.SMTPRecipientsRefused as e:
+                    message.status = CampaignMessage.Status.FAILED
+                    message.error = str(e)[:255]
+                except (smtplib.SMTPException, OSError) as e:
+                    # Временная ошибка: сообщение остается pending для retry
+                    message.error = str(e)[:255]
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _send_sms(messages, renderer):
+        try:
+            gateway = get_sms_gateway()
+        except SmsDeliveryError as e:
+            # Шлюз не настроен/недоступен — вся пачка с той же ошибкой
+            for message in messages:
+                message.error = str(e)[:255]
+                if not e.retryable:
+                    message.status = CampaignMessage.Status.FAILED
+            return
+
+        for message in messages:
+            _, body = renderer.render(message.customer)
+            try:
+                message.external_id = gateway.send(message.address, body)
+                message.status = CampaignMessage.Status.SENT
+            except SmsDeliveryError as e:
+                message.error = str(e)[:255]
+                if not e.retryable:
+                    message.status = CampaignMessage.Status.FAILED
+
+    @staticmethod
+    def finish(campaign_id: int):
+        """Закрыть рассылку, когда pending-сообщений не осталось"""
+        pending = CampaignMessage.objects.filter(
+            campaign_id=campaign_id, status=CampaignMessage.Status.PENDING
+        )
+        if not pending.exists():
+            Campaign.objects.filter(
+                id=campaign_id, status=Campaign.Status.SENDING
+            ).update(status=Campaign.Status.COMPLETED, finished_at=timezone.now())
+
+
+class CampaignRenderer:
+    """Шаблоны компилируются один раз, каждый вариант контекста рендерится один раз"""
+
+    def __init__(self, campaign: Campaign):
+        self.subject = Template(campaign.subject)
+        self.body = Template(campaign.body)
+        self._rendered = {}
+
+    def render(self, customer) -> tuple:
+        key = (customer.first_name, customer.last_name)
+        if key not in self._rendered:
+            context = Context(
+                {
+                    "first_name": customer.first_name,
+                    "last_name": customer.last_name,
+                    "full_name": f"{customer.first_name} {customer.last_name}",
+                }
+            )
+            self._rendered[key] = (
+                self.subject.render(context).strip(),
+                self.body.render(context),
+            )
+        return self._rendered[key]
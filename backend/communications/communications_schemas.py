@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional
+
+from ninja import Schema
+
+
+class CampaignFiltersSchema(Schema):
+    segment: Optional[str] = None
+    shop_id: Optional[int] = None
+    birthday_month: Optional[int] = None
+
+
+class CampaignCreateSchema(Schema):
+    name: str
+    channel: str  # "email" | "sms"
+    filters: CampaignFiltersSchema = CampaignFiltersSchema()
+    subject: Optional[str] = ""
+    body: str
+
+
+class CampaignSchema(Schema):
+    id: int
+    name: str
+    channel: str
+    status: str
+    filters: dict
+    subject: str
+    body: str
+    total_count: int
+    sent_count: int
+    failed_count: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class CampaignPreviewSchema(Schema):
+    recipients: int
+    subject: str
+    body: str
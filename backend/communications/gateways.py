@@ -0,0 +1,64 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SmsDeliveryError(Exception):
+    """Ошибка отправки SMS; retryable — можно повторить позже"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SmsGateway:
+    """Интерфейс SMS-шлюза: send() возвращает ID сообщения у провайдера"""
+
+    def send(self, to: str, body: str) -> str:
+        raise NotImplementedError
+
+
+class TwilioGateway(SmsGateway):
+    def __init__(self):
+        if not (
+            settings.TWILIO_ACCOUNT_SID
+            and settings.TWILIO_AUTH_TOKEN
+            and settings.TWILIO_FROM_NUMBER
+        ):
+            raise SmsDeliveryError("Twilio не настроен")
+
+        from twilio.rest import Client
+
+        # Один клиент (и HTTP-сессия) на процесс воркера
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def send(self, to: str, body: str) -> str:
+        from twilio.base.exceptions import TwilioRestException
+
+        try:
+            message = self.client.messages.create(
+                body=body, from_=settings.TWILIO_FROM_NUMBER, to=to
+            )
+        except TwilioRestException as e:
+            retryable = e.status == 429 or e.status >= 500
+            raise SmsDeliveryError(str(e.msg), retryable=retryable)
+        except OSError as e:
+            raise SmsDeliveryError(str(e), retryable=True)
+        return message.sid
+
+
+class FakeSmsGateway(SmsGateway):
+    """Шлюз для тестов и разработки: сообщения складываются в outbox экземпляра"""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send(self, to: str, body: str) -> str:
+        self.outbox.append({"to": to, "body": body})
+        return f"fake-{len(self.outbox)}"
+
+
+@lru_cache(maxsize=None)
+def get_sms_gateway() -> SmsGateway:
+    return import_string(settings.COMMUNICATIONS_SMS_GATEWAY)()
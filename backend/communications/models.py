@@ -0,0 +1,84 @@
+from django.db import models
+
+
+class Campaign(models.Model):
+    """Маркетинговая рассылка по сохраненному фильтру клиентов"""
+
+    class Channel(models.TextChoices):
+        EMAIL = "email", "Email"
+        SMS = "sms", "SMS"
+
+    class Status(models.TextChoices):
+        DRAFT = "draft", "Черновик"
+        SENDING = "sending", "Отправляется"
+        COMPLETED = "completed", "Завершена"
+        CANCELLED = "cancelled", "Отменена"
+
+    name = models.CharField("Название", max_length=200)
+    channel = models.CharField("Канал", max_length=10, choices=Channel.choices)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.DRAFT
+    )
+
+    # Сохраненный фильтр: segment, shop_id, birthday_month
+    filters = models.JSONField("Фильтр получателей", default=dict, blank=True)
+
+    # Шаблоны Django: {{ first_name }}, {{ last_name }}, {{ full_name }}
+    subject = models.CharField("Тема (email)", max_length=200, blank=True)
+    body = models.TextField("Текст")
+
+    total_count = models.PositiveIntegerField("Получателей", default=0)
+    sent_count = models.PositiveIntegerField("Отправлено", default=0)
+    failed_count = models.PositiveIntegerField("Ошибок", default=0)
+
+    shop = models.ForeignKey(
+        "shops.Shop", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_by = models.ForeignKey(
+        "users.User", on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField("Запущена", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+
+    class Meta:
+        db_table = "campaigns"
+        verbose_name = "Рассылка"
+        verbose_name_plural = "Рассылки"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.name
+
+
+class CampaignMessage(models.Model):
+    """Сообщение рассылки конкретному клиенту и статус доставки"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        SENT = "sent", "Отправлено"
+        FAILED = "failed", "Ошибка"
+
+    campaign = models.ForeignKey(
+        Campaign, on_delete=models.CASCADE, related_name="messages"
+    )
+    customer = models.ForeignKey("customers.Customer", on_delete=models.CASCADE)
+    address = models.CharField("Адрес", max_length=254)
+
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    error = models.CharField("Ошибка", max_length=255, blank=True)
+    external_id = models.CharField("ID у провайдера", max_length=100, blank=True)
+    sent_at = models.DateTimeField("Отправлено", null=True, blank=True)
+
+    class Meta:
+        db_table = "campaign_messages"
+        verbose_name = "Сообщение рассылки"
+        verbose_name_plural = "Сообщения рассылок"
+        unique_together = ["campaign", "customer"]
+        indexes = [models.Index(fields=["campaign", "status", "id"])]
+
+    def __str__(self):
+        return f"{self.campaign_id} -> {self.address} ({self.status})"
@@ -0,0 +1,92 @@
+from typing import List
+
+from django.shortcuts import get_object_or_404
+from django.template import TemplateSyntaxError
+from ninja import Router
+
+from Schemas.common import ErrorSchema
+
+from .campaigns import CampaignRenderer, CampaignService
+from .communications_schemas import (
+    CampaignCreateSchema,
+    CampaignPreviewSchema,
+    CampaignSchema,
+)
+from .models import Campaign
+
+router = Router(tags=["Рассылки"])
+
+
+@router.get("/", response=List[CampaignSchema])
+def list_campaigns(request):
+    """Список рассылок"""
+    if not request.auth.has_permission("communications.view_campaign"):
+        raise PermissionError("Нет прав для просмотра рассылок")
+
+    return Campaign.objects.all()[:100]
+
+
+@router.post("/", response={201: CampaignSchema, 400: ErrorSchema})
+def create_campaign(request, data: CampaignCreateSchema):
+    """Создание рассылки (черновик)"""
+    if not request.auth.has_permission("communications.add_campaign"):
+        raise PermissionError("Нет прав для создания рассылок")
+
+    if data.channel not in Campaign.Channel.values:
+        return 400, {"error": "Неизвестный канал рассылки"}
+    try:
+        CampaignRenderer(Campaign(subject=data.subject or "", body=data.body))
+    except TemplateSyntaxError as e:
+        return 400, {"error": f"Ошибка в шаблоне: {e}"}
+
+    campaign = Campaign.objects.create(
+        name=data.name,
+        channel=data.channel,
+        filters=data.filters.dict(exclude_none=True),
+        subject=data.subject or "",
+        body=data.body,
+        shop=getattr(request, "current_shop", None),
+        created_by=request.auth,
+    )
+    return 201, campaign
+
+
+@router.get("/{int:campaign_id}", response=CampaignSchema)
+def get_campaign(request, campaign_id: int):
+    """Рассылка и счетчики доставки"""
+    if not request.auth.has_permission("communications.view_campaign"):
+        raise PermissionError("Нет прав для просмотра рассылок")
+
+    return get_object_or_404(Campaign, id=campaign_id)
+
+
+@router.get("/{int:campaign_id}/preview", response=CampaignPreviewSchema)
+def preview_campaign(request, campaign_id: int):
+    """Число получателей и пример сообщения для первого из них"""
+    if not request.auth.has_permission("communications.view_campaign"):
+        raise PermissionError("Нет прав для просмотра рассылок")
+
+    campaign = get_object_or_404(Campaign, id=campaign_id)
+    recipients = CampaignService.recipients(campaign)
+    first = recipients.order_by("id").first()
+    subject, body = (
+        CampaignRenderer(campaign).render(first) if first else (campaign.subject, "")
+    )
+    return {"recipients": recipients.count(), "subject": subject, "body": body}
+
+
+@router.post(
+    "/{int:campaign_id}/launch", response={200: CampaignSchema, 400: ErrorSchema}
+)
+def launch_campaign(request, campaign_id: int):
+    """Запуск рассылки: получатели фиксируются, пачки уходят в очередь"""
+    if not request.auth.has_permission("communications.change_campaign"):
+        raise PermissionError("Нет прав для запуска рассылок")
+
+    campaign = get_object_or_404(Campaign, id=campaign_id)
+    try:
+        CampaignService.launch(campaign)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    campaign.refresh_from_db()
+    return campaign
@@ -4,6 +4,8 @@ from typing import Optional
 from django.conf import settings
 from django.core.mail import send_mail
 
+from .gateways import get_sms_gateway
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,23 +31,9 @@ class CommunicationService:
     def send_ready_sms(self, to_phone: str, order_number: str, shop_name: str):
         if not settings.COMMUNICATIONS_ENABLE_SMS:
             return False
-        if not (
-            settings.TWILIO_ACCOUNT_SID
-            and settings.TWILIO_AUTH_TOKEN
-            and settings.TWILIO_FROM_NUMBER
-        ):
-            logger.warning("Twilio not configured, SMS skipped")
-            return False
         try:
-            from twilio.rest import Client
-
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
             body = f"Ваш заказ {order_number} готов к выдаче. {shop_name}"
-            client.messages.create(
-                body=body,
-                from_=settings.TWILIO_FROM_NUMBER,
-                to=str(to_phone),
-            )
+            get_sms_gateway().send(str(to_phone), body)
             return True
         except Exception as e:
             logger.exception("SMS send failed: %s", e)
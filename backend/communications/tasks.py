@@ -0,0 +1,18 @@
+from celery import shared_task
+from django.conf import settings
+
+from .campaigns import CampaignService
+
+
+@shared_task(
+    bind=True,
+    name="communications.tasks.send_campaign_batch",
+    rate_limit=settings.CAMPAIGNS_BATCH_RATE_LIMIT,
+    max_retries=settings.CAMPAIGNS_MAX_ATTEMPTS,
+)
+def send_campaign_batch(self, campaign_id: int, first_id: int, last_id: int):
+    result = CampaignService.send_batch(campaign_id, first_id, last_id)
+    if result["retry"]:
+        # Временные ошибки: повторяем только оставшиеся pending-сообщения
+        raise self.retry(countdown=60 * (self.request.retries + 1))
+    return result
@@ -9,7 +9,9 @@ from ninja.security import HttpBearer
 
 # Подключаем роутеры
 from API.auth.router import router as auth_router
+from communications.router import router as communications_router
 from customers.router import router as customers_router
+from device.router import router as device_router
 from documents.router import router as documents_router
 from finance.router import router as finance_router
 from inventory.router import router as inventory_router
@@ -83,6 +85,7 @@ def value_error_handler(request, exc):
 
 api.add_router("/auth", auth_router)
 api.add_router("/customers", customers_router)
+api.add_router("/devices", device_router)
 api.add_router("/documents", documents_router)
 api.add_router("/orders", orders_router)
 api.add_router("/loyalty", loyalty_router)
@@ -93,3 +96,4 @@ api.add_router("/tasks", tasks_router)
 api.add_router("/notifications", notifications_router)
 api.add_router("/shops", shops_router)
 api.add_router("/finance", finance_router)
+api.add_router("/campaigns", communications_router)
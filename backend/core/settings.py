@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "reports",
     "tasks",
     "analytics",
+    "communications",
 ]
 
 MIDDLEWARE = [
@@ -122,6 +123,24 @@ CACHES = {
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
 
+# Канбан-доска заказов (короткий кэш, сбрасывается при изменении заказов)
+ORDERS_BOARD_CACHE_TTL = config("ORDERS_BOARD_CACHE_TTL", default=30, cast=int)
+
+# Горизонт раннего предупреждения о срыве SLA (минуты до estimated_completion)
+ORDERS_SLA_WARNING_HORIZON_MINUTES = config(
+    "ORDERS_SLA_WARNING_HORIZON_MINUTES", default=60, cast=int
+)
+
+# Карточка клиента 360 (сбрасывается событиями заказов, платежей и лояльности)
+CUSTOMERS_OVERVIEW_CACHE_TTL = config(
+    "CUSTOMERS_OVERVIEW_CACHE_TTL", default=300, cast=int
+)
+
+# История заказов для what-if расчета программы лояльности (кэш процесса, сек)
+LOYALTY_SIMULATION_CACHE_TTL = config(
+    "LOYALTY_SIMULATION_CACHE_TTL", default=300, cast=int
+)
+
 
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.Argon2PasswordHasher",
@@ -224,6 +243,42 @@ TWILIO_ACCOUNT_SID = config("TWILIO_ACCOUNT_SID", default=None)
 TWILIO_AUTH_TOKEN = config("TWILIO_AUTH_TOKEN", default=None)
 TWILIO_FROM_NUMBER = config("TWILIO_FROM_NUMBER", default=None)
 
+# SMS-шлюз (для тестов: communications.gateways.FakeSmsGateway)
+COMMUNICATIONS_SMS_GATEWAY = config(
+    "COMMUNICATIONS_SMS_GATEWAY", default="communications.gateways.TwilioGateway"
+)
+
+# Дайджест уведомлений низкого/обычного приоритета: окно (сек, 0 — выкл.)
+# и число событий, после которого дайджест отправляется досрочно
+NOTIFICATIONS_DIGEST_WINDOW = config(
+    "NOTIFICATIONS_DIGEST_WINDOW", default=120, cast=int
+)
+NOTIFICATIONS_DIGEST_MAX_EVENTS = config(
+    "NOTIFICATIONS_DIGEST_MAX_EVENTS", default=20, cast=int
+)
+
+# Дельты дашбордов остатков и заказов по WebSocket: окно слияния (мс, 0 — выкл.)
+NOTIFICATIONS_LIVE_WINDOW_MS = config(
+    "NOTIFICATIONS_LIVE_WINDOW_MS", default=500, cast=int
+)
+
+# WebSocket уведомлений: максимум пропущенных в кадре при переподключении
+# и диапазон случайной задержки переподключения клиента (мс)
+NOTIFICATIONS_WS_BACKLOG_LIMIT = config(
+    "NOTIFICATIONS_WS_BACKLOG_LIMIT", default=50, cast=int
+)
+NOTIFICATIONS_WS_RECONNECT_MIN_MS = config(
+    "NOTIFICATIONS_WS_RECONNECT_MIN_MS", default=1000, cast=int
+)
+NOTIFICATIONS_WS_RECONNECT_MAX_MS = config(
+    "NOTIFICATIONS_WS_RECONNECT_MAX_MS", default=15000, cast=int
+)
+
+# Рассылки: размер пачки и лимит пачек в час на воркер (200 * 500 = 100k/ч)
+CAMPAIGNS_BATCH_SIZE = config("CAMPAIGNS_BATCH_SIZE", default=200, cast=int)
+CAMPAIGNS_BATCH_RATE_LIMIT = config("CAMPAIGNS_BATCH_RATE_LIMIT", default="500/h")
+CAMPAIGNS_MAX_ATTEMPTS = config("CAMPAIGNS_MAX_ATTEMPTS", default=3, cast=int)
+
 
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default=REDIS_URL)
 CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default=REDIS_URL)
@@ -233,10 +288,34 @@ CELERY_BEAT_SCHEDULE = {
         "task": "tasks.tasks.low_stock_scan",
         "schedule": 60 * 60 * 24,  # раз в сутки
     },
+    "tasks-overdue-sweep": {
+        "task": "tasks.tasks.check_overdue_tasks",
+        "schedule": 60 * 15,  # раз в 15 минут
+    },
     "expire-loyalty-points-daily": {
         "task": "loyalty.tasks.expire_points",
         "schedule": 60 * 60 * 24,
     },
+    "loyalty-ledger-reconcile-daily": {
+        "task": "loyalty.tasks.reconcile_ledger",
+        "schedule": 60 * 60 * 24,
+    },
+    "loyalty-new-rewards-nightly": {
+        "task": "loyalty.tasks.evaluate_new_rewards",
+        "schedule": 60 * 60 * 24,
+    },
+    "notifications-retention-nightly": {
+        "task": "notifications.tasks.apply_retention",
+        "schedule": 60 * 60 * 24,
+    },
+    "orders-sla-breach-scan": {
+        "task": "orders.tasks.scan_sla_breaches",
+        "schedule": 60,  # раз в минуту
+    },
+    "customers-rfm-segments-daily": {
+        "task": "customers.tasks.compute_rfm_segments",
+        "schedule": 60 * 60 * 24,
+    },
     "analytics-monthly-snapshot": {
         "task": "analytics.tasks.save_monthly_snapshots",
         "schedule": 60 * 60 * 24,  # раз в сутки
@@ -52,11 +52,29 @@ class CustomerSchema(Schema):
     preferred_channel: Optional[str] = None
     marketing_consent: bool
 
+    @staticmethod
+    def resolve_phone(obj):
+        return str(obj.phone)
+
     @staticmethod
     def resolve_total_spent(obj):
         return float(obj.total_spent)
 
 
+class CustomerSummarySchema(Schema):
+    id: int
+    first_name: str
+    last_name: str
+    middle_name: Optional[str] = None
+    phone: str
+    email: Optional[str] = None
+    orders_count: int
+
+    @staticmethod
+    def resolve_phone(obj):
+        return str(obj["phone"])
+
+
 class CustomerListSchema(Schema):
     customers: List[CustomerSchema]
     pagination: PaginationSchema
@@ -68,3 +86,91 @@ class CustomerFilterSchema(Schema):
     created_from: Optional[date] = None
     created_to: Optional[date] = None
     has_orders: Optional[bool] = None
+    segment: Optional[str] = None  # RFM-сегмент, см. CustomerSegment.Segment
+
+
+class CustomerImportErrorSchema(Schema):
+    row: int
+    error: str
+
+
+class CustomerImportResultSchema(Schema):
+    total: int
+    created: int
+    duplicates: int
+    error_count: int
+    errors: List[CustomerImportErrorSchema]
+
+
+class CustomerMergeProposalSchema(Schema):
+    id: int
+    primary: CustomerSummarySchema
+    duplicate: Optional[CustomerSummarySchema] = None
+    score: float
+    reasons: List[str]
+    status: str
+    created_at: datetime
+
+
+class CustomerOverviewOrderSchema(Schema):
+    id: int
+    order_number: str
+    status: str
+    device_name: str
+    shop_name: str
+    total: float
+    paid: float
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+class CustomerBalanceOrderSchema(Schema):
+    id: int
+    order_number: str
+    status: str
+    total: float
+    paid: float
+    balance: float
+
+
+class CustomerOpenBalancesSchema(Schema):
+    total: float
+    orders: List[CustomerBalanceOrderSchema]
+
+
+class CustomerOverviewLoyaltySchema(Schema):
+    program_name: str
+    tier_level: str
+    available_points: int
+    total_points: int
+    used_points: int
+    total_spent: float
+
+
+class CustomerOverviewPaymentSchema(Schema):
+    id: int
+    payment_number: str
+    payment_type: str
+    status: str
+    amount: float
+    payment_date: datetime
+    order_number: Optional[str] = None
+    method: str
+
+
+class CustomerOverviewShopSchema(Schema):
+    shop_id: int
+    shop_name: str
+    first_visit: datetime
+    last_visit: datetime
+    visits_count: int
+
+
+class CustomerOverviewSchema(Schema):
+    profile: CustomerSchema
+    recent_orders: List[CustomerOverviewOrderSchema]
+    open_balances: CustomerOpenBalancesSchema
+    loyalty: Optional[CustomerOverviewLoyaltySchema] = None
+    recent_payments: List[CustomerOverviewPaymentSchema]
+    shops: List[CustomerOverviewShopSchema]
+    generated_at: datetime
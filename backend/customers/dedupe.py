@@ -0,0 +1,298 @@
+import re
+import zlib
+from collections import defaultdict
+from itertools import combinations, islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Customer, CustomerMergeProposal, CustomerShopHistory
+from .services import CustomerOverviewService, CustomerStatsService
+
+NON_LETTERS = re.compile(r"[^a-zа-я]+")
+NON_DIGITS = re.compile(r"\D+")
+
+
+def name_key(value: str) -> str:
+    return NON_LETTERS.sub("", (value or "").lower().replace("ё", "е"))
+
+
+def trigrams(value: str) -> frozenset:
+    padded = f"  {value} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def email_key(value: str) -> str:
+    """Нормализованный email: регистр, +метки, точки gmail"""
+    value = (value or "").strip().lower()
+    if "@" not in value:
+        return ""
+    local, domain = value.rsplit("@", 1)
+    local = local.split("+", 1)[0]
+    if domain in ("gmail.com", "googlemail.com"):
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+
+class CustomerDedupeEngine:
+    """
+    Поиск дубликатов клиентов с блокировкой.
+    Сравниваются только пары внутри блоков (общий хвост телефона,
+    одинаковый email, совпавшая MinHash-подпись триграмм ФИО),
+    поэтому число сравнений растет почти линейно.
+    """
+
+    PHONE_SUFFIX = 7
+    MINHASH_BANDS = 3
+    MAX_BLOCK_SIZE = 50  # слишком общие ключи ничего не различают
+    THRESHOLD = 0.6
+    BATCH_SIZE = 5000
+
+    def __init__(self, threshold: float = None):
+        self.threshold = self.THRESHOLD if threshold is None else threshold
+        self.records = {}
+        self.stats = {"customers": 0, "blocks": 0, "pairs": 0, "proposals": 0}
+
+    def load(self, queryset=None):
+        queryset = queryset if queryset is not None else Customer.objects.all()
+        rows = queryset.values_list(
+            "id", "first_name", "last_name", "phone", "email", "birth_date"
+        ).order_by("id")
+        for pk, first, last, phone, email, birth_date in rows.iterator(
+            chunk_size=self.BATCH_SIZE
+        ):
+            last, first = name_key(last), name_key(first)
+            self.records[pk] = (
+                NON_DIGITS.sub("", str(phone))[-10:],
+                email_key(email),
+                first,
+                trigrams(last),
+                trigrams(last + first),
+                birth_date,
+            )
+        self.stats["customers"] = len(self.records)
+
+    def blocks(self):
+        blocks = defaultdict(list)
+        for pk, (phone, email, first, last_grams, _, _) in self.records.items():
+            if len(phone) >= self.PHONE_SUFFIX:
+                blocks["p:" + phone[-self.PHONE_SUFFIX :]].append(pk)
+            if email:
+                blocks["e:" + email].append(pk)
+            if last_grams and first:
+                for band in range(self.MINHASH_BANDS):
+                    seed = band.to_bytes(1, "big")
+                    signature = min(
+                        zlib.crc32(seed + gram.encode()) for gram in last_grams
+                    )
+                    blocks[f"n:{band}:{first[0]}:{signature}"].append(pk)
+        return blocks
+
+    def candidate_pairs(self):
+        pairs = set()
+        for members in self.blocks().values():
+            if 2 <= len(members) <= self.MAX_BLOCK_SIZE:
+                self.stats["blocks"] += 1
+                pairs.update(combinations(sorted(members), 2))
+        self.stats["pairs"] = len(pairs)
+        return pairs
+
+    def score(self, a: int, b: int):
+        phone_a, email_a, _, _, name_a, birth_a = self.records[a]
+        phone_b, email_b, _, _, name_b, birth_b = self.records[b]
+
+        score, reasons = 0.0, []
+        if phone_a and phone_a == phone_b:
+            score += 0.5
+            reasons.append("phone")
+        if email_a and email_a == email_b:
+            score += 0.4
+            reasons.append("email")
+        similarity = jaccard(name_a, name_b)
+        if similarity >= 0.5:
+            score += 0.4 * similarity
+            reasons.append(f"name:{similarity:.2f}")
+        if birth_a and birth_b:
+            if birth_a == birth_b:
+                score += 0.1
+                reasons.append("birth_date")
+            else:
+                score -= 0.3
+        return min(score, 1.0), reasons
+
+    def proposals(self):
+        # Основной — более старая карточка (меньший id)
+        for a, b in self.candidate_pairs():
+            score, reasons = self.score(a, b)
+            if score >= self.threshold:
+                yield CustomerMergeProposal(
+                    primary_id=a,
+                    duplicate_id=b,
+                    score=round(score, 3),
+                    reasons=reasons,
+                )
+
+    def run(self, queryset=None, dry_run: bool = False) -> dict:
+        self.load(queryset)
+        proposals = self.proposals()
+        while True:
+            batch = list(islice(proposals, self.BATCH_SIZE))
+            if not batch:
+                break
+            self.stats["proposals"] += len(batch)
+            if not dry_run:
+                # Уже рассмотренные пары (unique primary+duplicate) пропускаются
+                CustomerMergeProposal.objects.bulk_create(batch, ignore_conflicts=True)
+        return self.stats
+
+
+class CustomerMergeService:
+    """Объединение карточек: все ссылки переносятся массовыми UPDATE"""
+
+    # Поля, которые заполняются из дубликата, если у основного пусто
+    FILL_FIELDS = (
+        "middle_name",
+        "email",
+        "source",
+        "source_details",
+        "birth_date",
+        "preferred_channel",
+    )
+
+    @classmethod
+    @transaction.atomic
+    def merge(cls, primary: Customer, duplicate: Customer, user=None) -> Customer:
+        from inventory.models import RetailSale
+        from orders.models import Order
+        from orders.services import OrderBoardService
+        from tasks.models import Task
+
+        if primary.id == duplicate.id:
+            raise ValueError("Нельзя объединить клиента с самим собой")
+
+        # UPDATE не шлет сигналы — кэши досок магазинов сбрасываем сами
+        board_shop_ids = set(
+            Order.objects.filter(customer=duplicate).values_list("shop_id", flat=True)
+        )
+        Order.objects.filter(customer=duplicate).update(customer=primary)
+        RetailSale.objects.filter(customer=duplicate).update(customer=primary)
+        Task.objects.filter(related_customer=duplicate).update(related_customer=primary)
+        cls._merge_shop_history(primary, duplicate)
+        cls._merge_loyalty(primary, duplicate)
+        cls._merge_campaign_messages(primary, duplicate)
+
+        update_fields = []
+        for field in cls.FILL_FIELDS:
+            if not getattr(primary, field) and getattr(duplicate, field):
+                setattr(primary, field, getattr(duplicate, field))
+                update_fields.append(field)
+        if duplicate.notes:
+            primary.notes = "\n".join(filter(None, [primary.notes, duplicate.notes]))
+            update_fields.append("notes")
+        primary.marketing_consent = (
+            primary.marketing_consent or duplicate.marketing_consent
+        )
+        primary.save(update_fields=update_fields + ["marketing_consent", "updated_at"])
+
+        duplicate_id = duplicate.id
+        CustomerMergeProposal.objects.filter(
+            duplicate_id=duplicate_id, status=CustomerMergeProposal.Status.PENDING
+        ).exclude(primary=primary).delete()
+        CustomerMergeProposal.objects.filter(
+            primary=primary, duplicate_id=duplicate_id
+        ).update(
+            status=CustomerMergeProposal.Status.MERGED,
+            resolved_at=timezone.now(),
+            resolved_by=user,
+        )
+        duplicate.delete()
+
+        CustomerStatsService.recompute([primary.id])
+        CustomerOverviewService.invalidate(primary.id)
+        CustomerOverviewService.invalidate(duplicate_id)
+        for shop_id in board_shop_ids:
+            OrderBoardService.invalidate(shop_id)
+        primary.refresh_from_db()
+        return primary
+
+    @staticmethod
+    def _merge_shop_history(primary, duplicate):
+        # unique (customer, shop): общие магазины суммируем, остальные переносим
+        shared = dict(
+            CustomerShopHistory.objects.filter(
+                customer=duplicate, shop__in=primary.shop_history.values("shop")
+            ).values_list("shop_id", "visits_count")
+        )
+        for shop_id, visits in shared.items():
+            CustomerShopHistory.objects.filter(
+                customer=primary, shop_id=shop_id
+            ).update(visits_count=F("visits_count") + visits)
+        CustomerShopHistory.objects.filter(customer=duplicate).exclude(
+            shop_id__in=shared
+        ).update(customer=primary)
+
+    @staticmethod
+    def _merge_campaign_messages(primary, duplicate):
+        # unique (campaign, customer): из общих рассылок остается сообщение основного
+        from communications.models import CampaignMessage
+
+        CampaignMessage.objects.filter(customer=duplicate).exclude(
+            campaign_id__in=CampaignMessage.objects.filter(customer=primary).values(
+                "campaign_id"
+            )
+        ).update(customer=primary)
+
+    @staticmethod
+    def _merge_loyalty(primary, duplicate):
+        from loyalty.models import (
+            CustomerLoyalty,
+            CustomerReward,
+            PointsBalanceCheckpoint,
+            PointsTransaction,
+        )
+
+        loyalty = {
+            row.customer_id: row
+            for row in CustomerLoyalty.objects.select_for_update().filter(
+                customer_id__in=[primary.id, duplicate.id]
+            )
+        }
+        source = loyalty.get(duplicate.id)
+        if source is None:
+            return
+        target = loyalty.get(primary.id)
+        if target is None:
+            CustomerLoyalty.objects.filter(id=source.id).update(customer=primary)
+            return
+
+        PointsTransaction.objects.filter(customer_loyalty=source).update(
+            customer_loyalty=target
+        )
+        # Журнал target дополнен чужими транзакциями — его точки баланса неверны,
+        # следующая сверка построит новую
+        PointsBalanceCheckpoint.objects.filter(customer_loyalty=target).delete()
+        # Награда выдается клиенту один раз: дубли удалятся вместе с source
+        CustomerReward.objects.filter(customer_loyalty=source).exclude(
+            reward_id__in=CustomerReward.objects.filter(customer_loyalty=target).values(
+                "reward_id"
+            )
+        ).update(customer_loyalty=target)
+        CustomerLoyalty.objects.filter(id=target.id).update(
+            total_points=F("total_points") + source.total_points,
+            available_points=F("available_points") + source.available_points,
+            used_points=F("used_points") + source.used_points,
+            total_spent=F("total_spent") + source.total_spent,
+            orders_count=F("orders_count") + source.orders_count,
+        )
+        source.delete()
+
+        target.refresh_from_db()
+        target.tier_level = target.calculate_tier()
+        target.save(update_fields=["tier_level"])
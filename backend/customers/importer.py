@@ -0,0 +1,272 @@
+import codecs
+import csv
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import chain, islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Customer, CustomerShopHistory
+from .utils import parse_phone
+
+IMPORT_FIELDS = (
+    "first_name",
+    "last_name",
+    "middle_name",
+    "phone",
+    "email",
+    "source",
+    "source_details",
+    "birth_date",
+    "notes",
+    "preferred_channel",
+    "marketing_consent",
+)
+REQUIRED_FIELDS = ("first_name", "last_name", "phone")
+TRUE_VALUES = {"1", "true", "yes", "да", "y", "+"}
+
+# Ограничения колонок модели проверяются по строкам до вставки
+MAX_LENGTHS = {
+    field.name: field.max_length
+    for field in Customer._meta.get_fields()
+    if field.name in IMPORT_FIELDS
+    and field.name != "phone"
+    and getattr(field, "max_length", None)
+}
+CHOICE_FIELDS = {
+    "source": set(Customer.CustomerSource.values),
+    "preferred_channel": set(Customer.PreferredChannel.values),
+}
+
+
+def read_rows(fileobj, filename: str):
+    """Потоковое чтение CSV/XLSX: генератор словарей по заголовку файла"""
+    if filename.lower().endswith(".xlsx"):
+        yield from _read_xlsx(fileobj)
+        return
+
+    lines = codecs.iterdecode(fileobj, "utf-8-sig")
+    header = next(lines, "")
+    # Выгрузки CRM бывают и с ";", и с табуляцией
+    delimiter = max(",;\t", key=header.count)
+    for row in csv.DictReader(chain([header], lines), delimiter=delimiter):
+        yield {(key or "").strip().lower(): value for key, value in row.items()}
+
+
+def _read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Для импорта XLSX требуется пакет openpyxl")
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [str(cell or "").strip().lower() for cell in next(rows, ())]
+    for values in rows:
+        yield {
+            key: "" if value is None else str(value)
+            for key, value in zip(header, values)
+        }
+    workbook.close()
+
+
+def clean_rows(batch):
+    """
+    CPU-часть импорта, выполняется в процессах пула.
+    batch: [(номер строки, dict)] -> [(номер строки, payload или None, ошибка)]
+    """
+    result = []
+    for line, raw in batch:
+        data = {
+            field: (raw.get(field) or "").strip()
+            for field in IMPORT_FIELDS
+            if field in raw
+        }
+        missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+        if missing:
+            result.append((line, None, f"Не заполнены поля: {', '.join(missing)}"))
+            continue
+
+        phone = parse_phone(data["phone"])
+        if phone is None:
+            result.append((line, None, f"Некорректный телефон: {data['phone']}"))
+            continue
+        data["phone"] = phone
+        data["email"] = data.get("email", "").lower()
+        for field in CHOICE_FIELDS:
+            if field in data:
+                data[field] = data[field].lower()
+
+        error = validate_row(data)
+        if error:
+            result.append((line, None, error))
+            continue
+
+        if data.get("birth_date"):
+            try:
+                data["birth_date"] = date.fromisoformat(data["birth_date"][:10])
+            except ValueError:
+                result.append((line, None, "Некорректная дата рождения"))
+                continue
+        else:
+            data["birth_date"] = None
+
+        data["marketing_consent"] = (
+            data.get("marketing_consent", "").lower() in TRUE_VALUES
+        )
+        result.append((line, data, None))
+    return result
+
+
+def validate_row(data: dict):
+    """Длина полей, значения из справочников и формат email; текст ошибки или None"""
+    for field, limit in MAX_LENGTHS.items():
+        if len(data.get(field, "")) > limit:
+            return f"Поле {field} длиннее {limit} символов"
+
+    for field, allowed in CHOICE_FIELDS.items():
+        if data.get(field) and data[field] not in allowed:
+            return f"Недопустимое значение поля {field}: {data[field]}"
+
+    if data.get("email"):
+        try:
+            validate_email(data["email"])
+        except ValidationError:
+            return f"Некорректный email: {data['email']}"
+    return None
+
+
+class CustomerImporter:
+    """
+    Массовый импорт клиентов из CRM-выгрузок.
+    Нормализация и проверка строк — в пуле процессов, проверка дубликатов —
+    одним запросом на чанк, вставка — bulk_create чанком; если чанк упал
+    на ограничении БД (параллельный импорт того же телефона), строки
+    вставляются по одной и отклоняются только конфликтующие.
+    """
+
+    CHUNK_SIZE = 5000
+    MAX_REPORTED_ERRORS = 1000
+
+    def __init__(self, created_by=None, shop=None, workers: int = 0, chunk_size=None):
+        self.created_by = created_by
+        self.shop = shop
+        self.workers = workers
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+        self.seen_phones = set()
+        self.seen_emails = set()
+        self.report = {
+            "total": 0,
+            "created": 0,
+            "duplicates": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+
+    def run(self, rows) -> dict:
+        # Номер строки с учетом заголовка
+        numbered = enumerate(rows, start=2)
+        batches = iter(lambda: list(islice(numbered, self.chunk_size)), [])
+
+        if self.workers <= 1:
+            for batch in batches:
+                self._store(clean_rows(batch))
+            return self.report
+
+        # Ограниченное окно задач: файл не читается в память целиком
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(clean_rows, batch))
+                if len(pending) > self.workers * 2:
+                    self._store(pending.popleft().result())
+            while pending:
+                self._store(pending.popleft().result())
+        return self.report
+
+    def _error(self, line: int, message: str):
+        self.report["error_count"] += 1
+        limit = self.MAX_REPORTED_ERRORS
+        if limit is None or len(self.report["errors"]) < limit:
+            self.report["errors"].append({"row": line, "error": message})
+
+    def _store(self, cleaned):
+        self.report["total"] += len(cleaned)
+        candidates = []
+        for line, data, error in cleaned:
+            if error:
+                self._error(line, error)
+            else:
+                candidates.append((line, data))
+        if not candidates:
+            return
+
+        phones = {data["phone"] for _, data in candidates}
+        emails = {data["email"] for _, data in candidates if data["email"]}
+        existing_phones, existing_emails = set(), set()
+        existing = (
+            Customer.objects.annotate(email_lower=Lower("email"))
+            .filter(Q(phone__in=phones) | Q(email_lower__in=emails))
+            .values_list("phone", "email_lower")
+        )
+        for phone, email in existing:
+            existing_phones.add(str(phone))
+            existing_emails.add(email)
+
+        rows = []
+        for line, data in candidates:
+            phone, email = data["phone"], data["email"]
+            if phone in existing_phones or phone in self.seen_phones:
+                self.report["duplicates"] += 1
+                self._error(line, f"Клиент с телефоном {phone} уже существует")
+                continue
+            if email and (email in existing_emails or email in self.seen_emails):
+                self.report["duplicates"] += 1
+                self._error(line, f"Клиент с email {email} уже существует")
+                continue
+            self.seen_phones.add(phone)
+            if email:
+                self.seen_emails.add(email)
+            rows.append((line, Customer(**data, created_by=self.created_by)))
+
+        if not rows:
+            return
+        with transaction.atomic():
+            created = self._insert(rows)
+            if self.shop is not None and created:
+                CustomerShopHistory.objects.bulk_create(
+                    [
+                        CustomerShopHistory(customer=customer, shop=self.shop)
+                        for customer in created
+                    ],
+                    ignore_conflicts=True,
+                )
+        self.report["created"] += len(created)
+
+    def _insert(self, rows):
+        """Вставка чанка; возвращает реально созданных клиентов"""
+        try:
+            with transaction.atomic():
+                return Customer.objects.bulk_create([c for _, c in rows])
+        except (IntegrityError, DataError):
+            pass
+
+        created = []
+        for line, customer in rows:
+            try:
+                with transaction.atomic():
+                    Customer.objects.bulk_create([customer])
+            except IntegrityError:
+                self.report["duplicates"] += 1
+                self._error(line, f"Клиент с телефоном {customer.phone} уже существует")
+            except DataError as e:
+                self._error(line, f"Некорректные данные: {e}")
+            else:
+                created.append(customer)
+        return created
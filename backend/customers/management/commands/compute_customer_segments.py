@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from customers.segmentation import RfmSegmentation
+
+
+class Command(BaseCommand):
+    help = "Пересчет RFM-сегментов и LTV клиентов"
+
+    def handle(self, *args, **options):
+        result = RfmSegmentation().run()
+        for segment, count in sorted(result["segments"].items()):
+            self.stdout.write(f"{segment}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Клиентов с сегментом: {result['customers']}")
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from customers.dedupe import CustomerDedupeEngine
+
+
+class Command(BaseCommand):
+    help = "Поиск дубликатов клиентов и создание предложений объединения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=CustomerDedupeEngine.THRESHOLD,
+            help="Минимальная оценка сходства пары",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Только посчитать, не сохранять"
+        )
+
+    def handle(self, *args, **options):
+        engine = CustomerDedupeEngine(threshold=options["threshold"])
+        stats = engine.run(dry_run=options["dry_run"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Клиентов: {stats['customers']}, блоков: {stats['blocks']}, "
+                f"пар: {stats['pairs']}, предложений: {stats['proposals']}"
+            )
+        )
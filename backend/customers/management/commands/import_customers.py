@@ -0,0 +1,49 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.importer import CustomerImporter, read_rows
+from shops.models import Shop
+
+
+class Command(BaseCommand):
+    help = "Массовый импорт клиентов из CSV/XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к CSV или XLSX файлу")
+        parser.add_argument("--shop", help="Код магазина для истории посещений")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--report", help="Куда сохранить отчет об ошибках (JSON)")
+
+    def handle(self, *args, **options):
+        shop = None
+        if options["shop"]:
+            shop = Shop.objects.filter(code=options["shop"]).first()
+            if shop is None:
+                raise CommandError(f"Магазин {options['shop']} не найден")
+
+        importer = CustomerImporter(
+            shop=shop, workers=options["workers"], chunk_size=options["chunk_size"]
+        )
+        # Для полного отчета в файл ограничение списка ошибок снимаем
+        if options["report"]:
+            importer.MAX_REPORTED_ERRORS = None
+
+        try:
+            with open(options["path"], "rb") as fileobj:
+                report = importer.run(read_rows(fileobj, options["path"]))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as out:
+                json.dump(report["errors"], out, ensure_ascii=False, indent=2)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Строк: {report['total']}, создано: {report['created']}, "
+                f"дубликатов: {report['duplicates']}, ошибок: {report['error_count']}"
+            )
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from customers.models import Customer
+from customers.services import CustomerStatsService
+
+
+class Command(BaseCommand):
+    help = "Пересчет orders_count / total_spent клиентов по заказам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        fixed, processed, last_id = 0, 0, 0
+
+        # Диапазоны по id: один агрегат и один bulk UPDATE на чанк
+        while True:
+            ids = list(
+                Customer.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                fixed += CustomerStatsService.recompute(ids)
+            processed += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Проверено клиентов: {processed}, исправлено: {fixed}")
+        )
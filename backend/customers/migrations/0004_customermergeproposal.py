@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0003_customer_marketing_consent_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerMergeProposal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "duplicate_id",
+                    models.PositiveBigIntegerField(verbose_name="ID дубликата"),
+                ),
+                ("score", models.FloatField(verbose_name="Оценка сходства")),
+                ("reasons", models.JSONField(default=list, verbose_name="Совпадения")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает решения"),
+                            ("merged", "Объединены"),
+                            ("rejected", "Отклонено"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "resolved_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Дата решения"
+                    ),
+                ),
+                (
+                    "primary",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="merge_proposals",
+                        to="customers.customer",
+                        verbose_name="Основной клиент",
+                    ),
+                ),
+                (
+                    "resolved_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Решение принял",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Предложение объединения клиентов",
+                "verbose_name_plural": "Предложения объединения клиентов",
+                "db_table": "customer_merge_proposals",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "-score"],
+                        name="customer_me_status_f061cd_idx",
+                    )
+                ],
+                "unique_together": {("primary", "duplicate_id")},
+            },
+        ),
+    ]
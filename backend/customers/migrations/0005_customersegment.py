@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0004_customermergeproposal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerSegment",
+            fields=[
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="segment",
+                        serialize=False,
+                        to="customers.customer",
+                    ),
+                ),
+                (
+                    "segment",
+                    models.CharField(
+                        choices=[
+                            ("champions", "Лучшие"),
+                            ("loyal", "Лояльные"),
+                            ("new", "Новые"),
+                            ("promising", "Перспективные"),
+                            ("at_risk", "Под угрозой ухода"),
+                            ("hibernating", "Спящие"),
+                            ("others", "Прочие"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                (
+                    "recency_days",
+                    models.PositiveIntegerField(
+                        verbose_name="Дней с последнего заказа"
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.PositiveIntegerField(verbose_name="Завершенных заказов"),
+                ),
+                (
+                    "monetary",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="Сумма заказов"
+                    ),
+                ),
+                ("r_score", models.PositiveSmallIntegerField(verbose_name="R")),
+                ("f_score", models.PositiveSmallIntegerField(verbose_name="F")),
+                ("m_score", models.PositiveSmallIntegerField(verbose_name="M")),
+                (
+                    "ltv",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="Прогноз LTV"
+                    ),
+                ),
+                ("computed_at", models.DateTimeField(verbose_name="Рассчитано")),
+            ],
+            options={
+                "verbose_name": "Сегмент клиента",
+                "verbose_name_plural": "Сегменты клиентов",
+                "db_table": "customer_segments",
+                "indexes": [
+                    models.Index(
+                        fields=["segment", "customer"],
+                        name="customer_se_segment_e3b92f_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -79,18 +79,11 @@ class Customer(models.Model):
         return " ".join(parts)
 
     def update_statistics(self):
-        """Обновление статистики клиента"""
-        from orders.models import Order
+        """Пересчет статистики клиента одним агрегатным запросом"""
+        from .services import CustomerStatsService
 
-        orders = Order.objects.filter(customer=self)
-
-        self.orders_count = orders.count()
-        self.total_spent = sum(
-            order.final_cost or order.cost_estimate
-            for order in orders
-            if order.final_cost or order.cost_estimate
-        )
-        self.save(update_fields=["orders_count", "total_spent"])
+        CustomerStatsService.recompute([self.id])
+        self.refresh_from_db(fields=["orders_count", "total_spent"])
 
 
 class CustomerShopHistory(models.Model):
@@ -110,3 +103,84 @@ class CustomerShopHistory(models.Model):
         unique_together = ["customer", "shop"]
         verbose_name = "История клиента в магазине"
         verbose_name_plural = "История клиентов в магазинах"
+
+
+class CustomerMergeProposal(models.Model):
+    """Предложение объединить дубликат клиента с основной карточкой"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Ожидает решения"
+        MERGED = "merged", "Объединены"
+        REJECTED = "rejected", "Отклонено"
+
+    primary = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name="merge_proposals",
+        verbose_name="Основной клиент",
+    )
+    # При объединении дубликат удаляется — ссылку сохраняем числом
+    duplicate_id = models.PositiveBigIntegerField("ID дубликата")
+    score = models.FloatField("Оценка сходства")
+    reasons = models.JSONField("Совпадения", default=list)
+
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField("Дата решения", null=True, blank=True)
+    resolved_by = models.ForeignKey(
+        "users.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Решение принял",
+    )
+
+    class Meta:
+        db_table = "customer_merge_proposals"
+        unique_together = ["primary", "duplicate_id"]
+        verbose_name = "Предложение объединения клиентов"
+        verbose_name_plural = "Предложения объединения клиентов"
+        indexes = [models.Index(fields=["status", "-score"])]
+
+    def __str__(self):
+        return f"{self.primary_id} <- {self.duplicate_id} ({self.score:.2f})"
+
+
+class CustomerSegment(models.Model):
+    """RFM-сегмент и оценка LTV клиента (пересчитывается пакетно)"""
+
+    class Segment(models.TextChoices):
+        CHAMPIONS = "champions", "Лучшие"
+        LOYAL = "loyal", "Лояльные"
+        NEW = "new", "Новые"
+        PROMISING = "promising", "Перспективные"
+        AT_RISK = "at_risk", "Под угрозой ухода"
+        HIBERNATING = "hibernating", "Спящие"
+        OTHERS = "others", "Прочие"
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name="segment"
+    )
+    segment = models.CharField(max_length=12, choices=Segment.choices)
+
+    recency_days = models.PositiveIntegerField("Дней с последнего заказа")
+    frequency = models.PositiveIntegerField("Завершенных заказов")
+    monetary = models.DecimalField("Сумма заказов", max_digits=12, decimal_places=2)
+    r_score = models.PositiveSmallIntegerField("R")
+    f_score = models.PositiveSmallIntegerField("F")
+    m_score = models.PositiveSmallIntegerField("M")
+    ltv = models.DecimalField("Прогноз LTV", max_digits=12, decimal_places=2)
+
+    computed_at = models.DateTimeField("Рассчитано")
+
+    class Meta:
+        db_table = "customer_segments"
+        verbose_name = "Сегмент клиента"
+        verbose_name_plural = "Сегменты клиентов"
+        indexes = [models.Index(fields=["segment", "customer"])]
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.segment}"
@@ -1,8 +1,12 @@
-from typing import List
+import csv
+from typing import List, Literal, Union
 
 from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from ninja import Query, Router
+from django.utils import timezone
+from ninja import File, Query, Router
+from ninja.files import UploadedFile
 from ninja.pagination import PageNumberPagination, paginate
 
 from Schemas.common import ErrorSchema, MessageSchema
@@ -10,11 +14,18 @@ from Schemas.common import ErrorSchema, MessageSchema
 from .customers_schemas import (
     CustomerCreateSchema,
     CustomerFilterSchema,
+    CustomerImportResultSchema,
     CustomerListSchema,
+    CustomerMergeProposalSchema,
+    CustomerOverviewSchema,
     CustomerSchema,
+    CustomerSummarySchema,
     CustomerUpdateSchema,
 )
-from .models import Customer
+from .dedupe import CustomerMergeService
+from .importer import CustomerImporter, read_rows
+from .models import Customer, CustomerMergeProposal
+from .services import CustomerOverviewService
 from .utils import normalize_phone
 
 router = Router(tags=["Клиенты"])
@@ -24,15 +35,31 @@ class CustomerPagination(PageNumberPagination):
     page_size = 20
 
 
-@router.get("/", response=List[CustomerSchema])
+# Поля узкой проекции списка (projection=summary)
+CUSTOMER_SUMMARY_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "middle_name",
+    "phone",
+    "email",
+    "orders_count",
+)
+
+
+@router.get("/", response=List[Union[CustomerSchema, CustomerSummarySchema]])
 @paginate(CustomerPagination)
-def list_customers(request, filters: CustomerFilterSchema = Query(...)):
+def list_customers(
+    request,
+    filters: CustomerFilterSchema = Query(...),
+    projection: Literal["summary", "full"] = "full",
+):
     """Получение списка клиентов"""
     # Проверяем права доступа
     if not request.auth.has_permission("customers.view_customer"):
         raise PermissionError("Нет прав для просмотра клиентов")
 
-    queryset = Customer.objects.select_related("created_by").all()
+    queryset = Customer.objects.all()
 
     # Применяем фильтры
     if filters.search:
@@ -58,10 +85,18 @@ def list_customers(request, filters: CustomerFilterSchema = Query(...)):
         else:
             queryset = queryset.filter(orders_count=0)
 
-    return queryset.order_by("-created_at")
+    if filters.segment:
+        queryset = queryset.filter(segment__segment=filters.segment)
+
+    queryset = queryset.order_by("-created_at")
+
+    if projection == "summary":
+        return queryset.values(*CUSTOMER_SUMMARY_FIELDS)
+
+    return queryset
 
 
-@router.get("/{customer_id}", response=CustomerSchema)
+@router.get("/{int:customer_id}", response=CustomerSchema)
 def get_customer(request, customer_id: int):
     """Получение клиента по ID"""
     if not request.auth.has_permission("customers.view_customer"):
@@ -109,8 +144,24 @@ def create_customer(request, data: CustomerCreateSchema):
         return 400, {"error": str(e)}
 
 
+@router.post("/import", response={200: CustomerImportResultSchema, 400: ErrorSchema})
+def import_customers(request, file: UploadedFile = File(...)):
+    """Массовый импорт клиентов из CSV/XLSX с отчетом по строкам"""
+    if not request.auth.has_permission("customers.add_customer"):
+        raise PermissionError("Нет прав для создания клиентов")
+
+    importer = CustomerImporter(
+        created_by=request.auth, shop=getattr(request, "current_shop", None)
+    )
+    try:
+        return importer.run(read_rows(file, file.name))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return 400, {"error": str(e)}
+
+
 @router.put(
-    "/{customer_id}", response={200: CustomerSchema, 400: ErrorSchema, 404: ErrorSchema}
+    "/{int:customer_id}",
+    response={200: CustomerSchema, 400: ErrorSchema, 404: ErrorSchema},
 )
 def update_customer(request, customer_id: int, data: CustomerUpdateSchema):
     """Обновление клиента"""
@@ -158,7 +209,8 @@ def update_customer(request, customer_id: int, data: CustomerUpdateSchema):
 
 
 @router.delete(
-    "/{customer_id}", response={200: MessageSchema, 403: ErrorSchema, 404: ErrorSchema}
+    "/{int:customer_id}",
+    response={200: MessageSchema, 403: ErrorSchema, 404: ErrorSchema},
 )
 def delete_customer(request, customer_id: int):
     """Удаление клиента"""
@@ -179,7 +231,19 @@ def delete_customer(request, customer_id: int):
         return 404, {"error": "Клиент не найден"}
 
 
-@router.get("/{customer_id}/orders", response=List[dict])
+@router.get("/{int:customer_id}/overview", response=CustomerOverviewSchema)
+def get_customer_overview(request, customer_id: int):
+    """Карточка клиента 360 одним запросом к API"""
+    if not request.auth.has_permission("customers.view_customer"):
+        raise PermissionError("Нет прав для просмотра клиентов")
+
+    overview = CustomerOverviewService.get_overview(customer_id)
+    if overview is None:
+        raise Http404("Клиент не найден")
+    return overview
+
+
+@router.get("/{int:customer_id}/orders", response=List[dict])
 def get_customer_orders(request, customer_id: int):
     """Получение заказов клиента"""
     if not request.auth.has_permission("customers.view_customer"):
@@ -218,3 +282,81 @@ def get_customer_orders(request, customer_id: int):
         }
         for order in orders
     ]
+
+
+@router.get("/merge-proposals", response=List[CustomerMergeProposalSchema])
+def list_merge_proposals(
+    request,
+    status: Literal["pending", "merged", "rejected"] = "pending",
+    limit: int = 50,
+):
+    """Предложения объединения дубликатов, самые вероятные первыми"""
+    if not request.auth.has_permission("customers.change_customer"):
+        raise PermissionError("Нет прав для изменения клиентов")
+
+    proposals = list(
+        CustomerMergeProposal.objects.filter(status=status).order_by("-score", "id")[
+            : max(1, min(limit, 200))
+        ]
+    )
+    ids = {p.primary_id for p in proposals} | {p.duplicate_id for p in proposals}
+    customers = {
+        row["id"]: row
+        for row in Customer.objects.filter(id__in=ids).values(*CUSTOMER_SUMMARY_FIELDS)
+    }
+    return [
+        {
+            "id": p.id,
+            "primary": customers[p.primary_id],
+            "duplicate": customers.get(p.duplicate_id),
+            "score": p.score,
+            "reasons": p.reasons,
+            "status": p.status,
+            "created_at": p.created_at,
+        }
+        for p in proposals
+    ]
+
+
+@router.post(
+    "/merge-proposals/{int:proposal_id}/merge",
+    response={200: CustomerSchema, 400: ErrorSchema},
+)
+def merge_customers(request, proposal_id: int):
+    """Объединить дубликат с основной карточкой"""
+    if not request.auth.has_permission("customers.delete_customer"):
+        raise PermissionError("Нет прав для объединения клиентов")
+
+    proposal = get_object_or_404(
+        CustomerMergeProposal.objects.select_related("primary"),
+        id=proposal_id,
+        status=CustomerMergeProposal.Status.PENDING,
+    )
+    duplicate = Customer.objects.filter(id=proposal.duplicate_id).first()
+    if duplicate is None:
+        return 400, {"error": "Дубликат уже удален или объединен"}
+
+    try:
+        return CustomerMergeService.merge(
+            proposal.primary, duplicate, user=request.auth
+        )
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+
+@router.post("/merge-proposals/{int:proposal_id}/reject", response=MessageSchema)
+def reject_merge_proposal(request, proposal_id: int):
+    """Отклонить предложение: пара больше не предлагается"""
+    if not request.auth.has_permission("customers.change_customer"):
+        raise PermissionError("Нет прав для изменения клиентов")
+
+    updated = CustomerMergeProposal.objects.filter(
+        id=proposal_id, status=CustomerMergeProposal.Status.PENDING
+    ).update(
+        status=CustomerMergeProposal.Status.REJECTED,
+        resolved_at=timezone.now(),
+        resolved_by=request.auth,
+    )
+    if not updated:
+        raise Http404("Предложение не найдено")
+    return {"message": "Предложение отклонено"}
@@ -0,0 +1,165 @@
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CustomerSegment
+
+DAY = 86400.0
+
+
+def quantile_scores(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """Оценки 1..5 по квинтилям; одинаковые значения получают одну оценку"""
+    if values.size == 0:
+        return values.astype(np.int16)
+    edges = np.quantile(values, [0.2, 0.4, 0.6, 0.8])
+    scores = np.searchsorted(edges, values, side="right") + 1
+    if not higher_is_better:
+        scores = 6 - scores
+    return np.clip(scores, 1, 5).astype(np.int16)
+
+
+class RfmSegmentation:
+    """
+    Пакетный расчет RFM и LTV.
+    Завершенные заказы читаются чанками в массивы NumPy, агрегаты по
+    клиентам — через reduceat по отсортированному customer_id,
+    результат сохраняется bulk upsert'ом в CustomerSegment.
+    """
+
+    CHUNK_SIZE = 50000
+    WRITE_BATCH = 5000
+    LTV_HORIZON_YEARS = 3
+    MIN_TENURE_DAYS = 90  # не экстраполируем частоту по одному свежему заказу
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+
+    def load(self):
+        """(customer_id, completed_at, сумма) завершенных заказов"""
+        from orders.models import Order
+
+        rows = (
+            Order.objects.filter(
+                status=Order.StatusChoices.COMPLETED, completed_at__isnull=False
+            )
+            .annotate(amount=Coalesce("final_cost", "cost_estimate"))
+            .order_by("customer_id")
+            .values_list("customer_id", "completed_at", "amount")
+            .iterator(chunk_size=self.CHUNK_SIZE)
+        )
+        ids, times, amounts = [], [], []
+        while True:
+            chunk = list(islice(rows, self.CHUNK_SIZE))
+            if not chunk:
+                break
+            ids.append(np.fromiter((r[0] for r in chunk), np.int64, len(chunk)))
+            times.append(
+                np.fromiter((r[1].timestamp() for r in chunk), np.float64, len(chunk))
+            )
+            amounts.append(
+                np.fromiter((r[2] or 0 for r in chunk), np.float64, len(chunk))
+            )
+        if not ids:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+        return np.concatenate(ids), np.concatenate(times), np.concatenate(amounts)
+
+    def compute(self, ids: np.ndarray, times: np.ndarray, amounts: np.ndarray):
+        """Все метрики векторно; ids уже отсортированы по клиенту"""
+        customers, starts, frequency = np.unique(
+            ids, return_index=True, return_counts=True
+        )
+        if customers.size == 0:
+            return {"customer": customers}
+
+        now = self.now.timestamp()
+        monetary = np.add.reduceat(amounts, starts)
+        last = np.maximum.reduceat(times, starts)
+        first = np.minimum.reduceat(times, starts)
+
+        recency = np.maximum((now - last) / DAY, 0)
+        r = quantile_scores(recency, higher_is_better=False)
+        f = quantile_scores(frequency)
+        m = quantile_scores(monetary)
+
+        # LTV: средний чек * заказов в год * горизонт
+        tenure_years = np.maximum((now - first) / DAY, self.MIN_TENURE_DAYS) / 365.0
+        ltv = (monetary / frequency) * (frequency / tenure_years)
+        ltv *= self.LTV_HORIZON_YEARS
+
+        Segment = CustomerSegment.Segment
+        segment = np.select(
+            [
+                (r >= 4) & (f >= 4) & (m >= 4),
+                (f >= 4) & (r >= 3),
+                (r >= 4) & (frequency == 1),
+                r >= 4,
+                (r <= 2) & (f >= 3),
+                r <= 2,
+            ],
+            [
+                Segment.CHAMPIONS,
+                Segment.LOYAL,
+                Segment.NEW,
+                Segment.PROMISING,
+                Segment.AT_RISK,
+                Segment.HIBERNATING,
+            ],
+            default=Segment.OTHERS,
+        )
+        return {
+            "customer": customers,
+            "segment": segment,
+            "recency_days": recency.astype(np.int64),
+            "frequency": frequency,
+            "monetary": monetary,
+            "r_score": r,
+            "f_score": f,
+            "m_score": m,
+            "ltv": ltv,
+        }
+
+    def save(self, result: dict) -> int:
+        names = list(result)
+        count = len(result["customer"])
+        with transaction.atomic():
+            for start in range(0, count, self.WRITE_BATCH):
+                columns = [
+                    result[name][start : start + self.WRITE_BATCH] for name in names
+                ]
+                CustomerSegment.objects.bulk_create(
+                    [
+                        self._row(dict(zip(names, values)))
+                        for values in zip(*(column.tolist() for column in columns))
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["customer"],
+                    update_fields=names[1:] + ["computed_at"],
+                )
+            # Клиенты без завершенных заказов из сегментов выпадают
+            CustomerSegment.objects.exclude(computed_at=self.now).delete()
+        return count
+
+    def _row(self, values: dict) -> CustomerSegment:
+        cent = Decimal("0.01")
+        values["customer_id"] = values.pop("customer")
+        values["monetary"] = Decimal(values["monetary"]).quantize(cent)
+        values["ltv"] = Decimal(values["ltv"]).quantize(cent)
+        return CustomerSegment(**values, computed_at=self.now)
+
+    def run(self) -> dict:
+        result = self.compute(*self.load())
+        saved = self.save(result) if len(result["customer"]) else 0
+        if not saved:
+            CustomerSegment.objects.all().delete()
+        counts = dict(
+            zip(*np.unique(result.get("segment", np.empty(0)), return_counts=True))
+        )
+        return {
+            "customers": saved,
+            "segments": {str(k): int(v) for k, v in counts.items()},
+        }
@@ -0,0 +1,281 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Customer
+
+ZERO = Decimal("0.00")
+
+
+class CustomerStatsService:
+    """
+    Статистика клиента (orders_count / total_spent).
+    Обновляется дельтами через F() при сохранении заказов;
+    полный пересчет — одним групповым агрегатом (recompute_customer_stats).
+    Отмененные заказы учитываются в количестве, но не в сумме.
+    """
+
+    ORDER_STATE_FIELDS = ("customer_id", "status", "final_cost", "cost_estimate")
+
+    @staticmethod
+    def order_value(state: dict) -> Decimal:
+        from orders.models import Order
+
+        if state["status"] == Order.StatusChoices.CANCELLED:
+            return ZERO
+        return state["final_cost"] or state["cost_estimate"] or ZERO
+
+    @staticmethod
+    def order_state(order) -> dict:
+        return {
+            field: getattr(order, field)
+            for field in CustomerStatsService.ORDER_STATE_FIELDS
+        }
+
+    @staticmethod
+    def apply_delta(customer_id: int, orders: int = 0, spent: Decimal = ZERO):
+        """Атомарное изменение счетчиков без чтения строки клиента"""
+        if not orders and not spent:
+            return
+        Customer.objects.filter(id=customer_id).update(
+            orders_count=F("orders_count") + orders,
+            total_spent=F("total_spent") + spent,
+        )
+
+    @classmethod
+    def order_saved(cls, order, previous: dict = None):
+        """previous — состояние заказа до сохранения (None для нового)"""
+        current = cls.order_state(order)
+        value = cls.order_value(current)
+        if previous is None:
+            cls.apply_delta(current["customer_id"], 1, value)
+            return
+
+        old_value = cls.order_value(previous)
+        if previous["customer_id"] != current["customer_id"]:
+            cls.apply_delta(previous["customer_id"], -1, -old_value)
+            cls.apply_delta(current["customer_id"], 1, value)
+        else:
+            cls.apply_delta(current["customer_id"], spent=value - old_value)
+
+    @classmethod
+    def order_deleted(cls, order):
+        state = cls.order_state(order)
+        cls.apply_delta(state["customer_id"], -1, -cls.order_value(state))
+
+    @staticmethod
+    def aggregate(customer_ids=None):
+        """Групповой агрегат по заказам: customer_id -> (count, spent)"""
+        from orders.models import Order
+
+        money = DecimalField(max_digits=12, decimal_places=2)
+        queryset = Order.objects.all()
+        if customer_ids is not None:
+            queryset = queryset.filter(customer_id__in=customer_ids)
+        rows = (
+            queryset.values("customer_id")
+            .annotate(
+                count=Count("id"),
+                spent=Sum(
+                    Case(
+                        When(status=Order.StatusChoices.CANCELLED, then=Value(ZERO)),
+                        default=Coalesce("final_cost", "cost_estimate", Value(ZERO)),
+                        output_field=money,
+                    )
+                ),
+            )
+            .order_by()
+        )
+        return {
+            row["customer_id"]: (row["count"], row["spent"] or ZERO) for row in rows
+        }
+
+    @classmethod
+    def recompute(cls, customer_ids) -> int:
+        """Пересчет для набора клиентов; возвращает число исправленных"""
+        customer_ids = list(customer_ids)
+        stats = cls.aggregate(customer_ids)
+        changed = []
+        for customer in Customer.objects.filter(id__in=customer_ids).only(
+            "id", "orders_count", "total_spent"
+        ):
+            count, spent = stats.get(customer.id, (0, ZERO))
+            if customer.orders_count != count or customer.total_spent != spent:
+                customer.orders_count, customer.total_spent = count, spent
+                changed.append(customer)
+        if changed:
+            Customer.objects.bulk_update(changed, ["orders_count", "total_spent"])
+        return len(changed)
+
+
+class CustomerOverviewService:
+    """
+    Карточка клиента 360: профиль, заказы, долги, лояльность, платежи,
+    визиты по магазинам. Фиксированное число запросов, кэш на клиента.
+    """
+
+    CACHE_PREFIX = "customers:overview"
+    RECENT_LIMIT = 10
+
+    @classmethod
+    def cache_key(cls, customer_id: int) -> str:
+        return f"{cls.CACHE_PREFIX}:{customer_id}"
+
+    @classmethod
+    def invalidate(cls, customer_id: int):
+        if customer_id:
+            transaction.on_commit(lambda: cache.delete(cls.cache_key(customer_id)))
+
+    @classmethod
+    def invalidate_many(cls, customer_ids):
+        """Для массовых UPDATE/bulk-операций, которые не шлют сигналы"""
+        keys = [
+            cls.cache_key(customer_id)
+            for customer_id in set(customer_ids)
+            if customer_id
+        ]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @classmethod
+    def get_overview(cls, customer_id: int):
+        """None — если клиента нет; при попадании в кэш SQL не выполняется"""
+        key = cls.cache_key(customer_id)
+        overview = cache.get(key)
+        if overview is None:
+            customer = Customer.objects.filter(id=customer_id).first()
+            if customer is None:
+                return None
+            overview = cls.build(customer)
+            cache.set(key, overview, settings.CUSTOMERS_OVERVIEW_CACHE_TTL)
+        return overview
+
+    @classmethod
+    def build(cls, customer: Customer) -> dict:
+        return {
+            "profile": customer,
+            "recent_orders": cls._recent_orders(customer.id),
+            "open_balances": cls._open_balances(customer.id),
+            "loyalty": cls._loyalty(customer.id),
+            "recent_payments": cls._recent_payments(customer.id),
+            "shops": list(
+                customer.shop_history.order_by("-last_visit").values(
+                    "shop_id",
+                    "first_visit",
+                    "last_visit",
+                    "visits_count",
+                    shop_name=F("shop__name"),
+                )
+            ),
+            "generated_at": timezone.now(),
+        }
+
+    @staticmethod
+    def _orders(customer_id: int):
+        from finance.models import Payment
+        from orders.models import Order
+        from orders.services import OrderProjection
+
+        money = DecimalField(max_digits=12, decimal_places=2)
+        paid = (
+            Payment.objects.filter(
+                order=OuterRef("pk"),
+                payment_type=Payment.PaymentType.INCOME,
+                status=Payment.PaymentStatus.COMPLETED,
+            )
+            .values("order")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        annotations = OrderProjection.annotations()
+        return Order.objects.filter(customer_id=customer_id).annotate(
+            device_name=annotations["device_name"],
+            total=annotations["total"],
+            paid=Coalesce(Subquery(paid), Value(ZERO), output_field=money)
+            + F("prepayment"),
+            shop_name=F("shop__name"),
+        )
+
+    @classmethod
+    def _recent_orders(cls, customer_id: int) -> list:
+        return list(
+            cls._orders(customer_id)
+            .order_by("-created_at")
+            .values(
+                "id",
+                "order_number",
+                "status",
+                "device_name",
+                "shop_name",
+                "total",
+                "paid",
+                "created_at",
+                "completed_at",
+            )[: cls.RECENT_LIMIT]
+        )
+
+    @classmethod
+    def _open_balances(cls, customer_id: int) -> dict:
+        from orders.models import Order
+
+        rows = list(
+            cls._orders(customer_id)
+            .exclude(status=Order.StatusChoices.CANCELLED)
+            .annotate(balance=F("total") - F("paid"))
+            .filter(balance__gt=0)
+            .order_by("created_at")
+            .values("id", "order_number", "status", "total", "paid", "balance")
+        )
+        return {"total": sum((row["balance"] for row in rows), ZERO), "orders": rows}
+
+    @staticmethod
+    def _loyalty(customer_id: int):
+        # Только чтение: участие в программе на GET не создаем
+        from loyalty.models import CustomerLoyalty
+
+        return (
+            CustomerLoyalty.objects.filter(customer_id=customer_id)
+            .values(
+                "tier_level",
+                "available_points",
+                "total_points",
+                "used_points",
+                "total_spent",
+                program_name=F("program__name"),
+            )
+            .first()
+        )
+
+    @classmethod
+    def _recent_payments(cls, customer_id: int) -> list:
+        from finance.models import Payment
+
+        return list(
+            Payment.objects.filter(order__customer_id=customer_id)
+            .order_by("-payment_date")
+            .values(
+                "id",
+                "payment_number",
+                "payment_type",
+                "status",
+                "amount",
+                "payment_date",
+                order_number=F("order__order_number"),
+                method=F("payment_method__name"),
+            )[: cls.RECENT_LIMIT]
+        )
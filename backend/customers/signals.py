@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from orders.models import Order
+
+from .models import Customer, CustomerShopHistory
+from .services import CustomerOverviewService
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_overview_customer(sender, instance, **kwargs):
+    CustomerOverviewService.invalidate(instance.id)
+
+
+@receiver(post_save, sender=CustomerShopHistory)
+@receiver(post_save, sender="orders.Order")
+@receiver(post_delete, sender="orders.Order")
+@receiver(post_save, sender="loyalty.CustomerLoyalty")
+@receiver(post_delete, sender="loyalty.CustomerLoyalty")
+def invalidate_overview_by_customer_id(sender, instance, **kwargs):
+    CustomerOverviewService.invalidate(instance.customer_id)
+
+
+@receiver(post_save, sender="orders.Order")
+def invalidate_overview_previous_customer(sender, instance, created, **kwargs):
+    # Заказ перенесен на другого клиента — карточка прежнего тоже устарела
+    previous = None if created else getattr(instance, "_previous_state", None)
+    if previous and previous["customer_id"] != instance.customer_id:
+        CustomerOverviewService.invalidate(previous["customer_id"])
+
+
+@receiver(post_save, sender="orders.OrderService")
+@receiver(post_delete, sender="orders.OrderService")
+@receiver(post_save, sender="finance.Payment")
+@receiver(post_delete, sender="finance.Payment")
+def invalidate_overview_by_order(sender, instance, **kwargs):
+    if instance.order_id:
+        CustomerOverviewService.invalidate(
+            Order.objects.filter(id=instance.order_id)
+            .values_list("customer_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender="loyalty.PointsTransaction")
+def invalidate_overview_by_loyalty(sender, instance, **kwargs):
+    CustomerOverviewService.invalidate(instance.customer_loyalty.customer_id)
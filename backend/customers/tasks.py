@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .segmentation import RfmSegmentation
+
+
+@shared_task(name="customers.tasks.compute_rfm_segments")
+def compute_rfm_segments():
+    return RfmSegmentation().run()
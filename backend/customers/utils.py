@@ -1,13 +1,22 @@
+from functools import lru_cache
+from typing import Optional
+
 import phonenumbers
 from phonenumbers import NumberParseException, PhoneNumberFormat
 
 
-def normalize_phone(raw: str) -> str:
+@lru_cache(maxsize=65536)
+def parse_phone(raw: str) -> Optional[str]:
+    """E164 или None, если номер невалиден (мемоизировано: parse дорогой)"""
     try:
         # По умолчанию RU, можно вынести в настройки
         p = phonenumbers.parse(raw, "RU")
         if not phonenumbers.is_valid_number(p):
-            return raw
+            return None
         return phonenumbers.format_number(p, PhoneNumberFormat.E164)
     except NumberParseException:
-        return raw
+        return None
+
+
+def normalize_phone(raw: str) -> str:
+    return parse_phone(raw) or raw
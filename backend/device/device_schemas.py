@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import List, Optional
+
+from ninja import Schema
+
+
+class RegistryDeviceSchema(Schema):
+    id: int
+    imei: Optional[str] = None
+    serial_number: Optional[str] = None
+    model: str
+
+
+class DeviceOrderHistorySchema(Schema):
+    id: int
+    order_number: str
+    status: str
+    shop_id: int
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+    warranty_until: Optional[datetime] = None
+
+
+class DeviceLookupSchema(Schema):
+    device: RegistryDeviceSchema
+    orders: List[DeviceOrderHistorySchema]
+    under_warranty: bool
+    warranty_until: Optional[datetime] = None
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+
+from device.models import Device
+from device.services import normalize_imei, normalize_serial
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Нормализация IMEI/серийных номеров и объединение дубликатов устройств"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Только показать, что изменится"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+
+        normalized = self._normalize(chunk_size, dry_run)
+        self.stdout.write(f"Нормализовано устройств: {normalized}")
+
+        by_imei = self._merge(["imei"], dry_run)
+        self.stdout.write(f"Объединено дубликатов по IMEI: {by_imei}")
+
+        by_serial = self._merge(["serial_number", "model_id"], dry_run)
+        self.stdout.write(f"Объединено дубликатов по серийному номеру: {by_serial}")
+
+        self.stdout.write(self.style.SUCCESS("Готово"))
+
+    def _normalize(self, chunk_size: int, dry_run: bool) -> int:
+        """bulk_update по чанкам: save() с нормализацией для каждой строки не зовем"""
+        changed, total = [], 0
+        queryset = Device.objects.only("id", "imei", "serial_number").order_by("id")
+        for device in queryset.iterator(chunk_size=chunk_size):
+            imei = normalize_imei(device.imei)
+            serial = normalize_serial(device.serial_number)
+            if imei == device.imei and serial == device.serial_number:
+                continue
+            device.imei, device.serial_number = imei, serial
+            changed.append(device)
+            if len(changed) >= chunk_size:
+                total += self._flush(changed, dry_run)
+                changed = []
+        return total + self._flush(changed, dry_run)
+
+    @staticmethod
+    def _flush(devices, dry_run: bool) -> int:
+        if devices and not dry_run:
+            Device.objects.bulk_update(devices, ["imei", "serial_number"])
+        return len(devices)
+
+    def _merge(self, key_fields, dry_run: bool) -> int:
+        """Оставляем устройство с минимальным id, заказы переносим на него"""
+        queryset = Device.objects.all()
+        for field in key_fields:
+            if field != "model_id":
+                queryset = queryset.exclude(**{field: ""})
+
+        groups = (
+            queryset.values(*key_fields)
+            .annotate(copies=Count("id"), keep_id=Min("id"))
+            .filter(copies__gt=1)
+        )
+
+        merged = 0
+        for group in list(groups):
+            keep_id = group.pop("keep_id")
+            group.pop("copies")
+            duplicate_ids = list(
+                Device.objects.filter(**group)
+                .exclude(id=keep_id)
+                .values_list("id", flat=True)
+            )
+            merged += len(duplicate_ids)
+            if dry_run:
+                continue
+            with transaction.atomic():
+                Order.objects.filter(device_id__in=duplicate_ids).update(
+                    device_id=keep_id
+                )
+                Device.objects.filter(id__in=duplicate_ids).delete()
+        return merged
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("device", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="device",
+            index=models.Index(fields=["imei"], name="devices_imei_fa0ada_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="device",
+            index=models.Index(
+                fields=["serial_number", "model"], name="devices_serial__383740_idx"
+            ),
+        ),
+    ]
@@ -82,6 +82,10 @@ class Device(models.Model):
         db_table = 'devices'
         verbose_name = 'Устройство'
         verbose_name_plural = 'Устройства'
+        indexes = [
+            models.Index(fields=['imei']),
+            models.Index(fields=['serial_number', 'model']),
+        ]
 
     def __str__(self):
         parts = [str(self.model)]
@@ -89,4 +93,12 @@ class Device(models.Model):
             parts.append(self.color)
         if self.storage_capacity:
             parts.append(self.storage_capacity)
-        return ' '.join(parts)
\ No newline at end of file
+        return ' '.join(parts)
+
+    def save(self, *args, **kwargs):
+        # Храним идентификаторы в нормализованном виде — по ним ищем дубликаты
+        from .services import normalize_imei, normalize_serial
+
+        self.imei = normalize_imei(self.imei)
+        self.serial_number = normalize_serial(self.serial_number)
+        super().save(*args, **kwargs)
\ No newline at end of file
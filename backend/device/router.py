@@ -0,0 +1,28 @@
+from typing import Optional
+
+from ninja import Router
+
+from Schemas.common import ErrorSchema
+
+from .device_schemas import DeviceLookupSchema
+from .services import DeviceRegistry
+
+router = Router(tags=["Устройства"])
+
+
+@router.get(
+    "/lookup", response={200: DeviceLookupSchema, 400: ErrorSchema, 404: ErrorSchema}
+)
+def lookup_device(request, imei: Optional[str] = None, serial: Optional[str] = None):
+    """Поиск устройства по IMEI/серийному номеру: история ремонтов и гарантия"""
+    if not request.auth.has_permission("orders.view_order"):
+        raise PermissionError("Нет прав для просмотра заказов")
+
+    if not imei and not serial:
+        return 400, {"error": "Укажите IMEI или серийный номер"}
+
+    result = DeviceRegistry.lookup(imei=imei, serial_number=serial)
+    if not result:
+        return 404, {"error": "Устройство не найдено"}
+
+    return result
@@ -0,0 +1,193 @@
+import re
+from typing import Optional
+
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Device, DeviceModel
+
+_NON_DIGITS = re.compile(r"\D")
+_SERIAL_NOISE = re.compile(r"[\s\-_.]")
+
+
+def normalize_imei(raw: Optional[str]) -> str:
+    return _NON_DIGITS.sub("", raw or "")
+
+
+def normalize_serial(raw: Optional[str]) -> str:
+    return _SERIAL_NOISE.sub("", raw or "").upper()
+
+
+class DeviceRegistry:
+    """Реестр устройств: поиск по IMEI/серийному номеру и история ремонтов"""
+
+    DEFAULT_WARRANTY_DAYS = 90
+
+    @staticmethod
+    def find(
+        imei: Optional[str] = None,
+        serial_number: Optional[str] = None,
+        model_id: Optional[int] = None,
+    ) -> Optional[Device]:
+        """
+        IMEI уникален для физического устройства: совпадение IMEI при другой
+        модели — ошибка приемки, а не новое устройство (ValueError).
+        """
+        imei = normalize_imei(imei)
+        if imei:
+            device = (
+                Device.objects.select_related("model__brand")
+                .filter(imei=imei)
+                .order_by("id")
+                .first()
+            )
+            if device:
+                if model_id and device.model_id != model_id:
+                    raise ValueError(
+                        f"Устройство с IMEI {imei} уже зарегистрировано "
+                        f"как {device.model}"
+                    )
+                return device
+
+        serial_number = normalize_serial(serial_number)
+        if serial_number:
+            qs = Device.objects.filter(serial_number=serial_number)
+            if model_id:
+                qs = qs.filter(model_id=model_id)
+            return qs.order_by("id").first()
+
+        return None
+
+    @classmethod
+    def get_or_create_for_intake(cls, device_model: DeviceModel, data: dict) -> Device:
+        """Переиспользовать известное устройство при приеме заказа"""
+        device = cls.find(
+            imei=data.get("imei"),
+            serial_number=data.get("serial_number"),
+            model_id=device_model.id,
+        )
+        if not device:
+            return Device.objects.create(model=device_model, **data)
+
+        # Дополняем пустые поля данными из новой приемки
+        update_fields = []
+        for field in ("imei", "serial_number", "color", "storage_capacity"):
+            if data.get(field) and not getattr(device, field):
+                setattr(device, field, data[field])
+                update_fields.append(field)
+        if update_fields:
+            device.save(update_fields=update_fields)
+        return device
+
+    @staticmethod
+    def warranty_days_subquery():
+        """
+        Гарантия типовой работы, применимой к модели устройства заказа
+        (модель -> бренд -> тип устройства, берем максимальную).
+        """
+        from orders.models import RepairService
+
+        return Subquery(
+            RepairService.objects.filter(is_active=True)
+            .filter(
+                Q(model_id=OuterRef("device__model_id"))
+                | Q(brand_id=OuterRef("device__model__brand_id"), model__isnull=True)
+                | Q(
+                    device_type_id=OuterRef("device__model__device_type_id"),
+                    brand__isnull=True,
+                    model__isnull=True,
+                )
+            )
+            .order_by("-warranty_days")
+            .values("warranty_days")[:1]
+        )
+
+    @classmethod
+    def lookup(
+        cls, imei: Optional[str] = None, serial_number: Optional[str] = None
+    ) -> Optional[dict]:
+        """Устройство, его заказы и статус гарантии — одним запросом"""
+        from orders.models import Order
+
+        imei = normalize_imei(imei)
+        serial_number = normalize_serial(serial_number)
+        if imei:
+            device_filter = Q(device__imei=imei)
+        elif serial_number:
+            device_filter = Q(device__serial_number=serial_number)
+        else:
+            return None
+
+        rows = list(
+            Order.objects.filter(device_filter)
+            .annotate(
+                warranty_days=Coalesce(
+                    cls.warranty_days_subquery(), cls.DEFAULT_WARRANTY_DAYS
+                ),
+            )
+            .order_by("-created_at")
+            .values(
+                "id",
+                "order_number",
+                "status",
+                "shop_id",
+                "created_at",
+                "completed_at",
+                "warranty_days",
+                "device_id",
+                device_imei=F("device__imei"),
+                device_serial_number=F("device__serial_number"),
+                device_model_name=F("device__model__name"),
+                device_brand_name=F("device__model__brand__name"),
+            )
+        )
+
+        if rows:
+            first = rows[0]
+            device = {
+                "id": first["device_id"],
+                "imei": first["device_imei"],
+                "serial_number": first["device_serial_number"],
+                "model": f"{first['device_brand_name']} {first['device_model_name']}",
+            }
+        else:
+            found = cls.find(imei=imei, serial_number=serial_number)
+            if not found:
+                return None
+            device = {
+                "id": found.id,
+                "imei": found.imei,
+                "serial_number": found.serial_number,
+                "model": str(found.model),
+            }
+
+        now = timezone.now()
+        orders = []
+        warranty_until = None
+        for row in rows:
+            row_warranty = None
+            if row["completed_at"]:
+                row_warranty = row["completed_at"] + timezone.timedelta(
+                    days=row["warranty_days"]
+                )
+                if warranty_until is None or row_warranty > warranty_until:
+                    warranty_until = row_warranty
+            orders.append(
+                {
+                    "id": row["id"],
+                    "order_number": row["order_number"],
+                    "status": row["status"],
+                    "shop_id": row["shop_id"],
+                    "created_at": row["created_at"],
+                    "completed_at": row["completed_at"],
+                    "warranty_until": row_warranty,
+                }
+            )
+
+        return {
+            "device": device,
+            "orders": orders,
+            "under_warranty": bool(warranty_until and warranty_until >= now),
+            "warranty_until": warranty_until,
+        }
@@ -58,6 +58,15 @@ class InventoryItemSchema(Schema):
         return int(obj.total_stock or 0)
 
 
+class InventoryItemSummarySchema(Schema):
+    id: int
+    name: str
+    sku: str
+    item_type: str
+    category_id: int
+    selling_price: float
+
+
 class StockBalanceSchema(Schema):
     id: int
     shop_id: int
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 
 from django.db import transaction
 from django.db.models import F, Q, Sum
@@ -15,6 +15,7 @@ from .inventory_schemas import (
     FinalizeSalePaymentInputSchema,
     FinalizeSaleResponseSchema,
     InventoryItemSchema,
+    InventoryItemSummarySchema,
     ItemBarcodeSchema,
     ItemStockByCodeSchema,
     PurchaseOrderSchema,
@@ -39,17 +40,25 @@ from .services import InventoryService
 
 router = Router(tags=["Складской учет"])
 
+# Поля узкой проекции списка (projection=summary): без join'ов и подсчета остатков
+ITEM_SUMMARY_FIELDS = ("id", "name", "sku", "item_type", "category_id", "selling_price")
 
-@router.get("/items", response=List[InventoryItemSchema])
+
+@router.get(
+    "/items", response=List[Union[InventoryItemSchema, InventoryItemSummarySchema]]
+)
 @paginate
-def list_inventory_items(request, search: str = None, category_id: int = None):
+def list_inventory_items(
+    request,
+    search: str = None,
+    category_id: int = None,
+    projection: Literal["summary", "full"] = "full",
+):
     """Список товаров"""
     if not request.auth.has_permission("inventory.view_item"):
         raise PermissionError("Нет прав для просмотра товаров")
 
-    queryset = InventoryItem.objects.select_related(
-        "category", "primary_supplier"
-    ).filter(is_active=True)
+    queryset = InventoryItem.objects.filter(is_active=True)
 
     if search:
         queryset = queryset.filter(
@@ -61,7 +70,12 @@ def list_inventory_items(request, search: str = None, category_id: int = None):
     if category_id:
         queryset = queryset.filter(category_id=category_id)
 
-    return queryset.order_by("category", "name")
+    queryset = queryset.order_by("category", "name")
+
+    if projection == "summary":
+        return queryset.values(*ITEM_SUMMARY_FIELDS)
+
+    return queryset.select_related("category", "primary_supplier")
 
 
 @router.get("/stock-balances", response=List[StockBalanceSchema])
@@ -7,6 +7,7 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 from finance.models import CashRegister, Payment, PaymentMethod
+from notifications.live import DashboardStream
 from users.models import User
 
 from .models import (
@@ -228,6 +229,7 @@ class InventoryService:
         # блокируем строку остатка
         balance = StockBalance.objects.select_for_update().get(id=stock_balance_id)
         before = balance.quantity
+        available_before = balance.available_quantity
         after = before + quantity_change
 
         if not balance.item.allow_negative_stock and after < 0:
@@ -256,6 +258,7 @@ class InventoryService:
             cost_per_unit=cost_per_unit,
             created_by=user,
         )
+        DashboardStream.stock_changed(balance, before, available_before)
         return movement
 
     @transaction.atomic
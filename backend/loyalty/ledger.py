@@ -0,0 +1,154 @@
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+from customers.services import CustomerOverviewService
+
+from .models import CustomerLoyalty, PointsBalanceCheckpoint, PointsTransaction
+
+REDEEMED = PointsTransaction.TransactionType.REDEEMED
+
+
+def ledger_totals():
+    """Агрегаты журнала баллов, из которых выводятся счетчики участия"""
+    return {
+        "balance": Coalesce(Sum("points"), 0),
+        "earned": Coalesce(
+            Sum("points", filter=Q(transaction_type__in=PointsTransaction.LOT_TYPES)),
+            0,
+        ),
+        "redeemed": Coalesce(Sum("points", filter=Q(transaction_type=REDEEMED)), 0),
+        "last_transaction_id": Max("id"),
+    }
+
+
+class LoyaltyLedger:
+    """
+    Сверка денормализованных счетчиков CustomerLoyalty с журналом
+    PointsTransaction. Участия обрабатываются чанками по id: один
+    сгруппированный агрегат на чанк, расхождения исправляются bulk_update,
+    для участий с новыми транзакциями пишется контрольная точка баланса.
+    """
+
+    CHUNK_SIZE = 2000
+
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def run(self) -> dict:
+        stats = {"customers": 0, "mismatched": 0, "checkpoints": 0}
+        last_id = 0
+        while True:
+            ids = list(
+                CustomerLoyalty.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[: self.chunk_size]
+            )
+            if not ids:
+                break
+            mismatched, checkpoints = self.reconcile_chunk(ids)
+            stats["customers"] += len(ids)
+            stats["mismatched"] += mismatched
+            stats["checkpoints"] += checkpoints
+            last_id = ids[-1]
+        return stats
+
+    @staticmethod
+    def expected_counters(row: dict) -> tuple:
+        """(total_points, available_points, used_points) по итогам журнала"""
+        if not row:
+            return 0, 0, 0
+        return row["earned"], max(row["balance"], 0), -row["redeemed"]
+
+    @transaction.atomic
+    def reconcile_chunk(self, ids: list) -> tuple:
+        # Блокировка участий: начисления и списания чанка ждут сверку
+        loyalties = list(
+            CustomerLoyalty.objects.select_for_update()
+            .filter(id__in=ids)
+            .order_by("id")
+            .only(
+                "id", "customer_id", "total_points", "available_points", "used_points"
+            )
+        )
+        ledger = {
+            row["customer_loyalty_id"]: row
+            for row in PointsTransaction.objects.filter(customer_loyalty_id__in=ids)
+            .order_by()
+            .values("customer_loyalty_id")
+            .annotate(**ledger_totals())
+        }
+        checkpointed = dict(
+            PointsBalanceCheckpoint.objects.filter(customer_loyalty_id__in=ids)
+            .order_by()
+            .values("customer_loyalty_id")
+            .annotate(last=Max("last_transaction_id"))
+            .values_list("customer_loyalty_id", "last")
+        )
+
+        mismatched, checkpoints = [], []
+        for loyalty in loyalties:
+            row = ledger.get(loyalty.id)
+            expected = self.expected_counters(row)
+            stored = (
+                loyalty.total_points,
+                loyalty.available_points,
+                loyalty.used_points,
+            )
+            if stored != expected:
+                (
+                    loyalty.total_points,
+                    loyalty.available_points,
+                    loyalty.used_points,
+                ) = expected
+                mismatched.append(loyalty)
+
+            if row and row["last_transaction_id"] > checkpointed.get(loyalty.id, 0):
+                checkpoints.append(
+                    PointsBalanceCheckpoint(
+                        customer_loyalty_id=loyalty.id,
+                        last_transaction_id=row["last_transaction_id"],
+                        balance=row["balance"],
+                        total_points=row["earned"],
+                        used_points=-row["redeemed"],
+                    )
+                )
+
+        CustomerLoyalty.objects.bulk_update(
+            mismatched, ["total_points", "available_points", "used_points"]
+        )
+        CustomerOverviewService.invalidate_many(
+            loyalty.customer_id for loyalty in mismatched
+        )
+        PointsBalanceCheckpoint.objects.bulk_create(checkpoints)
+        return len(mismatched), len(checkpoints)
+
+    @staticmethod
+    def annotate_running_balance(transactions: list) -> list:
+        """
+        Проставить balance_after транзакциям одного участия.
+        База берется из ближайшей контрольной точки до первой транзакции
+        страницы, остаток журнала до страницы досчитывается одним агрегатом.
+        """
+        if not transactions:
+            return transactions
+        loyalty_id = transactions[0].customer_loyalty_id
+        first_id = min(tx.id for tx in transactions)
+
+        checkpoint = (
+            PointsBalanceCheckpoint.objects.filter(
+                customer_loyalty_id=loyalty_id, last_transaction_id__lt=first_id
+            )
+            .order_by("-last_transaction_id")
+            .values_list("last_transaction_id", "balance")
+            .first()
+        )
+        base_id, balance = checkpoint or (0, 0)
+        balance += PointsTransaction.objects.filter(
+            customer_loyalty_id=loyalty_id, id__gt=base_id, id__lt=first_id
+        ).aggregate(total=Coalesce(Sum("points"), 0))["total"]
+
+        for tx in sorted(transactions, key=lambda tx: tx.id):
+            balance += tx.points
+            tx.balance_after = balance
+        return transactions
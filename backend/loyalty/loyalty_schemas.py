@@ -1,8 +1,8 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from ninja import Schema
+from ninja import Field, Schema
 
 
 class LoyaltyProgramSchema(Schema):
@@ -62,6 +62,7 @@ class PointsTransactionSchema(Schema):
     description: str
     created_at: datetime
     expires_at: Optional[datetime] = None
+    balance_after: Optional[int] = None
 
 
 class LoyaltyRewardSchema(Schema):
@@ -98,3 +99,37 @@ class RedeemPointsSchema(Schema):
     order_id: int
     points: int
     description: Optional[str] = ""
+
+
+class LoyaltySimulationSchema(Schema):
+    """Кандидат в параметры программы: незаданные поля берутся из текущей"""
+
+    earn_rate: Optional[float] = Field(None, ge=0, le=100)
+    min_order_amount: Optional[float] = Field(None, ge=0)
+    point_value: Optional[float] = Field(None, gt=0)
+    points_expire_days: Optional[int] = Field(None, ge=0, description="0 — бессрочные")
+    redemption_rate: Optional[float] = Field(
+        None, ge=0, le=1, description="По умолчанию — доля списаний по журналу"
+    )
+    tier_thresholds: Optional[Dict[str, float]] = None
+    tier_multipliers: Optional[Dict[str, float]] = None
+    tier_bonus_points: Optional[Dict[str, int]] = None
+    years: int = Field(2, ge=1, le=5)
+
+
+class LoyaltySimulationResultSchema(Schema):
+    orders: int
+    customers: int
+    earned_points: int
+    bonus_points: int
+    redeemed_points: int
+    expired_points: int
+    liability_points: int
+    liability_amount: float
+    tier_distribution: Dict[str, int]
+
+
+class LoyaltySimulationResponseSchema(Schema):
+    redemption_rate: float
+    current: LoyaltySimulationResultSchema
+    candidate: LoyaltySimulationResultSchema
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from loyalty.services import RewardEligibility
+
+
+class Command(BaseCommand):
+    help = "Выдача наград программы лояльности всем подходящим клиентам"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Проверить все активные награды, а не только новые",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            result = RewardEligibility.evaluate_all()
+        else:
+            result = RewardEligibility.evaluate_launched()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проверено участий: {result['customers']}, "
+                f"выдано наград: {result['granted']}"
+            )
+        )
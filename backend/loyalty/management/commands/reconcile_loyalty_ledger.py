@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from loyalty.ledger import LoyaltyLedger
+
+
+class Command(BaseCommand):
+    help = "Сверка балансов баллов с журналом транзакций и контрольные точки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=LoyaltyLedger.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        result = LoyaltyLedger(chunk_size=options["chunk_size"]).run()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Участий: {result['customers']}, исправлено: {result['mismatched']}, "
+                f"контрольных точек: {result['checkpoints']}"
+            )
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+LOT_TYPES = ("earned", "bonus", "refund")
+
+
+def backfill_remaining_points(apps, schema_editor):
+    """
+    Доступный баланс распределяем по лотам от новых к старым:
+    при FIFO-списании старые лоты расходуются первыми.
+    """
+    CustomerLoyalty = apps.get_model("loyalty", "CustomerLoyalty")
+    PointsTransaction = apps.get_model("loyalty", "PointsTransaction")
+
+    left = dict(CustomerLoyalty.objects.values_list("id", "available_points"))
+    lots = (
+        PointsTransaction.objects.filter(transaction_type__in=LOT_TYPES, points__gt=0)
+        .order_by("customer_loyalty_id", "-created_at", "-id")
+        .values_list("id", "customer_loyalty_id", "points")
+    )
+    batch = []
+    for pk, loyalty_id, points in lots.iterator(chunk_size=5000):
+        remaining = min(points, left.get(loyalty_id, 0))
+        if remaining <= 0:
+            continue
+        left[loyalty_id] -= remaining
+        batch.append(PointsTransaction(id=pk, remaining_points=remaining))
+        if len(batch) >= 5000:
+            PointsTransaction.objects.bulk_update(batch, ["remaining_points"])
+            batch = []
+    PointsTransaction.objects.bulk_update(batch, ["remaining_points"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("loyalty", "0001_initial"),
+        ("orders", "0003_repairservice_order_sla_delay_minutes_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pointstransaction",
+            name="remaining_points",
+            field=models.PositiveIntegerField(default=0, verbose_name="Остаток лота"),
+        ),
+        migrations.RunPython(backfill_remaining_points, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="pointstransaction",
+            index=models.Index(
+                condition=models.Q(("remaining_points__gt", 0)),
+                fields=["customer_loyalty", "expires_at", "id"],
+                name="points_open_lots_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pointstransaction",
+            index=models.Index(
+                condition=models.Q(("remaining_points__gt", 0)),
+                fields=["expires_at", "id"],
+                name="points_expiring_lots_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("loyalty", "0002_points_lots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PointsBalanceCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_transaction_id",
+                    models.PositiveBigIntegerField(
+                        verbose_name="Последняя учтенная транзакция"
+                    ),
+                ),
+                ("balance", models.IntegerField(verbose_name="Баланс")),
+                ("total_points", models.IntegerField(verbose_name="Всего начислено")),
+                ("used_points", models.IntegerField(verbose_name="Всего списано")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "customer_loyalty",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoints",
+                        to="loyalty.customerloyalty",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Контрольная точка баланса",
+                "verbose_name_plural": "Контрольные точки балансов",
+                "db_table": "points_balance_checkpoints",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("customer_loyalty", "last_transaction_id"),
+                        name="points_checkpoint_unique",
+                    )
+                ],
+            },
+        ),
+    ]
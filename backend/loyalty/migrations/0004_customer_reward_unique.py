@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:06
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+def drop_duplicate_rewards(apps, schema_editor):
+    """
+    Оставляем одну выдачу каждой награды клиенту: использованную, если она
+    есть (иначе первую) — иначе клиент получил бы неиспользованную награду
+    обратно. Удаленные строки пишутся в лог для сверки.
+    """
+    CustomerReward = apps.get_model("loyalty", "CustomerReward")
+    duplicates = (
+        CustomerReward.objects.values("customer_loyalty_id", "reward_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    deleted = 0
+    for row in duplicates.iterator():
+        rows = list(
+            CustomerReward.objects.filter(
+                customer_loyalty_id=row["customer_loyalty_id"],
+                reward_id=row["reward_id"],
+            )
+            .order_by("-is_used", "id")
+            .values("id", "order_id", "received_at", "is_used", "used_at")
+        )
+        kept, dropped = rows[0], rows[1:]
+        for reward in dropped:
+            logger.warning(
+                "Удалена повторная награда %s (участие %s, награда %s), "
+                "оставлена %s: %s",
+                reward["id"],
+                row["customer_loyalty_id"],
+                row["reward_id"],
+                kept["id"],
+                reward,
+            )
+        CustomerReward.objects.filter(id__in=[r["id"] for r in dropped]).delete()
+        deleted += len(dropped)
+    if deleted:
+        logger.warning("Удалено повторных наград клиентов: %s", deleted)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("loyalty", "0003_balance_checkpoints"),
+        ("orders", "0003_repairservice_order_sla_delay_minutes_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_rewards, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="customerreward",
+            constraint=models.UniqueConstraint(
+                fields=("customer_loyalty", "reward"), name="customer_reward_unique"
+            ),
+        ),
+    ]
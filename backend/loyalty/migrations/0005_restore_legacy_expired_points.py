@@ -0,0 +1,64 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import migrations
+
+LEGACY_EXPIRY_PREFIX = "Истечение срока действия баллов от "
+
+
+def restore_legacy_expired_points(apps, schema_editor):
+    """
+    Старое сгорание баллов и обнуляло points у начисления, и писало
+    EXPIRED-транзакцию на ту же сумму — в журнале баллы списаны дважды.
+    Возвращаем сумму начислению: пара ищется по участию и дате начисления
+    из описания EXPIRED-транзакции. Остаток лота остается нулевым.
+    """
+    PointsTransaction = apps.get_model("loyalty", "PointsTransaction")
+    PointsBalanceCheckpoint = apps.get_model("loyalty", "PointsBalanceCheckpoint")
+
+    expired = defaultdict(list)
+    legacy = PointsTransaction.objects.filter(
+        transaction_type="expired", description__startswith=LEGACY_EXPIRY_PREFIX
+    ).order_by("id")
+    for loyalty_id, points, description in legacy.values_list(
+        "customer_loyalty_id", "points", "description"
+    ).iterator(chunk_size=5000):
+        try:
+            earned_on = date.fromisoformat(description[len(LEGACY_EXPIRY_PREFIX) :])
+        except ValueError:
+            continue
+        expired[(loyalty_id, earned_on)].append(-points)
+    if not expired:
+        return
+
+    zeroed = PointsTransaction.objects.filter(
+        transaction_type="earned",
+        points=0,
+        customer_loyalty_id__in={loyalty_id for loyalty_id, _ in expired},
+    ).order_by("id")
+    batch, restored = [], set()
+    for pk, loyalty_id, created_at in zeroed.values_list(
+        "id", "customer_loyalty_id", "created_at"
+    ).iterator(chunk_size=5000):
+        amounts = expired.get((loyalty_id, created_at.date()))
+        if not amounts:
+            continue
+        batch.append(PointsTransaction(id=pk, points=amounts.pop(0)))
+        restored.add(loyalty_id)
+        if len(batch) >= 5000:
+            PointsTransaction.objects.bulk_update(batch, ["points"])
+            batch = []
+    PointsTransaction.objects.bulk_update(batch, ["points"])
+
+    # Контрольные точки этих участий посчитаны по двойному списанию
+    PointsBalanceCheckpoint.objects.filter(customer_loyalty_id__in=restored).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("loyalty", "0004_customer_reward_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_legacy_expired_points, migrations.RunPython.noop),
+    ]
@@ -97,6 +97,24 @@ class CustomerLoyalty(models.Model):
         GOLD = 'gold', 'Золотой'
         PLATINUM = 'platinum', 'Платиновый'
 
+    # Пороги потраченной суммы (по убыванию), множители и бонусы уровней
+    TIER_THRESHOLDS = (
+        (TierLevel.PLATINUM, 100000),
+        (TierLevel.GOLD, 50000),
+        (TierLevel.SILVER, 20000),
+    )
+    TIER_MULTIPLIERS = {
+        TierLevel.BRONZE: 1.0,
+        TierLevel.SILVER: 1.2,
+        TierLevel.GOLD: 1.5,
+        TierLevel.PLATINUM: 2.0
+    }
+    TIER_BONUS_POINTS = {
+        TierLevel.SILVER: 500,
+        TierLevel.GOLD: 1000,
+        TierLevel.PLATINUM: 2000
+    }
+
     customer = models.OneToOneField(
         Customer,
         on_delete=models.CASCADE,
@@ -148,24 +166,14 @@ class CustomerLoyalty(models.Model):
 
     def calculate_tier(self):
         """Расчет уровня клиента на основе потраченной суммы"""
-        if self.total_spent >= 100000:
-            return self.TierLevel.PLATINUM
-        elif self.total_spent >= 50000:
-            return self.TierLevel.GOLD
-        elif self.total_spent >= 20000:
-            return self.TierLevel.SILVER
-        else:
-            return self.TierLevel.BRONZE
+        for tier, threshold in self.TIER_THRESHOLDS:
+            if self.total_spent >= threshold:
+                return tier
+        return self.TierLevel.BRONZE
 
     def get_tier_multiplier(self):
         """Получить множитель начисления для текущего уровня"""
-        multipliers = {
-            self.TierLevel.BRONZE: 1.0,
-            self.TierLevel.SILVER: 1.2,
-            self.TierLevel.GOLD: 1.5,
-            self.TierLevel.PLATINUM: 2.0
-        }
-        return multipliers.get(self.tier_level, 1.0)
+        return self.TIER_MULTIPLIERS.get(self.tier_level, 1.0)
 
 
 class PointsTransaction(models.Model):
@@ -201,16 +209,63 @@ class PointsTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField("Срок действия", null=True, blank=True)
 
+    # Для начислений (лотов): сколько баллов лота еще не списано и не сгорело
+    remaining_points = models.PositiveIntegerField("Остаток лота", default=0)
+
+    # Типы, которые образуют лоты баллов
+    LOT_TYPES = (TransactionType.EARNED, TransactionType.BONUS, TransactionType.REFUND)
+
     class Meta:
         db_table = 'points_transactions'
         verbose_name = 'Транзакция баллов'
         verbose_name_plural = 'Транзакции баллов'
         ordering = ['-created_at']
+        indexes = [
+            # Открытые лоты: FIFO-списание и поиск сгоревших
+            models.Index(
+                fields=['customer_loyalty', 'expires_at', 'id'],
+                condition=models.Q(remaining_points__gt=0),
+                name='points_open_lots_idx'
+            ),
+            models.Index(
+                fields=['expires_at', 'id'],
+                condition=models.Q(remaining_points__gt=0),
+                name='points_expiring_lots_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer_loyalty.customer.full_name} - {self.points} баллов ({self.get_transaction_type_display()})"
 
 
+class PointsBalanceCheckpoint(models.Model):
+    """Контрольная точка баланса: итоги журнала баллов до транзакции включительно"""
+    customer_loyalty = models.ForeignKey(
+        CustomerLoyalty,
+        on_delete=models.CASCADE,
+        related_name='checkpoints'
+    )
+    last_transaction_id = models.PositiveBigIntegerField("Последняя учтенная транзакция")
+    balance = models.IntegerField("Баланс")
+    total_points = models.IntegerField("Всего начислено")
+    used_points = models.IntegerField("Всего списано")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'points_balance_checkpoints'
+        verbose_name = 'Контрольная точка баланса'
+        verbose_name_plural = 'Контрольные точки балансов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['customer_loyalty', 'last_transaction_id'],
+                name='points_checkpoint_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_loyalty_id} #{self.last_transaction_id}: {self.balance}"
+
+
 class LoyaltyReward(models.Model):
     """Награды программы лояльности"""
 
@@ -310,6 +365,12 @@ class CustomerReward(models.Model):
         verbose_name = 'Награда клиента'
         verbose_name_plural = 'Награды клиентов'
         ordering = ['-received_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['customer_loyalty', 'reward'],
+                name='customer_reward_unique'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer_loyalty.customer.full_name} - {self.reward.name}"
@@ -2,16 +2,19 @@
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from ninja import Router
-from ninja.pagination import paginate
+from ninja.pagination import LimitOffsetPagination, paginate
 
 from customers.models import Customer
 from orders.models import Order
 
+from .ledger import LoyaltyLedger
 from .loyalty_schemas import (
     CustomerLoyaltySchema,
     CustomerRewardSchema,
     LoyaltyProgramSchema,
     LoyaltyRewardSchema,
+    LoyaltySimulationResponseSchema,
+    LoyaltySimulationSchema,
     PointsTransactionSchema,
     RedeemPointsSchema,
 )
@@ -23,10 +26,22 @@ from .models import (
     PointsTransaction,
 )
 from .services import LoyaltyService
+from .simulation import LoyaltySimulator, SimulationConfig
 
 router = Router(tags=["Программа лояльности"])
 
 
+class LedgerPagination(LimitOffsetPagination):
+    """Страница истории баллов с балансом после каждой транзакции"""
+
+    def paginate_queryset(self, queryset, pagination, request, **params):
+        page = super().paginate_queryset(queryset, pagination, request, **params)
+        page[self.items_attribute] = LoyaltyLedger.annotate_running_balance(
+            list(page[self.items_attribute])
+        )
+        return page
+
+
 @router.get("/programs", response=list[LoyaltyProgramSchema])
 def list_loyalty_programs(request):
     """Получить список программ лояльности"""
@@ -53,7 +68,7 @@ def get_customer_loyalty(request, customer_id: int):
 @router.get(
     "/customer/{customer_id}/transactions", response=list[PointsTransactionSchema]
 )
-@paginate
+@paginate(LedgerPagination)
 def get_customer_transactions(request, customer_id: int):
     """Получить историю транзакций баллов клиента"""
     customer = get_object_or_404(Customer, id=customer_id)
@@ -62,7 +77,8 @@ def get_customer_transactions(request, customer_id: int):
     if not customer_loyalty:
         return []
 
-    return customer_loyalty.transactions.all()
+    # Порядок по id: страница — непрерывный отрезок журнала
+    return customer_loyalty.transactions.order_by("-id")
 
 
 @router.post("/redeem-points", response={200: dict, 400: dict})
@@ -103,19 +119,9 @@ def redeem_points(request, data: RedeemPointsSchema):
 def calculate_points_for_order(request, order_id: int):
     """Рассчитать количество баллов за заказ"""
     order = get_object_or_404(Order, id=order_id)
-    points = LoyaltyService.calculate_points_for_order(order)
-
-    customer_loyalty = LoyaltyService.get_or_create_customer_loyalty(order.customer)
-    tier_multiplier = (
-        customer_loyalty.get_tier_multiplier() if customer_loyalty else 1.0
-    )
-
-    return {
-        "points": points,
-        "tier_level": customer_loyalty.tier_level if customer_loyalty else "bronze",
-        "tier_multiplier": tier_multiplier,
-        "order_amount": float(order.final_cost or order.cost_estimate),
-    }
+    quote = LoyaltyService.quote_points(order)
+    quote["order_amount"] = float(quote["order_amount"])
+    return quote
 
 
 @router.get("/customer/{customer_id}/rewards", response=list[CustomerRewardSchema])
@@ -155,3 +161,27 @@ def award_points_for_order(request, order_id: int):
 
     except Exception as e:
         return 400, {"error": str(e)}
+
+
+@router.post("/simulate", response={200: LoyaltySimulationResponseSchema, 400: dict})
+def simulate_program(request, data: LoyaltySimulationSchema):
+    """What-if расчет изменения программы по истории завершенных заказов"""
+    if not request.auth.has_permission("loyalty.change_loyaltyprogram"):
+        raise PermissionError("Нет прав для моделирования программы лояльности")
+
+    program = LoyaltyProgram.objects.filter(is_active=True).first()
+    if not program:
+        return 400, {"error": "Нет активной программы лояльности"}
+
+    overrides = data.dict(exclude={"years", "redemption_rate"})
+    redemption_rate = data.redemption_rate
+    if redemption_rate is None:
+        redemption_rate = LoyaltySimulator.historical_redemption_rate()
+
+    current = SimulationConfig.from_program(program, redemption_rate)
+    simulator = LoyaltySimulator(years=data.years, cached=True)
+    return {
+        "redemption_rate": redemption_rate,
+        "current": simulator.simulate(current),
+        "candidate": simulator.simulate(current.with_overrides(**overrides)),
+    }
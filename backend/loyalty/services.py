@@ -1,134 +1,382 @@
 # backend/loyalty/services.py
+from dataclasses import dataclass
 from decimal import Decimal
+from types import MappingProxyType
+from typing import Optional, Tuple
+
+from django.core.cache import cache
+from django.db import connection, models, transaction
 from django.utils import timezone
-from django.db import transaction
 from .models import (
     LoyaltyProgram, CustomerLoyalty, PointsTransaction,
     LoyaltyReward, CustomerReward
 )
 from orders.models import Order
 from customers.models import Customer
+from customers.services import CustomerOverviewService
+
+
+TIER_ORDER = {
+    CustomerLoyalty.TierLevel.BRONZE: 1,
+    CustomerLoyalty.TierLevel.SILVER: 2,
+    CustomerLoyalty.TierLevel.GOLD: 3,
+    CustomerLoyalty.TierLevel.PLATINUM: 4
+}
+
+
+@dataclass(frozen=True)
+class RewardRule:
+    """Условия выдачи награды (часть снимка программы)"""
+    id: int
+    required_points: int
+    required_orders_count: int
+    required_tier: str
+    valid_from: Optional[timezone.datetime]
+    valid_to: Optional[timezone.datetime]
+    created_at: timezone.datetime
+
+    def is_available(self, customer_loyalty: CustomerLoyalty, now) -> bool:
+        if customer_loyalty.total_points < self.required_points:
+            return False
+        if customer_loyalty.orders_count < self.required_orders_count:
+            return False
+        if self.required_tier and TIER_ORDER.get(self.required_tier, 1) > TIER_ORDER.get(customer_loyalty.tier_level, 1):
+            return False
+        if self.valid_from and self.valid_from > now:
+            return False
+        return not (self.valid_to and self.valid_to < now)
+
+    def launched_between(self, since, now) -> bool:
+        """Награда появилась или вступила в силу в интервале (since, now]"""
+        if self.created_at > since:
+            return True
+        return bool(self.valid_from and since < self.valid_from <= now)
+
+
+@dataclass(frozen=True)
+class ProgramSnapshot:
+    """Неизменяемый снимок активной программы для горячего пути начисления"""
+    id: int
+    earn_rate: Decimal
+    min_order_amount: Decimal
+    min_redeem_points: int
+    max_redeem_percent: Decimal
+    point_value: Decimal
+    points_expire_days: Optional[int]
+    tier_multipliers: MappingProxyType
+    tier_bonus_points: MappingProxyType
+    rewards: Tuple[RewardRule, ...]
+
+    def points_for(self, order_amount: Decimal, tier_level: str) -> int:
+        if order_amount < self.min_order_amount:
+            return 0
+        base_points = int(order_amount * self.earn_rate / 100)
+        return int(base_points * self.tier_multipliers.get(tier_level, 1.0))
+
+    def expiry_date(self):
+        if self.points_expire_days:
+            return timezone.now() + timezone.timedelta(days=self.points_expire_days)
+        return None
+
+    def __reduce__(self):
+        # MappingProxyType не сериализуется pickle — храним обычные dict
+        return _restore_snapshot, (
+            self.id, self.earn_rate, self.min_order_amount, self.min_redeem_points,
+            self.max_redeem_percent, self.point_value, self.points_expire_days,
+            dict(self.tier_multipliers), dict(self.tier_bonus_points), self.rewards,
+        )
+
+
+def _restore_snapshot(*fields):
+    fields = list(fields)
+    fields[7] = MappingProxyType(fields[7])
+    fields[8] = MappingProxyType(fields[8])
+    return ProgramSnapshot(*fields)
+
+
+class RewardEligibility:
+    """
+    Выдача наград по правилам из снимка программы.
+    Условия проверяются в Python; уже выданные награды читаются одним
+    IN-запросом на пачку участий, новые пишутся одним bulk_create.
+    """
+
+    CHUNK_SIZE = 2000
+    LAST_BATCH_KEY = 'loyalty:rewards:last_batch'
+
+    @staticmethod
+    def grant(loyalties, rules, now=None) -> int:
+        """Выдать пачке участий все доступные им награды, вернуть число выданных"""
+        now = now or timezone.now()
+        candidates = {}
+        for customer_loyalty in loyalties:
+            eligible = {rule.id for rule in rules if rule.is_available(customer_loyalty, now)}
+            if eligible:
+                candidates[customer_loyalty.id] = eligible
+        if not candidates:
+            return 0
+
+        received = set(
+            CustomerReward.objects.filter(
+                customer_loyalty_id__in=candidates,
+                reward_id__in=set().union(*candidates.values())
+            ).values_list('customer_loyalty_id', 'reward_id')
+        )
+        new_rewards = [
+            CustomerReward(customer_loyalty_id=loyalty_id, reward_id=reward_id)
+            for loyalty_id, reward_ids in candidates.items()
+            for reward_id in sorted(reward_ids)
+            if (loyalty_id, reward_id) not in received
+        ]
+        # Параллельная выдача той же награды отсекается уникальным ограничением
+        CustomerReward.objects.bulk_create(new_rewards, ignore_conflicts=True)
+        return len(new_rewards)
+
+    @staticmethod
+    def evaluate_all(rules=None, chunk_size: int = None, now=None) -> dict:
+        """Проверить всех участников активной программы чанками по id"""
+        stats = {'customers': 0, 'granted': 0}
+        snapshot = LoyaltyService.get_program_snapshot()
+        if not snapshot:
+            return stats
+        rules = snapshot.rewards if rules is None else tuple(rules)
+        if not rules:
+            return stats
+        now = now or timezone.now()
+        chunk_size = chunk_size or RewardEligibility.CHUNK_SIZE
+
+        # Заведомо не подходящих ни под одну награду отсекаем в SQL
+        loyalties = CustomerLoyalty.objects.filter(
+            program_id=snapshot.id,
+            total_points__gte=min(rule.required_points for rule in rules),
+            orders_count__gte=min(rule.required_orders_count for rule in rules)
+        ).only('id', 'total_points', 'orders_count', 'tier_level').order_by('id')
+
+        last_id = 0
+        while True:
+            chunk = list(loyalties.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            stats['customers'] += len(chunk)
+            stats['granted'] += RewardEligibility.grant(chunk, rules, now)
+            last_id = chunk[-1].id
+        return stats
+
+    @staticmethod
+    def evaluate_launched(now=None) -> dict:
+        """
+        Ночной прогон: все участники проверяются только по наградам,
+        появившимся или вступившим в силу с прошлого прогона.
+        """
+        now = now or timezone.now()
+        since = cache.get(RewardEligibility.LAST_BATCH_KEY)
+        snapshot = LoyaltyService.get_program_snapshot()
+        rules = ()
+        if snapshot:
+            rules = tuple(
+                rule for rule in snapshot.rewards
+                if since is None or rule.launched_between(since, now)
+            )
+        stats = {'rewards': len(rules), 'customers': 0, 'granted': 0}
+        if rules:
+            stats.update(RewardEligibility.evaluate_all(rules, now=now))
+        cache.set(RewardEligibility.LAST_BATCH_KEY, now, None)
+        return stats
 
 
 class LoyaltyService:
     """Сервис для работы с программой лояльности"""
 
+    PROGRAM_CACHE_KEY = 'loyalty:program:active:v2'
+    # Отсутствие активной программы тоже кэшируем
+    NO_PROGRAM = 'none'
+
+    @staticmethod
+    def get_program_snapshot() -> Optional[ProgramSnapshot]:
+        """Снимок активной программы из кэша (без SQL при попадании)"""
+        snapshot = cache.get(LoyaltyService.PROGRAM_CACHE_KEY)
+        if snapshot is None:
+            snapshot = LoyaltyService._build_program_snapshot() or LoyaltyService.NO_PROGRAM
+            cache.set(LoyaltyService.PROGRAM_CACHE_KEY, snapshot, None)
+        return None if snapshot == LoyaltyService.NO_PROGRAM else snapshot
+
+    @staticmethod
+    def invalidate_program_snapshot():
+        transaction.on_commit(lambda: cache.delete(LoyaltyService.PROGRAM_CACHE_KEY))
+
+    @staticmethod
+    def _build_program_snapshot() -> Optional[ProgramSnapshot]:
+        program = LoyaltyProgram.objects.filter(is_active=True).first()
+        if not program:
+            return None
+
+        rewards = tuple(
+            RewardRule(**row)
+            for row in LoyaltyReward.objects.filter(program=program, is_active=True).values(
+                'id', 'required_points', 'required_orders_count', 'required_tier',
+                'valid_from', 'valid_to', 'created_at'
+            )
+        )
+        return ProgramSnapshot(
+            id=program.id,
+            earn_rate=program.earn_rate,
+            min_order_amount=program.min_order_amount,
+            min_redeem_points=program.min_redeem_points,
+            max_redeem_percent=program.max_redeem_percent,
+            point_value=program.point_value,
+            points_expire_days=program.points_expire_days,
+            tier_multipliers=MappingProxyType(dict(CustomerLoyalty.TIER_MULTIPLIERS)),
+            tier_bonus_points=MappingProxyType(dict(CustomerLoyalty.TIER_BONUS_POINTS)),
+            rewards=rewards,
+        )
+
     @staticmethod
     def get_or_create_customer_loyalty(customer: Customer, program: LoyaltyProgram = None):
         """Получить или создать участие клиента в программе лояльности"""
-        if not program:
-            program = LoyaltyProgram.objects.filter(is_active=True).first()
-            if not program:
+        if program:
+            program_id = program.id
+        else:
+            snapshot = LoyaltyService.get_program_snapshot()
+            if not snapshot:
                 return None
+            program_id = snapshot.id
 
         customer_loyalty, created = CustomerLoyalty.objects.get_or_create(
             customer=customer,
-            program=program,
             defaults={
+                'program_id': program_id,
                 'tier_level': CustomerLoyalty.TierLevel.BRONZE
             }
         )
         return customer_loyalty
 
     @staticmethod
-    def calculate_points_for_order(order: Order) -> int:
-        """Рассчитать количество баллов за заказ"""
-        customer_loyalty = LoyaltyService.get_or_create_customer_loyalty(order.customer)
-        if not customer_loyalty:
-            return 0
-
-        program = customer_loyalty.program
+    def quote_points(order: Order) -> dict:
+        """Расчет баллов без записи: участие клиента не создается"""
+        snapshot = LoyaltyService.get_program_snapshot()
+        tier_level = (
+            CustomerLoyalty.objects.filter(customer_id=order.customer_id)
+            .values_list('tier_level', flat=True)
+            .first()
+        ) or CustomerLoyalty.TierLevel.BRONZE
         order_amount = order.final_cost or order.cost_estimate
+        return {
+            'points': snapshot.points_for(order_amount, tier_level) if snapshot else 0,
+            'tier_level': tier_level,
+            'tier_multiplier': CustomerLoyalty.TIER_MULTIPLIERS.get(tier_level, 1.0),
+            'order_amount': order_amount,
+        }
 
-        # Проверяем минимальную сумму заказа
-        if order_amount < program.min_order_amount:
-            return 0
-
-        # Базовые баллы
-        base_points = int((order_amount * program.earn_rate / 100))
-
-        # Множитель за уровень клиента
-        tier_multiplier = customer_loyalty.get_tier_multiplier()
-
-        total_points = int(base_points * tier_multiplier)
-        return total_points
+    @staticmethod
+    def calculate_points_for_order(order: Order) -> int:
+        """Рассчитать количество баллов за заказ"""
+        return LoyaltyService.quote_points(order)['points']
 
     @staticmethod
     @transaction.atomic
     def award_points_for_order(order: Order):
-        """Начислить баллы за заказ"""
+        """
+        Начислить баллы за заказ.
+        Строка участия блокируется один раз (select_for_update), баланс,
+        уровень и бонусы считаются в памяти и пишутся одним UPDATE.
+        """
         if order.status != 'completed':
             return None
 
-        # Проверяем, не начислялись ли уже баллы за этот заказ
+        snapshot = LoyaltyService.get_program_snapshot()
+        if not snapshot:
+            return None
+
+        # get_or_create: при гонке первых начислений проигравший INSERT
+        # откатывается к savepoint и перечитывает строку под блокировкой
+        customer_loyalty, _ = CustomerLoyalty.objects.select_for_update().get_or_create(
+            customer_id=order.customer_id,
+            defaults={
+                'program_id': snapshot.id,
+                'tier_level': CustomerLoyalty.TierLevel.BRONZE
+            }
+        )
+
+        # Проверяем под блокировкой, не начислялись ли уже баллы за этот заказ
         existing_transaction = PointsTransaction.objects.filter(
             order=order,
             transaction_type=PointsTransaction.TransactionType.EARNED
         ).first()
-
         if existing_transaction:
             return existing_transaction
 
-        customer_loyalty = LoyaltyService.get_or_create_customer_loyalty(order.customer)
-        if not customer_loyalty:
-            return None
-
-        points = LoyaltyService.calculate_points_for_order(order)
+        order_amount = order.final_cost or order.cost_estimate
+        points = snapshot.points_for(order_amount, customer_loyalty.tier_level)
         if points <= 0:
             return None
 
-        # Создаем транзакцию начисления
-        transaction_obj = PointsTransaction.objects.create(
+        transaction_obj = PointsTransaction(
             customer_loyalty=customer_loyalty,
             transaction_type=PointsTransaction.TransactionType.EARNED,
             points=points,
             order=order,
             description=f"Начисление за заказ {order.order_number}",
-            expires_at=LoyaltyService._calculate_expiry_date(customer_loyalty.program)
+            expires_at=snapshot.expiry_date(),
+            remaining_points=points
         )
+        new_transactions = [transaction_obj]
 
         # Обновляем баланс клиента
         customer_loyalty.total_points += points
         customer_loyalty.available_points += points
-        customer_loyalty.total_spent += (order.final_cost or order.cost_estimate)
+        customer_loyalty.total_spent += order_amount
         customer_loyalty.orders_count += 1
 
         # Обновляем уровень клиента
         new_tier = customer_loyalty.calculate_tier()
         if new_tier != customer_loyalty.tier_level:
             customer_loyalty.tier_level = new_tier
-            # Можно добавить бонус за повышение уровня
-            LoyaltyService._award_tier_bonus(customer_loyalty, new_tier)
+            bonus = LoyaltyService._tier_bonus_transaction(customer_loyalty, new_tier, snapshot)
+            if bonus:
+                new_transactions.append(bonus)
 
-        customer_loyalty.save()
+        PointsTransaction.objects.bulk_create(new_transactions)
+        CustomerOverviewService.invalidate(order.customer_id)
+        customer_loyalty.save(update_fields=[
+            'total_points', 'available_points', 'total_spent', 'orders_count',
+            'tier_level', 'last_activity'
+        ])
 
         # Проверяем доступные награды
-        LoyaltyService._check_and_award_rewards(customer_loyalty)
+        LoyaltyService._check_and_award_rewards(customer_loyalty, snapshot)
 
         return transaction_obj
 
     @staticmethod
     @transaction.atomic
     def redeem_points(customer_loyalty: CustomerLoyalty, points: int, order: Order, description: str = ""):
-        """Списать баллы клиента"""
-        if points > customer_loyalty.available_points:
+        """Списать баллы клиента (лоты расходуются FIFO: раньше сгорающие первыми)"""
+        # Блокировка строки участия сериализует списания и сгорание баллов
+        locked = CustomerLoyalty.objects.select_for_update().select_related('program').get(
+            id=customer_loyalty.id
+        )
+        program = locked.program
+
+        if points > locked.available_points:
             raise ValueError("Недостаточно баллов для списания")
 
-        if points < customer_loyalty.program.min_redeem_points:
-            raise ValueError(f"Минимум для списания: {customer_loyalty.program.min_redeem_points} баллов")
+        if points < program.min_redeem_points:
+            raise ValueError(f"Минимум для списания: {program.min_redeem_points} баллов")
 
         # Проверяем максимальный процент оплаты баллами
         order_amount = order.final_cost or order.cost_estimate
-        points_value = Decimal(points) * customer_loyalty.program.point_value
-        max_redeem_amount = order_amount * customer_loyalty.program.max_redeem_percent / 100
+        points_value = Decimal(points) * program.point_value
+        max_redeem_amount = order_amount * program.max_redeem_percent / 100
 
         if points_value > max_redeem_amount:
-            max_points = int(max_redeem_amount / customer_loyalty.program.point_value)
+            max_points = int(max_redeem_amount / program.point_value)
             raise ValueError(f"Максимум можно списать {max_points} баллов")
 
+        LoyaltyService._consume_lots(locked, points)
+
         # Создаем транзакцию списания
         transaction_obj = PointsTransaction.objects.create(
-            customer_loyalty=customer_loyalty,
+            customer_loyalty=locked,
             transaction_type=PointsTransaction.TransactionType.REDEEMED,
             points=-points,
             order=order,
@@ -136,12 +384,34 @@ class LoyaltyService:
         )
 
         # Обновляем баланс
-        customer_loyalty.available_points -= points
-        customer_loyalty.used_points += points
-        customer_loyalty.save()
+        locked.available_points -= points
+        locked.used_points += points
+        locked.save(update_fields=['available_points', 'used_points', 'last_activity'])
 
+        customer_loyalty.available_points = locked.available_points
+        customer_loyalty.used_points = locked.used_points
         return transaction_obj
 
+    @staticmethod
+    def _consume_lots(customer_loyalty: CustomerLoyalty, points: int):
+        """Уменьшить остатки открытых лотов по FIFO (вызывать под блокировкой участия)"""
+        lots = (
+            PointsTransaction.objects.filter(
+                customer_loyalty=customer_loyalty, remaining_points__gt=0
+            )
+            .order_by(models.F('expires_at').asc(nulls_last=True), 'id')
+            .only('id', 'remaining_points')
+        )
+        consumed = []
+        for lot in lots:
+            if points <= 0:
+                break
+            take = min(points, lot.remaining_points)
+            lot.remaining_points -= take
+            points -= take
+            consumed.append(lot)
+        PointsTransaction.objects.bulk_update(consumed, ['remaining_points'])
+
     @staticmethod
     def _calculate_expiry_date(program: LoyaltyProgram):
         """Рассчитать дату истечения баллов"""
@@ -150,98 +420,123 @@ class LoyaltyService:
         return None
 
     @staticmethod
-    def _award_tier_bonus(customer_loyalty: CustomerLoyalty, new_tier: str):
-        """Начислить бонус за повышение уровня"""
-        bonus_points = {
-            CustomerLoyalty.TierLevel.SILVER: 500,
-            CustomerLoyalty.TierLevel.GOLD: 1000,
-            CustomerLoyalty.TierLevel.PLATINUM: 2000
-        }
-
-        points = bonus_points.get(new_tier, 0)
-        if points > 0:
-            PointsTransaction.objects.create(
-                customer_loyalty=customer_loyalty,
-                transaction_type=PointsTransaction.TransactionType.BONUS,
-                points=points,
-                description=f"Бонус за достижение уровня {customer_loyalty.get_tier_level_display()}"
-            )
-
-            customer_loyalty.total_points += points
-            customer_loyalty.available_points += points
+    def _tier_bonus_transaction(customer_loyalty: CustomerLoyalty, new_tier: str, snapshot: ProgramSnapshot):
+        """Бонус за повышение уровня: транзакция (без сохранения) и баланс в памяти"""
+        points = snapshot.tier_bonus_points.get(new_tier, 0)
+        if points <= 0:
+            return None
 
-    @staticmethod
-    def _check_and_award_rewards(customer_loyalty: CustomerLoyalty):
-        """Проверить и выдать доступные награды"""
-        available_rewards = LoyaltyReward.objects.filter(
-            program=customer_loyalty.program,
-            is_active=True,
-            required_points__lte=customer_loyalty.total_points,
-            required_orders_count__lte=customer_loyalty.orders_count
+        customer_loyalty.total_points += points
+        customer_loyalty.available_points += points
+        return PointsTransaction(
+            customer_loyalty=customer_loyalty,
+            transaction_type=PointsTransaction.TransactionType.BONUS,
+            points=points,
+            remaining_points=points,
+            description=f"Бонус за достижение уровня {customer_loyalty.get_tier_level_display()}"
         )
 
-        # Фильтруем по уровню если указан
-        if customer_loyalty.tier_level:
-            tier_hierarchy = {
-                CustomerLoyalty.TierLevel.BRONZE: 1,
-                CustomerLoyalty.TierLevel.SILVER: 2,
-                CustomerLoyalty.TierLevel.GOLD: 3,
-                CustomerLoyalty.TierLevel.PLATINUM: 4
-            }
-            current_tier_level = tier_hierarchy.get(customer_loyalty.tier_level, 1)
-
-            available_rewards = available_rewards.filter(
-                models.Q(required_tier='') |
-                models.Q(required_tier__in=[
-                    tier for tier, level in tier_hierarchy.items()
-                    if level <= current_tier_level
-                ])
-            )
+    @staticmethod
+    def _check_and_award_rewards(customer_loyalty: CustomerLoyalty, snapshot: ProgramSnapshot = None):
+        """Проверить и выдать доступные награды (условия — из снимка программы)"""
+        snapshot = snapshot or LoyaltyService.get_program_snapshot()
+        if not snapshot:
+            return
+        RewardEligibility.grant([customer_loyalty], snapshot.rewards)
 
-        # Проверяем временные ограничения
-        now = timezone.now()
-        available_rewards = available_rewards.filter(
-            models.Q(valid_from__isnull=True) | models.Q(valid_from__lte=now),
-            models.Q(valid_to__isnull=True) | models.Q(valid_to__gte=now)
-        )
+    EXPIRY_CHUNK_SIZE = 5000
 
-        # Выдаем награды, которые клиент еще не получал
-        for reward in available_rewards:
-            existing_reward = CustomerReward.objects.filter(
-                customer_loyalty=customer_loyalty,
-                reward=reward
-            ).first()
-
-            if not existing_reward:
-                CustomerReward.objects.create(
-                    customer_loyalty=customer_loyalty,
-                    reward=reward
+    @staticmethod
+    def expire_points(chunk_size: int = None, now=None) -> dict:
+        """
+        Сгорание баллов (запускается по cron).
+        Просроченные лоты обрабатываются чанками по диапазону id:
+        одна EXPIRED-транзакция на клиента (INSERT ... SELECT ... GROUP BY),
+        баланс — одним UPDATE ... FROM, остатки лотов обнуляются.
+        Исходные транзакции начисления не меняются.
+        """
+        chunk_size = chunk_size or LoyaltyService.EXPIRY_CHUNK_SIZE
+        now = now or timezone.now()
+        stats = {'lots': 0, 'customers': 0, 'points': 0}
+
+        last_id = 0
+        while True:
+            ids = list(
+                PointsTransaction.objects.filter(
+                    remaining_points__gt=0, expires_at__lt=now, id__gt=last_id
                 )
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            chunk = LoyaltyService._expire_chunk(now, ids[0], ids[-1])
+            for key in stats:
+                stats[key] += chunk[key]
+            last_id = ids[-1]
+        return stats
 
     @staticmethod
-    def expire_points():
-        """Списать просроченные баллы (для запуска по cron)"""
-        expired_transactions = PointsTransaction.objects.filter(
-            transaction_type=PointsTransaction.TransactionType.EARNED,
-            expires_at__lt=timezone.now(),
-            points__gt=0
+    @transaction.atomic
+    def _expire_chunk(now, first_id: int, last_id: int) -> dict:
+        lots = PointsTransaction.objects.filter(
+            remaining_points__gt=0, expires_at__lt=now, id__gte=first_id, id__lte=last_id
         )
 
-        for transaction_obj in expired_transactions:
-            if transaction_obj.points > 0:
-                # Создаем транзакцию списания просроченных баллов
-                PointsTransaction.objects.create(
-                    customer_loyalty=transaction_obj.customer_loyalty,
-                    transaction_type=PointsTransaction.TransactionType.EXPIRED,
-                    points=-transaction_obj.points,
-                    description=f"Истечение срока действия баллов от {transaction_obj.created_at.date()}"
-                )
+        # Блокируем участия в порядке id: списание ждет, дедлоков нет
+        customer_ids = list(
+            CustomerLoyalty.objects.select_for_update()
+            .filter(id__in=lots.values('customer_loyalty_id'))
+            .order_by('id')
+            .values_list('customer_id', flat=True)
+        )
 
-                # Обновляем баланс
-                customer_loyalty = transaction_obj.customer_loyalty
-                customer_loyalty.available_points -= transaction_obj.points
-                customer_loyalty.save()
+        condition = 'remaining_points > 0 AND expires_at < %s AND id >= %s AND id <= %s'
+        params = [connection.ops.adapt_datetimefield_value(now), first_id, last_id]
+        lots_table = PointsTransaction._meta.db_table
+        loyalty_table = CustomerLoyalty._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {lots_table}
+                    (customer_loyalty_id, transaction_type, points, description,
+                     created_at, remaining_points)
+                SELECT customer_loyalty_id, %s, -SUM(remaining_points), %s, %s, 0
+                FROM {lots_table}
+                WHERE {condition}
+                GROUP BY customer_loyalty_id
+                """,
+                [
+                    PointsTransaction.TransactionType.EXPIRED,
+                    'Истечение срока действия баллов',
+                    connection.ops.adapt_datetimefield_value(now),
+                    *params,
+                ],
+            )
+            customers = cursor.rowcount
+
+            cursor.execute(
+                f"""
+                UPDATE {loyalty_table}
+                SET available_points = CASE
+                    WHEN {loyalty_table}.available_points > expired.total
+                    THEN {loyalty_table}.available_points - expired.total
+                    ELSE 0
+                END
+                FROM (
+                    SELECT customer_loyalty_id, SUM(remaining_points) AS total
+                    FROM {lots_table}
+                    WHERE {condition}
+                    GROUP BY customer_loyalty_id
+                ) AS expired
+                WHERE {loyalty_table}.id = expired.customer_loyalty_id
+                """,
+                params,
+            )
 
-                # Помечаем транзакцию как обработанную
-                transaction_obj.points = 0
-                transaction_obj.save()
+        points = lots.aggregate(total=models.Sum('remaining_points'))['total'] or 0
+        count = lots.update(remaining_points=0)
+        # Баланс изменен сырым SQL — сигналов не было
+        CustomerOverviewService.invalidate_many(customer_ids)
+        return {'lots': count, 'customers': customers, 'points': points}
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import LoyaltyProgram, LoyaltyReward
+from .services import LoyaltyService
+
+
+@receiver(post_save, sender=LoyaltyProgram)
+@receiver(post_delete, sender=LoyaltyProgram)
+@receiver(post_save, sender=LoyaltyReward)
+@receiver(post_delete, sender=LoyaltyReward)
+def invalidate_program_snapshot(sender, instance, **kwargs):
+    LoyaltyService.invalidate_program_snapshot()
@@ -0,0 +1,254 @@
+import time
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField, Q, Sum
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import CustomerLoyalty, LoyaltyProgram, PointsTransaction
+
+DAY = 86400.0
+TIERS = (
+    CustomerLoyalty.TierLevel.BRONZE,
+    CustomerLoyalty.TierLevel.SILVER,
+    CustomerLoyalty.TierLevel.GOLD,
+    CustomerLoyalty.TierLevel.PLATINUM,
+)
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """Параметры программы, которые проигрывает симулятор"""
+
+    earn_rate: float
+    min_order_amount: float
+    point_value: float
+    points_expire_days: int = None
+    redemption_rate: float = 0.0
+    tier_thresholds: dict = field(
+        default_factory=lambda: {
+            tier: float(threshold)
+            for tier, threshold in CustomerLoyalty.TIER_THRESHOLDS
+        }
+    )
+    tier_multipliers: dict = field(
+        default_factory=lambda: dict(CustomerLoyalty.TIER_MULTIPLIERS)
+    )
+    tier_bonus_points: dict = field(
+        default_factory=lambda: dict(CustomerLoyalty.TIER_BONUS_POINTS)
+    )
+
+    @classmethod
+    def from_program(cls, program: LoyaltyProgram, redemption_rate: float = 0.0):
+        return cls(
+            earn_rate=float(program.earn_rate),
+            min_order_amount=float(program.min_order_amount),
+            point_value=float(program.point_value),
+            points_expire_days=program.points_expire_days,
+            redemption_rate=redemption_rate,
+        )
+
+    def with_overrides(self, **overrides):
+        """Кандидат: текущие параметры + переданные изменения (None — без изменений)"""
+        changes = {key: value for key, value in overrides.items() if value is not None}
+        for name in ("tier_thresholds", "tier_multipliers", "tier_bonus_points"):
+            if name in changes:
+                changes[name] = {**getattr(self, name), **changes[name]}
+        return replace(self, **changes)
+
+
+class LoyaltySimulator:
+    """
+    What-if расчет программы лояльности по истории завершенных заказов.
+    Заказы загружаются один раз в массивы NumPy (клиент, сумма, дата),
+    начисления, рост уровня, бонусы, списания и сгорание проигрываются
+    векторно по клиентам; один прогон — O(n) операций над массивами.
+    С cached=True загруженная история живет в процессе
+    LOYALTY_SIMULATION_CACHE_TTL секунд: серия what-if запросов читает
+    заказы из БД один раз.
+    """
+
+    CHUNK_SIZE = 50000
+    HISTORY_FIELDS = (
+        "now",
+        "since",
+        "ids",
+        "times",
+        "amounts",
+        "customers",
+        "starts",
+        "counts",
+        "initial_spent",
+    )
+
+    # Локальная копия процесса: years -> (monotonic-срок, массивы истории)
+    _history = {}
+
+    def __init__(self, years: int = 2, now=None, cached: bool = False):
+        self.years = years
+        self.cached = cached and now is None
+        self.now = now or timezone.now()
+        self.since = self.now - timedelta(days=365 * years)
+        self.loaded = False
+
+    def load(self):
+        if self.cached:
+            entry = self._history.get(self.years)
+            if entry and entry[0] > time.monotonic():
+                self.__dict__.update(entry[1])
+                self.loaded = True
+                return
+
+        self._load()
+        if self.cached:
+            LoyaltySimulator._history[self.years] = (
+                time.monotonic() + settings.LOYALTY_SIMULATION_CACHE_TTL,
+                {name: getattr(self, name) for name in self.HISTORY_FIELDS},
+            )
+
+    def _load(self):
+        """Заказы окна, отсортированные по (клиент, дата), и траты до окна"""
+        from orders.models import Order
+
+        completed = Order.objects.filter(
+            status=Order.StatusChoices.COMPLETED, completed_at__isnull=False
+        )
+        # Сумма сразу float из БД: без Decimal на каждую строку
+        rows = (
+            completed.filter(completed_at__gte=self.since)
+            .annotate(
+                amount=Cast(Coalesce("final_cost", "cost_estimate"), FloatField())
+            )
+            .order_by()
+            .values_list("customer_id", "completed_at", "amount")
+            .iterator(chunk_size=self.CHUNK_SIZE)
+        )
+        ids, times, amounts = [np.empty(0, np.int64)], [np.empty(0)], [np.empty(0)]
+        while True:
+            chunk = list(islice(rows, self.CHUNK_SIZE))
+            if not chunk:
+                break
+            ids.append(np.fromiter((r[0] for r in chunk), np.int64, len(chunk)))
+            times.append(
+                np.fromiter((r[1].timestamp() for r in chunk), np.float64, len(chunk))
+            )
+            amounts.append(
+                np.fromiter((r[2] or 0 for r in chunk), np.float64, len(chunk))
+            )
+        ids, times = np.concatenate(ids), np.concatenate(times)
+        amounts = np.concatenate(amounts)
+
+        order = np.lexsort((times, ids))
+        self.ids, self.times, self.amounts = ids[order], times[order], amounts[order]
+        self.customers, self.starts, self.counts = np.unique(
+            self.ids, return_index=True, return_counts=True
+        )
+
+        # Уровень на начало окна определяется тратами до него
+        before = dict(
+            completed.filter(completed_at__lt=self.since)
+            .annotate(amount=Coalesce("final_cost", "cost_estimate"))
+            .order_by()
+            .values("customer_id")
+            .annotate(total=Sum("amount"))
+            .values_list("customer_id", "total")
+        )
+        self.initial_spent = np.fromiter(
+            (float(before.get(c, 0) or 0) for c in self.customers.tolist()),
+            np.float64,
+            self.customers.size,
+        )
+        self.loaded = True
+
+    @staticmethod
+    def historical_redemption_rate() -> float:
+        """Доля списанных баллов от начисленных по журналу"""
+        totals = PointsTransaction.objects.aggregate(
+            earned=Coalesce(
+                Sum(
+                    "points",
+                    filter=Q(transaction_type__in=PointsTransaction.LOT_TYPES),
+                ),
+                0,
+            ),
+            redeemed=Coalesce(
+                Sum(
+                    "points",
+                    filter=Q(
+                        transaction_type=PointsTransaction.TransactionType.REDEEMED
+                    ),
+                ),
+                0,
+            ),
+        )
+        if not totals["earned"]:
+            return 0.0
+        return min(-totals["redeemed"] / totals["earned"], 1.0)
+
+    def simulate(self, config: SimulationConfig) -> dict:
+        if not self.loaded:
+            self.load()
+        amounts = self.amounts
+        thresholds = np.array(
+            [config.tier_thresholds.get(tier, np.inf) for tier in TIERS[1:]]
+        )
+        # Уровни с непоследовательными порогами учитываются по возрастанию
+        thresholds = np.maximum.accumulate(thresholds)
+        multipliers = np.array(
+            [config.tier_multipliers.get(tier, 1.0) for tier in TIERS]
+        )
+        bonuses = np.array([config.tier_bonus_points.get(tier, 0) for tier in TIERS])
+
+        # Как в award_points_for_order: заказ без баллов не меняет траты
+        base = np.floor(amounts * config.earn_rate / 100)
+        eligible = (amounts >= config.min_order_amount) & (base > 0)
+        spend = np.where(eligible, amounts, 0.0)
+
+        # Накопленные траты клиента до и после каждого заказа
+        running = np.cumsum(spend)
+        group_base = np.repeat(running[self.starts] - spend[self.starts], self.counts)
+        initial = np.repeat(self.initial_spent, self.counts)
+        spent_before = running - spend - group_base + initial
+        spent_after = spent_before + spend
+
+        tier_before = np.searchsorted(thresholds, spent_before, side="right")
+        tier_after = np.searchsorted(thresholds, spent_after, side="right")
+
+        points = np.where(eligible, np.floor(base * multipliers[tier_before]), 0)
+        bonus = np.where(eligible & (tier_after > tier_before), bonuses[tier_after], 0)
+
+        # Списания — доля каждого лота, остаток лота сгорает по сроку
+        kept = 1.0 - config.redemption_rate
+        if config.points_expire_days:
+            expired_mask = (
+                self.times + config.points_expire_days * DAY <= self.now.timestamp()
+            )
+        else:
+            expired_mask = np.zeros(amounts.size, dtype=bool)
+        earned = float(points.sum())
+        bonus_total = float(bonus.sum())
+        expired = float(points[expired_mask].sum()) * kept
+        liability = (earned + bonus_total) * kept - expired
+
+        if self.customers.size:
+            final_tier = np.maximum.reduceat(tier_after, self.starts)
+        else:
+            final_tier = np.empty(0, np.int64)
+        distribution = np.bincount(final_tier, minlength=len(TIERS))
+        return {
+            "orders": int(amounts.size),
+            "customers": int(self.customers.size),
+            "earned_points": int(earned),
+            "bonus_points": int(bonus_total),
+            "redeemed_points": int((earned + bonus_total) * config.redemption_rate),
+            "expired_points": int(expired),
+            "liability_points": int(liability),
+            "liability_amount": round(liability * config.point_value, 2),
+            "tier_distribution": {
+                str(tier): int(count) for tier, count in zip(TIERS, distribution)
+            },
+        }
@@ -1,9 +1,20 @@
 from celery import shared_task
 
-from loyalty.services import LoyaltyService
+from loyalty.ledger import LoyaltyLedger
+from loyalty.services import LoyaltyService, RewardEligibility
 
 
 @shared_task(name="loyalty.tasks.expire_points")
 def expire_points():
-    LoyaltyService.expire_points()
-    return {"status": "ok"}
+    stats = LoyaltyService.expire_points()
+    return {"status": "ok", **stats}
+
+
+@shared_task(name="loyalty.tasks.reconcile_ledger")
+def reconcile_ledger():
+    return LoyaltyLedger().run()
+
+
+@shared_task(name="loyalty.tasks.evaluate_new_rewards")
+def evaluate_new_rewards():
+    return RewardEligibility.evaluate_launched()
@@ -1,12 +1,16 @@
 # backend/notifications/consumers.py
+import asyncio
 import json
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
-from django.utils import timezone
 
-from .models import Notification
+from .counters import UnreadCounter
+from .live import DashboardStream
+from .services import notification_service
 
 User = get_user_model()
 
@@ -20,54 +24,37 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        # Создаем группу для пользователя
-        self.user_group_name = f"user_{self.user.id}"
-
-        # Присоединяемся к группе пользователя
-        await self.channel_layer.group_add(
-            self.user_group_name,
-            self.channel_name
-        )
-
-        # Если у пользователя есть магазин, присоединяемся к группе магазина
-        if hasattr(self.user, 'current_shop') and self.user.current_shop:
-            self.shop_group_name = f"shop_{self.user.current_shop.id}"
-            await self.channel_layer.group_add(
-                self.shop_group_name,
-                self.channel_name
-            )
-
-        # Если у пользователя есть роль, присоединяемся к группе роли
-        if hasattr(self.user, 'role') and self.user.role:
-            self.role_group_name = f"role_{self.user.role.code}"
-            await self.channel_layer.group_add(
-                self.role_group_name,
-                self.channel_name
-            )
+        # Контекст (роль, магазины) загружен middleware заранее: обращения
+        # к ленивым FK в async-коде блокировали бы цикл событий
+        self.group_names = self.get_group_names()
+        await asyncio.gather(*(
+            self.channel_layer.group_add(group_name, self.channel_name)
+            for group_name in self.group_names
+        ))
 
         await self.accept()
 
-        # Отправляем непрочитанные уведомления
-        await self.send_unread_notifications()
+        # Отправляем пропущенное одним кадром (last_id — из query string)
+        await self.send_backlog(self.get_resume_id())
 
     async def disconnect(self, close_code):
         # Покидаем все группы
-        await self.channel_layer.group_discard(
-            self.user_group_name,
-            self.channel_name
-        )
-
-        if hasattr(self, 'shop_group_name'):
-            await self.channel_layer.group_discard(
-                self.shop_group_name,
-                self.channel_name
-            )
-
-        if hasattr(self, 'role_group_name'):
-            await self.channel_layer.group_discard(
-                self.role_group_name,
-                self.channel_name
-            )
+        await asyncio.gather(*(
+            self.channel_layer.group_discard(group_name, self.channel_name)
+            for group_name in getattr(self, 'group_names', [])
+        ))
+
+    def get_group_names(self):
+        """Группы пользователя: личная, доступных магазинов, роли и роли в магазине"""
+        group_names = [f"user_{self.user.id}"]
+        role_code = self.user.socket_role_code
+        if role_code:
+            group_names.append(f"role_{role_code}")
+        for shop_id in self.user.socket_shop_ids:
+            group_names.append(f"shop_{shop_id}")
+            if role_code:
+                group_names.append(f"shop_{shop_id}_role_{role_code}")
+        return group_names
 
     async def receive(self, text_data):
         try:
@@ -81,6 +68,10 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 await self.mark_all_notifications_as_read()
             elif action == 'get_unread_count':
                 await self.send_unread_count()
+            elif action == 'resume':
+                await self.send_backlog(data.get('last_id'))
+            elif action == 'subscribe_dashboard':
+                await self.subscribe_dashboard(data.get('shop_id'))
 
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({
@@ -94,14 +85,48 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'notification': event['notification']
         }))
 
-    async def send_unread_notifications(self):
-        """Отправить непрочитанные уведомления"""
-        notifications = await self.get_unread_notifications()
-        for notification in notifications:
-            await self.send(text_data=json.dumps({
-                'type': 'notification',
-                'notification': notification
-            }))
+    async def dashboard_delta(self, event):
+        """Дельта дашбордов остатков и заказов магазина"""
+        await self.send(text_data=json.dumps({
+            'type': 'dashboard_delta',
+            'delta': event['delta']
+        }))
+
+    async def subscribe_dashboard(self, shop_id=None):
+        """Подписка на дельты дашбордов доступных магазинов (или одного из них)"""
+        shop_ids = [
+            sid for sid in self.user.socket_shop_ids
+            if shop_id is None or sid == shop_id
+        ]
+        group_names = [
+            DashboardStream.group_name(sid) for sid in shop_ids
+            if DashboardStream.group_name(sid) not in self.group_names
+        ]
+        self.group_names.extend(group_names)
+        await asyncio.gather(*(
+            self.channel_layer.group_add(group_name, self.channel_name)
+            for group_name in group_names
+        ))
+        await self.send(text_data=json.dumps({
+            'type': 'dashboard_subscribed',
+            'shop_ids': shop_ids
+        }))
+
+    def get_resume_id(self):
+        """Последний полученный клиентом id: ?last_id=<id> при подключении"""
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            return int(params['last_id'][0])
+        except (KeyError, ValueError):
+            return None
+
+    async def send_backlog(self, last_id=None):
+        """Отправить пропущенные уведомления одним кадром"""
+        backlog = await self.get_backlog(last_id)
+        await self.send(text_data=json.dumps({
+            'type': 'backlog',
+            **backlog
+        }))
 
     async def send_unread_count(self):
         """Отправить количество непрочитанных уведомлений"""
@@ -112,61 +137,21 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         }))
 
     @database_sync_to_async
-    def get_unread_notifications(self):
-        """Получить непрочитанные уведомления пользователя"""
-        notifications = Notification.objects.filter(
-            recipient=self.user,
-            is_read=False
-        ).select_related('notification_type')[:10]
-
-        return [
-            {
-                'id': notification.id,
-                'title': notification.title,
-                'message': notification.message,
-                'priority': notification.priority,
-                'type': notification.notification_type.code,
-                'icon': notification.notification_type.icon,
-                'color': notification.notification_type.color,
-                'action_url': notification.action_url,
-                'created_at': notification.created_at.isoformat(),
-                'data': notification.data
-            }
-            for notification in notifications
-        ]
+    def get_backlog(self, last_id):
+        """Пропущенные уведомления пользователя: один индексный запрос"""
+        return notification_service.backlog(self.user, last_id)
 
     @database_sync_to_async
     def get_unread_count(self):
-        """Получить количество непрочитанных уведомлений"""
-        return Notification.objects.filter(
-            recipient=self.user,
-            is_read=False
-        ).count()
+        """Получить количество непрочитанных уведомлений (счетчик в кэше)"""
+        return UnreadCounter.get(self.user.id)
 
     @database_sync_to_async
     def mark_notification_as_read(self, notification_id):
         """Пометить уведомление как прочитанное"""
-        try:
-            notification = Notification.objects.get(
-                id=notification_id,
-                recipient=self.user
-            )
-            if not notification.is_read:
-                notification.is_read = True
-                notification.read_at = timezone.now()
-                notification.save()
-            return True
-        except Notification.DoesNotExist:
-            return False
+        return bool(notification_service.mark_read(self.user, [notification_id]))
 
     @database_sync_to_async
     def mark_all_notifications_as_read(self):
         """Пометить все уведомления как прочитанные"""
-        from django.utils import timezone
-        Notification.objects.filter(
-            recipient=self.user,
-            is_read=False
-        ).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        notification_service.mark_read(self.user)
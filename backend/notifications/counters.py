@@ -0,0 +1,51 @@
+from django.core.cache import cache
+
+from .models import Notification
+
+
+class UnreadCounter:
+    """
+    Счетчики непрочитанных уведомлений пользователей в кэше (Redis).
+    incr/decr атомарны; отсутствующий счетчик не создается инкрементом,
+    а пересчитывается из БД при следующем чтении.
+    """
+
+    KEY = "notifications:unread:{}"
+    TTL = 60 * 60 * 24
+
+    @classmethod
+    def get(cls, user_id: int) -> int:
+        key = cls.KEY.format(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = Notification.objects.filter(
+                recipient_id=user_id, is_read=False
+            ).count()
+            # add: инкремент, успевший создать ключ раньше, не затирается
+            if not cache.add(key, count, cls.TTL):
+                count = cache.get(key, count)
+        return count
+
+    @classmethod
+    def incr_many(cls, user_ids):
+        for user_id in user_ids:
+            try:
+                cache.incr(cls.KEY.format(user_id))
+            except ValueError:
+                # Счетчика нет — будет пересчитан при чтении
+                pass
+
+    @classmethod
+    def decr(cls, user_id: int, delta: int):
+        if delta <= 0:
+            return
+        key = cls.KEY.format(user_id)
+        try:
+            if cache.decr(key, delta) < 0:
+                cache.delete(key)
+        except ValueError:
+            pass
+
+    @classmethod
+    def reset(cls, user_id: int):
+        cache.delete(cls.KEY.format(user_id))
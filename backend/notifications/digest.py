@@ -0,0 +1,221 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Notification, NotificationSettings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_RANK = {
+    Notification.Priority.LOW: 0,
+    Notification.Priority.NORMAL: 1,
+    Notification.Priority.HIGH: 2,
+    Notification.Priority.URGENT: 3,
+}
+# Сразу (в обход окна) доставляются эти приоритеты; срочные — и в тихие часы
+IMMEDIATE_PRIORITIES = (Notification.Priority.HIGH, Notification.Priority.URGENT)
+
+
+def in_quiet_hours(start, end, now=None) -> bool:
+    """Попадает ли текущее локальное время в тихие часы (в т.ч. через полночь)"""
+    if not start or not end or start == end:
+        return False
+    current = timezone.localtime(now).time()
+    if start < end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+def seconds_until(end, now=None) -> int:
+    """Секунд до ближайшего наступления локального времени end"""
+    local = timezone.localtime(now)
+    target = local.replace(
+        hour=end.hour, minute=end.minute, second=end.second, microsecond=0
+    )
+    if target <= local:
+        target += timedelta(days=1)
+    return int((target - local).total_seconds()) + 1
+
+
+class NotificationDigest:
+    """
+    Коалесцирование уведомлений низкого приоритета.
+    События одного типа и объекта для одного адресата (пользователь,
+    магазин или роль) копятся в кэше (Redis) и доставляются одним
+    уведомлением-дайджестом через окно или по достижении лимита событий.
+    Тихие часы получателя откладывают доставку до их окончания.
+
+    Ключи корзины: :seq — счетчик событий (incr атомарен), :<n> — событие,
+    :flushed — сколько уже доставлено, :scheduled — флаг запланированной
+    доставки, :lock — блокировка доставки.
+    """
+
+    KEY_PREFIX = "notifications:digest"
+    BUFFER_TTL = 60 * 60 * 48
+    LOCK_TTL = 60
+    MAX_LISTED = 5
+    MAX_ITEMS = 20
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return settings.NOTIFICATIONS_DIGEST_WINDOW > 0
+
+    @classmethod
+    def should_buffer(cls, priority: str, quiet: bool) -> bool:
+        if priority == Notification.Priority.URGENT:
+            return False
+        if quiet:
+            return True
+        return cls.enabled() and priority not in IMMEDIATE_PRIORITIES
+
+    @classmethod
+    def bucket_key(cls, meta: dict) -> str:
+        target = (
+            f"user_{meta['recipient_id']}"
+            if meta.get("recipient_id")
+            else f"shop_{meta['shop_id']}"
+            if meta.get("shop_id")
+            else f"role_{meta['role_code']}"
+        )
+        return ":".join(
+            [
+                cls.KEY_PREFIX,
+                target,
+                meta["type"],
+                meta.get("related_object_type") or "-",
+                str(meta.get("related_object_id") or "-"),
+            ]
+        )
+
+    @classmethod
+    def add(cls, meta: dict, event: dict, delay: int = None):
+        """
+        Положить событие в корзину адресата (вызывается после коммита).
+        Первое событие планирует доставку через окно (или delay — конец
+        тихих часов), событие сверх лимита запускает доставку сразу.
+        """
+        bucket = cls.bucket_key(meta)
+        seq_key = f"{bucket}:seq"
+        cache.add(seq_key, 0, cls.BUFFER_TTL)
+        seq = cache.incr(seq_key)
+        cache.set(f"{bucket}:{seq}", event, cls.BUFFER_TTL)
+        cache.touch(seq_key, cls.BUFFER_TTL)
+        cache.touch(f"{bucket}:flushed", cls.BUFFER_TTL)
+
+        if cache.add(f"{bucket}:scheduled", 1, cls.BUFFER_TTL):
+            try:
+                cls.schedule(
+                    bucket, meta, delay or settings.NOTIFICATIONS_DIGEST_WINDOW
+                )
+            except Exception as e:
+                # Вызов идет из on_commit: сбой брокера не должен ронять запрос.
+                # События остаются в корзине, следующее снова запланирует доставку
+                logger.exception("Notification digest schedule failed: %s", e)
+                cache.delete(f"{bucket}:scheduled")
+        elif seq - cache.get(f"{bucket}:flushed", 0) >= (
+            settings.NOTIFICATIONS_DIGEST_MAX_EVENTS
+        ):
+            try:
+                cls.schedule(bucket, meta, 0)
+            except Exception as e:
+                # Доставка по окну уже запланирована — корзина не потеряется
+                logger.exception("Notification digest schedule failed: %s", e)
+
+    @staticmethod
+    def schedule(bucket: str, meta: dict, countdown: int):
+        from .tasks import flush_notification_digest
+
+        flush_notification_digest.apply_async(
+            args=[bucket, meta], countdown=countdown, retry=False
+        )
+
+    @classmethod
+    def flush(cls, bucket: str, meta: dict):
+        """Доставить накопленные события корзины одним уведомлением"""
+        if meta.get("recipient_id"):
+            quiet = (
+                NotificationSettings.objects.filter(user_id=meta["recipient_id"])
+                .values_list("quiet_hours_start", "quiet_hours_end")
+                .first()
+            )
+            if quiet and in_quiet_hours(*quiet):
+                cls.schedule(bucket, meta, seconds_until(quiet[1]))
+                return None
+
+        if not cache.add(f"{bucket}:lock", 1, cls.LOCK_TTL):
+            return None
+        try:
+            seq = cache.get(f"{bucket}:seq", 0)
+            start = cache.get(f"{bucket}:flushed", 0)
+            keys = [f"{bucket}:{n}" for n in range(start + 1, seq + 1)]
+            events = cache.get_many(keys)
+            cache.set(f"{bucket}:flushed", seq, cls.BUFFER_TTL)
+            cache.delete_many(keys + [f"{bucket}:scheduled"])
+        finally:
+            cache.delete(f"{bucket}:lock")
+
+        # События, пришедшие во время доставки, не запланировали себя сами
+        if cache.get(f"{bucket}:seq", 0) > seq and cache.add(
+            f"{bucket}:scheduled", 1, cls.BUFFER_TTL
+        ):
+            cls.schedule(bucket, meta, settings.NOTIFICATIONS_DIGEST_WINDOW)
+
+        ordered = [events[key] for key in keys if key in events]
+        if seq <= start or not ordered:
+            return None
+        return cls.deliver(meta, ordered, seq - start)
+
+    @classmethod
+    def deliver(cls, meta: dict, events: list, count: int):
+        from .services import notification_service
+
+        notification_type = notification_service.get_type(meta["type"])
+        if notification_type is None:
+            return None
+
+        latest = events[-1]
+        if count == 1:
+            title, message, data = latest["title"], latest["message"], latest["data"]
+        else:
+            title = f"{latest['title']} (+{count - 1})"
+            message = "\n".join(event["message"] for event in events[-cls.MAX_LISTED :])
+            data = {
+                "digest": True,
+                "count": count,
+                "items": [event["data"] for event in events[-cls.MAX_ITEMS :]],
+            }
+        notification = Notification.objects.create(
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            recipient_id=meta.get("recipient_id"),
+            shop_id=meta.get("shop_id"),
+            role_code=meta.get("role_code") or "",
+            priority=max(
+                (event["priority"] for event in events), key=PRIORITY_RANK.get
+            ),
+            related_object_type=meta.get("related_object_type") or "",
+            related_object_id=meta.get("related_object_id"),
+            data=data,
+            action_url=latest["action_url"],
+            created_by_id=latest["created_by_id"],
+            is_sent=True,
+            sent_at=timezone.now(),
+        )
+        notification_service.send_notification(notification)
+        return notification
+
+    @staticmethod
+    def event(title, message, priority, data, action_url, created_by_id) -> dict:
+        return {
+            "title": title,
+            "message": message,
+            "priority": priority,
+            "data": data or {},
+            "action_url": action_url or "",
+            "created_by_id": created_by_id,
+            "created_at": timezone.now().isoformat(),
+        }
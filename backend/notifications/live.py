@@ -0,0 +1,158 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardStream:
+    """
+    Дельты дашбордов остатков и заказов магазина по WebSocket.
+    События (движение остатка, смена статуса заказа) копятся в кэше
+    (Redis), за окно NOTIFICATIONS_LIVE_WINDOW_MS сливаются в одно
+    сообщение на магазин и рассылаются группе dashboard_<shop_id>:
+
+        {"shop_id": 1,
+         "stock": {"<item_id>": {"item_id", "category_id", "quantity",
+                   "available_quantity", "low_stock"}},
+         "totals": {"total_quantity": +n, "low_stock_count": +n},
+         "order_status_counts": {"ready": +1, "in_repair": -1}}
+
+    Клиент загружает агрегаты один раз и дальше применяет дельты.
+    Ключи магазина: :seq — счетчик событий, :<n> — событие, :flushed —
+    сколько уже отправлено, :scheduled — флаг запланированной отправки.
+    """
+
+    KEY_PREFIX = "live:dashboard"
+    BUFFER_TTL = 60 * 10
+
+    @staticmethod
+    def group_name(shop_id: int) -> str:
+        return f"dashboard_{shop_id}"
+
+    @classmethod
+    def stock_changed(cls, balance, quantity_before: int, available_before: int):
+        """Движение по остатку (вызывается в транзакции движения)"""
+        event = {
+            "kind": "stock",
+            "item_id": balance.item_id,
+            "category_id": balance.item.category_id,
+            "quantity": balance.quantity,
+            "available_quantity": balance.available_quantity,
+            "quantity_change": balance.quantity - quantity_before,
+            "low_before": available_before <= balance.min_quantity,
+            "low_stock": balance.available_quantity <= balance.min_quantity,
+        }
+        shop_id = balance.shop_id
+        transaction.on_commit(lambda: cls.add(shop_id, event))
+
+    @classmethod
+    def order_status_changed(cls, shop_id: int, old_status: str, new_status: str):
+        """Заказ сменил статус; None — заказ создан или удален"""
+        if old_status == new_status:
+            return
+        event = {"kind": "order", "old": old_status, "new": new_status}
+        transaction.on_commit(lambda: cls.add(shop_id, event))
+
+    @classmethod
+    def add(cls, shop_id: int, event: dict):
+        if not settings.NOTIFICATIONS_LIVE_WINDOW_MS:
+            return
+        bucket = f"{cls.KEY_PREFIX}:{shop_id}"
+        seq_key = f"{bucket}:seq"
+        cache.add(seq_key, 0, cls.BUFFER_TTL)
+        seq = cache.incr(seq_key)
+        cache.set(f"{bucket}:{seq}", event, cls.BUFFER_TTL)
+        cache.touch(seq_key, cls.BUFFER_TTL)
+        cache.touch(f"{bucket}:flushed", cls.BUFFER_TTL)
+
+        # Одна отправка на окно: остальные события окна только копятся
+        if cache.add(f"{bucket}:scheduled", 1, cls.BUFFER_TTL):
+            try:
+                cls.schedule(shop_id)
+            except Exception as e:
+                # Дельты — best effort: сбой брокера не должен ломать сохранение
+                # заказа или движения, клиент догонит при перезагрузке дашборда
+                logger.exception("Dashboard delta schedule failed: %s", e)
+                cache.delete(f"{bucket}:scheduled")
+
+    @staticmethod
+    def schedule(shop_id: int):
+        from .tasks import flush_dashboard_deltas
+
+        flush_dashboard_deltas.apply_async(
+            args=[shop_id],
+            countdown=settings.NOTIFICATIONS_LIVE_WINDOW_MS / 1000,
+            retry=False,
+        )
+
+    @classmethod
+    def flush(cls, shop_id: int):
+        """Слить события окна в одну дельту и разослать подписчикам магазина"""
+        bucket = f"{cls.KEY_PREFIX}:{shop_id}"
+        seq = cache.get(f"{bucket}:seq", 0)
+        start = cache.get(f"{bucket}:flushed", 0)
+        if start > seq:
+            # Счетчик истек раньше отметки об отправке — начат заново
+            start = 0
+        keys = [f"{bucket}:{n}" for n in range(start + 1, seq + 1)]
+        events = cache.get_many(keys)
+        cache.set(f"{bucket}:flushed", seq, cls.BUFFER_TTL)
+        cache.delete_many(keys + [f"{bucket}:scheduled"])
+
+        # События, пришедшие во время отправки, не запланировали себя сами
+        if cache.get(f"{bucket}:seq", 0) > seq and cache.add(
+            f"{bucket}:scheduled", 1, cls.BUFFER_TTL
+        ):
+            cls.schedule(shop_id)
+
+        delta = cls.merge(shop_id, [events[key] for key in keys if key in events])
+        if delta is None:
+            return None
+        async_to_sync(get_channel_layer().group_send)(
+            cls.group_name(shop_id), {"type": "dashboard.delta", "delta": delta}
+        )
+        return delta
+
+    @staticmethod
+    def merge(shop_id: int, events: list):
+        """Свернуть события: итог по товару, суммы по счетчикам"""
+        if not events:
+            return None
+        stock, status_counts = {}, {}
+        total_quantity = low_stock_count = 0
+        for event in events:
+            if event["kind"] == "stock":
+                item = stock.setdefault(
+                    str(event["item_id"]), {"low_before": event["low_before"]}
+                )
+                item.update(
+                    item_id=event["item_id"],
+                    category_id=event["category_id"],
+                    quantity=event["quantity"],
+                    available_quantity=event["available_quantity"],
+                    low_stock=event["low_stock"],
+                )
+                total_quantity += event["quantity_change"]
+            else:
+                for status, change in ((event["old"], -1), (event["new"], 1)):
+                    if status:
+                        status_counts[status] = status_counts.get(status, 0) + change
+
+        for item in stock.values():
+            low_stock_count += int(item["low_stock"]) - int(item.pop("low_before"))
+        return {
+            "shop_id": shop_id,
+            "stock": stock,
+            "totals": {
+                "total_quantity": total_quantity,
+                "low_stock_count": low_stock_count,
+            },
+            "order_status_counts": {
+                status: change for status, change in status_counts.items() if change
+            },
+        }
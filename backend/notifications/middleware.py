@@ -0,0 +1,100 @@
+from urllib.parse import parse_qs
+
+import jwt
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import F
+
+User = get_user_model()
+
+CONTEXT_CACHE_KEY = "notifications:ws:user:{}"
+CONTEXT_TTL = 60 * 5
+
+
+def get_token(scope) -> str:
+    """JWT из ?token=<jwt> (браузерный WebSocket) или заголовка Authorization"""
+    params = parse_qs(scope.get("query_string", b"").decode())
+    if params.get("token"):
+        return params["token"][0]
+    headers = dict(scope.get("headers", []))
+    scheme, _, token = headers.get(b"authorization", b"").decode().partition(" ")
+    return token if scheme.lower() == "bearer" else None
+
+
+def load_user_context(user_id: int):
+    """
+    Пользователь с ролью и id доступных магазинов одним запросом
+    (строка на магазин). В кэше между подключениями — только id, код
+    роли и магазины: без хэша пароля и прочих полей модели.
+    """
+    key = CONTEXT_CACHE_KEY.format(user_id)
+    context = cache.get(key)
+    if context is None:
+        context = fetch_user_context(user_id)
+        if context is None:
+            return None
+        cache.set(key, context, CONTEXT_TTL)
+    return build_socket_user(context)
+
+
+def fetch_user_context(user_id: int):
+    """Кэшируемый контекст сокета: id, код роли и доступные магазины"""
+    rows = list(
+        User.objects.filter(id=user_id, is_active=True)
+        .select_related("role")
+        .annotate(
+            shop_ref=F("usershop__shop_id"),
+            shop_active=F("usershop__shop__is_active"),
+        )
+    )
+    if not rows:
+        return None
+    user = rows[0]
+    shop_ids = {row.shop_ref for row in rows if row.shop_ref and row.shop_active}
+    if user.current_shop_id:
+        shop_ids.add(user.current_shop_id)
+    return {
+        "id": user.id,
+        "role_code": user.role.code if user.role_id else None,
+        "shop_ids": sorted(shop_ids),
+    }
+
+
+def build_socket_user(context: dict):
+    """Несохраняемый User только с id: его хватает фильтрам recipient=user"""
+    user = User(id=context["id"], is_active=True)
+    user.socket_role_code = context["role_code"]
+    user.socket_shop_ids = context["shop_ids"]
+    return user
+
+
+def invalidate_user_context(user_id: int):
+    cache.delete(CONTEXT_CACHE_KEY.format(user_id))
+
+
+def invalidate_user_contexts(user_ids):
+    cache.delete_many([CONTEXT_CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
+@database_sync_to_async
+def get_socket_user(token: str):
+    if not token:
+        return AnonymousUser()
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
+        return AnonymousUser()
+    user_id = payload.get("user_id")
+    return (user_id and load_user_context(user_id)) or AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Аутентификация WebSocket тем же JWT, что и REST API"""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope, user=await get_socket_user(get_token(scope)))
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0002_feed_index"),
+        ("shops", "0002_organization_shopsettings_pos_barcode_enabled_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "id"], name="notifications_resume_idx"
+            ),
+        ),
+    ]
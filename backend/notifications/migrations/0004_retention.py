@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_policy(apps, schema_editor):
+    # Прочитанные уведомления низкого приоритета хранятся 30 дней
+    NotificationRetentionPolicy = apps.get_model(
+        "notifications", "NotificationRetentionPolicy"
+    )
+    NotificationRetentionPolicy.objects.create(priority="low", days=30)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0003_resume_index"),
+        ("shops", "0002_organization_shopsettings_pos_barcode_enabled_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(verbose_name="Месяц")),
+                ("first_id", models.BigIntegerField(verbose_name="Первый ID")),
+                ("last_id", models.BigIntegerField(verbose_name="Последний ID")),
+                ("count", models.PositiveIntegerField(verbose_name="Количество")),
+                ("data", models.BinaryField(verbose_name="Данные (gzip)")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Архив уведомлений",
+                "verbose_name_plural": "Архивы уведомлений",
+                "db_table": "notification_archives",
+            },
+        ),
+        migrations.CreateModel(
+            name="NotificationRetentionPolicy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "priority",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("low", "Низкий"),
+                            ("normal", "Обычный"),
+                            ("high", "Высокий"),
+                            ("urgent", "Срочный"),
+                        ],
+                        help_text="Пусто — любой приоритет",
+                        max_length=20,
+                        verbose_name="Приоритет",
+                    ),
+                ),
+                ("days", models.PositiveIntegerField(verbose_name="Хранить, дней")),
+                (
+                    "include_unread",
+                    models.BooleanField(
+                        default=False, verbose_name="Включая непрочитанные"
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(default=True, verbose_name="Активна"),
+                ),
+            ],
+            options={
+                "verbose_name": "Срок хранения уведомлений",
+                "verbose_name_plural": "Сроки хранения уведомлений",
+                "db_table": "notification_retention_policies",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="notificatio_recipie_583549_idx",
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["recipient", "-created_at", "-id"],
+                name="notifications_unread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationarchive",
+            index=models.Index(
+                fields=["month", "first_id"], name="notificatio_month_8c734e_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="notificationretentionpolicy",
+            name="notification_type",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Пусто — все типы",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="retention_policies",
+                to="notifications.notificationtype",
+                verbose_name="Тип уведомления",
+            ),
+        ),
+        migrations.RunPython(create_default_policy, migrations.RunPython.noop),
+    ]
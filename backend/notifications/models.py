@@ -1,4 +1,7 @@
 
+import gzip
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from shops.models import Shop
@@ -100,15 +103,87 @@ class Notification(models.Model):
         verbose_name_plural = 'Уведомления'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['recipient', 'is_read']),
+            # Непрочитанные пользователя (счетчик, лента по умолчанию): частичный
+            # индекс не растет вместе с прочитанной историей
+            models.Index(
+                fields=['recipient', '-created_at', '-id'],
+                condition=models.Q(is_read=False),
+                name='notifications_unread_idx'
+            ),
             models.Index(fields=['shop', 'is_read']),
             models.Index(fields=['created_at']),
+            # Лента пользователя: keyset по (created_at, id)
+            models.Index(
+                fields=['recipient', '-created_at', '-id'],
+                name='notifications_feed_idx'
+            ),
+            # Догрузка пропущенного при переподключении WebSocket: id > last_id
+            models.Index(
+                fields=['recipient', 'id'],
+                name='notifications_resume_idx'
+            ),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.recipient or 'Всем'}"
 
 
+class NotificationRetentionPolicy(models.Model):
+    """Срок хранения уведомлений: старше days — в архив и удаление"""
+    notification_type = models.ForeignKey(
+        NotificationType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='retention_policies',
+        verbose_name="Тип уведомления",
+        help_text="Пусто — все типы"
+    )
+    priority = models.CharField(
+        "Приоритет",
+        max_length=20,
+        choices=Notification.Priority.choices,
+        blank=True,
+        help_text="Пусто — любой приоритет"
+    )
+    days = models.PositiveIntegerField("Хранить, дней")
+    include_unread = models.BooleanField("Включая непрочитанные", default=False)
+    is_active = models.BooleanField("Активна", default=True)
+
+    class Meta:
+        db_table = 'notification_retention_policies'
+        verbose_name = 'Срок хранения уведомлений'
+        verbose_name_plural = 'Сроки хранения уведомлений'
+
+    def __str__(self):
+        return f"{self.notification_type or 'Все типы'}: {self.days} дн."
+
+
+class NotificationArchive(models.Model):
+    """Архив удаленных уведомлений: чанк за месяц, JSON Lines в gzip"""
+    month = models.DateField("Месяц")
+    first_id = models.BigIntegerField("Первый ID")
+    last_id = models.BigIntegerField("Последний ID")
+    count = models.PositiveIntegerField("Количество")
+    data = models.BinaryField("Данные (gzip)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'notification_archives'
+        verbose_name = 'Архив уведомлений'
+        verbose_name_plural = 'Архивы уведомлений'
+        indexes = [
+            models.Index(fields=['month', 'first_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.count}"
+
+    def rows(self):
+        """Уведомления чанка в виде словарей"""
+        return [json.loads(line) for line in gzip.decompress(self.data).splitlines()]
+
+
 class NotificationSettings(models.Model):
     """Настройки уведомлений пользователя"""
     user = models.OneToOneField(
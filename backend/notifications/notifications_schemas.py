@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from ninja import Schema
 
@@ -16,3 +16,29 @@ class NotificationSchema(Schema):
     action_url: Optional[str] = None
     created_at: datetime
     data: Optional[Dict] = None
+    is_read: bool = False
+
+    @staticmethod
+    def resolve_type(obj):
+        return obj.notification_type.code
+
+    @staticmethod
+    def resolve_icon(obj):
+        return obj.notification_type.icon
+
+    @staticmethod
+    def resolve_color(obj):
+        return obj.notification_type.color
+
+
+class NotificationFeedSchema(Schema):
+    items: List[NotificationSchema]
+    next_cursor: Optional[str] = None
+
+
+class UnreadCountSchema(Schema):
+    count: int
+
+
+class MarkReadSchema(Schema):
+    ids: List[int]
@@ -0,0 +1,124 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import UnreadCounter
+from .models import Notification, NotificationArchive, NotificationRetentionPolicy
+
+ARCHIVE_FIELDS = (
+    "id",
+    "notification_type_id",
+    "title",
+    "message",
+    "priority",
+    "recipient_id",
+    "shop_id",
+    "role_code",
+    "related_object_type",
+    "related_object_id",
+    "data",
+    "action_url",
+    "is_read",
+    "is_sent",
+    "sent_at",
+    "read_at",
+    "created_at",
+    "created_by_id",
+)
+
+
+class NotificationRetention:
+    """
+    Применение сроков хранения уведомлений.
+    Уведомления, попавшие под активную политику, обрабатываются чанками
+    по id: чанк сжимается в NotificationArchive (строка на месяц создания)
+    и удаляется одним DELETE по списку id в той же транзакции.
+    """
+
+    CHUNK_SIZE = 5000
+
+    def __init__(self, chunk_size: int = None, now=None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.now = now or timezone.now()
+
+    def run(self) -> dict:
+        stats = {"policies": 0, "archived": 0, "chunks": 0}
+        policies = NotificationRetentionPolicy.objects.filter(is_active=True)
+        for policy in policies:
+            archived, chunks = self.apply(policy)
+            stats["policies"] += 1
+            stats["archived"] += archived
+            stats["chunks"] += chunks
+        return stats
+
+    def expired(self, policy: NotificationRetentionPolicy):
+        queryset = Notification.objects.filter(
+            created_at__lt=self.now - timedelta(days=policy.days)
+        )
+        if policy.notification_type_id:
+            queryset = queryset.filter(notification_type_id=policy.notification_type_id)
+        if policy.priority:
+            queryset = queryset.filter(priority=policy.priority)
+        if not policy.include_unread:
+            queryset = queryset.filter(is_read=True)
+        return queryset
+
+    def apply(self, policy: NotificationRetentionPolicy) -> tuple:
+        queryset = self.expired(policy).order_by("id")
+        archived = chunks = 0
+        last_id = 0
+        while True:
+            rows = list(
+                queryset.filter(id__gt=last_id).values(*ARCHIVE_FIELDS)[
+                    : self.chunk_size
+                ]
+            )
+            if not rows:
+                break
+            self.archive_chunk(rows)
+            archived += len(rows)
+            chunks += 1
+            last_id = rows[-1]["id"]
+        return archived, chunks
+
+    @staticmethod
+    @transaction.atomic
+    def archive_chunk(rows: list):
+        months = {}
+        for row in rows:
+            months.setdefault(row["created_at"].date().replace(day=1), []).append(row)
+        NotificationArchive.objects.bulk_create(
+            [
+                NotificationArchive(
+                    month=month,
+                    first_id=month_rows[0]["id"],
+                    last_id=month_rows[-1]["id"],
+                    count=len(month_rows),
+                    data=gzip.compress(
+                        "\n".join(
+                            json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+                            for row in month_rows
+                        ).encode()
+                    ),
+                )
+                for month, month_rows in months.items()
+            ]
+        )
+        Notification.objects.filter(id__in=[row["id"] for row in rows]).delete()
+
+        # Удалены непрочитанные — счетчики пересчитаются при чтении
+        unread = {
+            row["recipient_id"]
+            for row in rows
+            if row["recipient_id"] and not row["is_read"]
+        }
+
+        def reset_counters():
+            for user_id in unread:
+                UnreadCounter.reset(user_id)
+
+        transaction.on_commit(reset_counters)
@@ -1,34 +1,62 @@
-from typing import List
+from typing import Optional
 
-from django.utils import timezone
 from ninja import Router
 
+from .counters import UnreadCounter
 from .models import Notification
-from .notifications_schemas import NotificationSchema
+from .notifications_schemas import (
+    MarkReadSchema,
+    NotificationFeedSchema,
+    UnreadCountSchema,
+)
 from .services import notification_service
 
 router = Router(tags=["Уведомления"])
 
 
-@router.get("/", response=List[NotificationSchema])
-def get_notifications(request, page: int = 1, limit: int = 20):
-    """Получить уведомления пользователя"""
-    notifications = Notification.objects.filter(
-        recipient=request.auth, is_read=False
-    ).order_by("-created_at")[:limit]
-    return notifications
+@router.get("/", response={200: NotificationFeedSchema, 400: dict})
+def get_notifications(
+    request, cursor: Optional[str] = None, limit: int = 20, unread_only: bool = True
+):
+    """Лента уведомлений пользователя (курсор — next_cursor прошлой страницы)"""
+    try:
+        items, next_cursor = notification_service.feed(
+            request.auth, cursor=cursor, limit=limit, unread_only=unread_only
+        )
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/unread-count", response=UnreadCountSchema)
+def get_unread_count(request):
+    """Количество непрочитанных уведомлений (из кэша)"""
+    return {"count": UnreadCounter.get(request.auth.id)}
+
 
+@router.post("/mark-read")
+def mark_notifications_read(request, data: MarkReadSchema):
+    """Отметить переданные уведомления как прочитанные"""
+    updated = notification_service.mark_read(request.auth, data.ids)
+    return {"success": True, "updated": updated}
 
-@router.post("/{notification_id}/mark-read")
+
+@router.post("/mark-all-read")
+def mark_all_notifications_read(request):
+    """Отметить все уведомления как прочитанные"""
+    updated = notification_service.mark_read(request.auth)
+    return {"success": True, "updated": updated}
+
+
+@router.post("/{int:notification_id}/mark-read")
 def mark_notification_read(request, notification_id: int):
     """Отметить уведомление как прочитанное"""
-    try:
-        notification = Notification.objects.get(
+    updated = notification_service.mark_read(request.auth, [notification_id])
+    if (
+        not updated
+        and not Notification.objects.filter(
             id=notification_id, recipient=request.auth
-        )
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save()
-        return {"success": True}
-    except Notification.DoesNotExist:
+        ).exists()
+    ):
         return {"error": "Уведомление не найдено"}
+    return {"success": True}
@@ -1,21 +1,58 @@
 
-import json
+import asyncio
+import base64
+import random
+from datetime import datetime
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, QuerySet
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import Notification, NotificationType, NotificationSettings
-from shops.models import Shop
+from .counters import UnreadCounter
+from .digest import NotificationDigest, in_quiet_hours, seconds_until
+from .models import Notification, NotificationSettings, NotificationType
 
 User = get_user_model()
 
+# Тип уведомления -> флаг в NotificationSettings, которым его можно отключить
+SETTINGS_FIELDS = {
+    'order_status_change': 'order_status_changes',
+    'new_order': 'new_orders',
+    'customer_message': 'customer_messages',
+    'system_alert': 'system_alerts',
+    'loyalty_update': 'loyalty_updates',
+}
+
 
 class NotificationService:
     """Сервис для работы с уведомлениями"""
 
+    TYPE_CACHE_KEY = 'notifications:type:{}'
+    TYPE_CACHE_TTL = 60 * 60
+    # Отсутствующий или неактивный тип тоже кэшируем
+    NO_TYPE = 'none'
+    BULK_BATCH_SIZE = 1000
+
     def __init__(self):
         self.channel_layer = get_channel_layer()
 
+    def get_type(self, code: str):
+        """Активный тип уведомления из кэша (без SQL при попадании)"""
+        key = self.TYPE_CACHE_KEY.format(code)
+        notification_type = cache.get(key)
+        if notification_type is None:
+            notification_type = NotificationType.objects.filter(
+                code=code, is_active=True
+            ).first() or self.NO_TYPE
+            cache.set(key, notification_type, self.TYPE_CACHE_TTL)
+        return None if notification_type == self.NO_TYPE else notification_type
+
+    def invalidate_type(self, code: str):
+        transaction.on_commit(lambda: cache.delete(self.TYPE_CACHE_KEY.format(code)))
+
     def create_notification(
             self,
             notification_type_code: str,
@@ -31,28 +68,51 @@ class NotificationService:
             action_url=None,
             created_by=None
     ):
-        """Создать уведомление"""
-        try:
-            notification_type = NotificationType.objects.get(
-                code=notification_type_code,
-                is_active=True
-            )
-        except NotificationType.DoesNotExist:
+        """
+        Создать уведомление.
+        Низкий/обычный приоритет (и все, кроме срочных, в тихие часы
+        получателя) копится в дайджест — тогда возвращается None.
+        """
+        notification_type = self.get_type(notification_type_code)
+        if notification_type is None:
             return None
 
+        if recipient or shop or role_code:
+            quiet_hours = None
+            if recipient:
+                quiet_hours = NotificationSettings.objects.filter(user=recipient).values_list(
+                    'quiet_hours_start', 'quiet_hours_end'
+                ).first()
+            quiet = bool(quiet_hours and in_quiet_hours(*quiet_hours))
+            if NotificationDigest.should_buffer(priority, quiet):
+                meta = self._digest_meta(
+                    notification_type_code, related_object_type, related_object_id,
+                    recipient_id=getattr(recipient, 'id', None),
+                    shop_id=getattr(shop, 'id', None), role_code=role_code
+                )
+                event = NotificationDigest.event(
+                    title, message, priority, data, action_url, getattr(created_by, 'id', None)
+                )
+                delay = seconds_until(quiet_hours[1]) if quiet else None
+                transaction.on_commit(lambda: NotificationDigest.add(meta, event, delay))
+                return None
+
+        # Отправка происходит сразу после коммита — статус пишем тем же INSERT
         notification = Notification.objects.create(
             notification_type=notification_type,
             title=title,
             message=message,
             recipient=recipient,
             shop=shop,
-            role_code=role_code,
+            role_code=role_code or '',
             priority=priority,
-            related_object_type=related_object_type,
+            related_object_type=related_object_type or '',
             related_object_id=related_object_id,
             data=data or {},
             action_url=action_url or '',
-            created_by=created_by
+            created_by=created_by,
+            is_sent=True,
+            sent_at=timezone.now()
         )
 
         # Отправляем уведомление через WebSocket
@@ -60,9 +120,160 @@ class NotificationService:
 
         return notification
 
-    def send_notification(self, notification: Notification):
-        """Отправить уведомление через WebSocket"""
-        notification_data = {
+    def create_notifications(
+            self,
+            notification_type_code: str,
+            recipients,
+            title: str,
+            message: str,
+            priority='normal',
+            related_object_type=None,
+            related_object_id=None,
+            data=None,
+            action_url=None,
+            created_by=None
+    ):
+        """
+        Создать одинаковое уведомление для группы получателей.
+        Получатели, отключившие этот тип в настройках, отсекаются тем же
+        запросом; строки пишутся одним bulk_create, публикация — одним
+        переходом в event loop на всех получателей.
+        """
+        return self.create_notifications_many(
+            notification_type_code,
+            recipients,
+            [{
+                'title': title,
+                'message': message,
+                'related_object_id': related_object_id,
+                'data': data,
+                'action_url': action_url,
+            }],
+            priority=priority,
+            related_object_type=related_object_type,
+            created_by=created_by
+        )
+
+    def create_notifications_many(
+            self,
+            notification_type_code: str,
+            recipients,
+            messages: list,
+            priority='normal',
+            related_object_type=None,
+            created_by=None
+    ):
+        """
+        Разные уведомления одного типа для многих получателей (массовые
+        рассылки по объектам). messages — словари title, message,
+        related_object_id, data, action_url и recipient_ids (подмножество
+        recipients; без него — все recipients). Настройки получателей
+        читаются одним запросом на всю пачку.
+        """
+        notification_type = self.get_type(notification_type_code)
+        if notification_type is None:
+            return []
+
+        if not isinstance(recipients, QuerySet):
+            recipients = User.objects.filter(
+                id__in=[getattr(user, 'id', user) for user in recipients]
+            )
+        settings_field = SETTINGS_FIELDS.get(notification_type_code)
+        if settings_field:
+            recipients = recipients.exclude(
+                **{f'notification_settings__{settings_field}': False}
+            )
+        rows = recipients.order_by().values_list(
+            'id', 'notification_settings__quiet_hours_start', 'notification_settings__quiet_hours_end'
+        ).distinct()
+
+        # Срочные и высокие — сразу, остальное и тихие часы — в дайджест
+        # (получатель -> задержка доставки дайджеста)
+        immediate, buffered = [], {}
+        for recipient_id, quiet_start, quiet_end in rows:
+            quiet = in_quiet_hours(quiet_start, quiet_end)
+            if NotificationDigest.should_buffer(priority, quiet):
+                buffered[recipient_id] = seconds_until(quiet_end) if quiet else None
+            else:
+                immediate.append(recipient_id)
+        allowed = set(immediate)
+
+        now = timezone.now()
+        created_by_id = getattr(created_by, 'id', None)
+        pending, entries = [], []
+        for item in messages:
+            targets = item.get('recipient_ids')
+            if targets is None:
+                targets = immediate + list(buffered)
+            related_object_id = item.get('related_object_id')
+            event = None
+            for recipient_id in targets:
+                if recipient_id in allowed:
+                    pending.append(Notification(
+                        notification_type=notification_type,
+                        title=item['title'],
+                        message=item['message'],
+                        recipient_id=recipient_id,
+                        priority=priority,
+                        related_object_type=related_object_type or '',
+                        related_object_id=related_object_id,
+                        data=item.get('data') or {},
+                        action_url=item.get('action_url') or '',
+                        created_by_id=created_by_id,
+                        is_sent=True,
+                        sent_at=now
+                    ))
+                elif recipient_id in buffered:
+                    event = event or NotificationDigest.event(
+                        item['title'], item['message'], priority, item.get('data'),
+                        item.get('action_url'), created_by_id
+                    )
+                    entries.append((self._digest_meta(
+                        notification_type_code, related_object_type, related_object_id,
+                        recipient_id=recipient_id
+                    ), event, buffered[recipient_id]))
+
+        if entries:
+            transaction.on_commit(lambda: [
+                NotificationDigest.add(meta, event, delay) for meta, event, delay in entries
+            ])
+        if not pending:
+            return []
+
+        notifications = Notification.objects.bulk_create(pending, batch_size=self.BULK_BATCH_SIZE)
+        self.publish([
+            (self.group_name(notification), self.build_payload(notification))
+            for notification in notifications
+        ])
+        recipient_ids = [notification.recipient_id for notification in notifications]
+        transaction.on_commit(lambda: UnreadCounter.incr_many(recipient_ids))
+        return notifications
+
+    @staticmethod
+    def _digest_meta(notification_type_code, related_object_type, related_object_id, **target):
+        return {
+            'type': notification_type_code,
+            'related_object_type': related_object_type,
+            'related_object_id': related_object_id,
+            **target,
+        }
+
+    @staticmethod
+    def group_name(notification: Notification):
+        """Группа channel layer, в которую доставляется уведомление"""
+        if notification.recipient_id:
+            return f"user_{notification.recipient_id}"
+        if notification.shop_id and notification.role_code:
+            return f"shop_{notification.shop_id}_role_{notification.role_code}"
+        if notification.shop_id:
+            return f"shop_{notification.shop_id}"
+        if notification.role_code:
+            return f"role_{notification.role_code}"
+        return None
+
+    @staticmethod
+    def build_payload(notification: Notification) -> dict:
+        return {
             'id': notification.id,
             'title': notification.title,
             'message': notification.message,
@@ -75,55 +286,114 @@ class NotificationService:
             'data': notification.data
         }
 
-        # Отправляем конкретному пользователю
-        if notification.recipient:
-            self._send_to_user(notification.recipient.id, notification_data)
-
-        # Отправляем всем пользователям магазина
-        elif notification.shop:
-            self._send_to_shop(notification.shop.id, notification_data)
-
-        # Отправляем пользователям с определенной ролью
-        elif notification.role_code:
-            self._send_to_role(notification.role_code, notification_data)
-
-        # Помечаем как отправленное
-        notification.is_sent = True
-        notification.sent_at = timezone.now()
-        notification.save()
-
-    def _send_to_user(self, user_id: int, notification_data: dict):
-        """Отправить уведомление пользователю"""
-        if self.channel_layer:
-            async_to_sync(self.channel_layer.group_send)(
-                f"user_{user_id}",
-                {
-                    'type': 'notification_message',
-                    'notification': notification_data
-                }
-            )
+    def send_notification(self, notification: Notification):
+        """Отправить уведомление через WebSocket"""
+        self.publish([(self.group_name(notification), self.build_payload(notification))])
+        if notification.recipient_id and not notification.is_read:
+            transaction.on_commit(lambda: UnreadCounter.incr_many([notification.recipient_id]))
+
+        # Помечаем как отправленное (create_notification делает это при вставке)
+        if not notification.is_sent:
+            notification.is_sent = True
+            notification.sent_at = timezone.now()
+            notification.save(update_fields=['is_sent', 'sent_at'])
 
-    def _send_to_shop(self, shop_id: int, notification_data: dict):
-        """Отправить уведомление всем пользователям магазина"""
-        if self.channel_layer:
-            async_to_sync(self.channel_layer.group_send)(
-                f"shop_{shop_id}",
-                {
-                    'type': 'notification_message',
-                    'notification': notification_data
-                }
+    def publish(self, messages):
+        """
+        Отправить пачку (группа, данные) после коммита транзакции:
+        клиенты не получают id уведомлений, которых еще нет в БД.
+        """
+        messages = [(group, payload) for group, payload in messages if group]
+        if self.channel_layer and messages:
+            transaction.on_commit(lambda: async_to_sync(self._group_send_many)(messages))
+
+    async def _group_send_many(self, messages):
+        # Один переход sync -> async, отправки в группы идут конкурентно
+        await asyncio.gather(*(
+            self.channel_layer.group_send(
+                group, {'type': 'notification_message', 'notification': payload}
             )
+            for group, payload in messages
+        ))
+
+    FEED_MAX_LIMIT = 100
+
+    @staticmethod
+    def encode_cursor(notification: Notification) -> str:
+        raw = f"{notification.created_at.isoformat()}|{notification.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """(created_at, id) из курсора; ValueError — курсор поврежден"""
+        try:
+            created_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(notification_id)
+        except (TypeError, UnicodeDecodeError, ValueError) as exc:
+            raise ValueError("Некорректный курсор") from exc
 
-    def _send_to_role(self, role_code: str, notification_data: dict):
-        """Отправить уведомление пользователям с определенной ролью"""
-        if self.channel_layer:
-            async_to_sync(self.channel_layer.group_send)(
-                f"role_{role_code}",
-                {
-                    'type': 'notification_message',
-                    'notification': notification_data
-                }
+    def feed(self, user, cursor: str = None, limit: int = 20, unread_only: bool = False):
+        """
+        Лента уведомлений пользователя с keyset-пагинацией по (created_at, id):
+        стоимость страницы не зависит от ее глубины. Возвращает (уведомления,
+        курсор следующей страницы или None).
+        """
+        limit = max(1, min(limit, self.FEED_MAX_LIMIT))
+        notifications = Notification.objects.filter(recipient=user).select_related('notification_type')
+        if unread_only:
+            notifications = notifications.filter(is_read=False)
+        if cursor:
+            created_at, notification_id = self.decode_cursor(cursor)
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
             )
+        page = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+        next_cursor = self.encode_cursor(page[limit - 1]) if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    def backlog(self, user, last_id: int = None, limit: int = None) -> dict:
+        """
+        Пропущенное за время разрыва WebSocket одним кадром.
+        С last_id — личные уведомления новее него, без — последние
+        непрочитанные; не больше limit самых новых. has_more означает
+        разрыв в истории: клиент перечитывает ленту через REST.
+        """
+        limit = limit or settings.NOTIFICATIONS_WS_BACKLOG_LIMIT
+        notifications = Notification.objects.filter(recipient=user).select_related('notification_type')
+        if last_id is None:
+            notifications = notifications.filter(is_read=False)
+        else:
+            notifications = notifications.filter(id__gt=last_id)
+
+        rows = list(notifications.order_by('-id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+        return {
+            'notifications': [self.build_payload(notification) for notification in rows],
+            'has_more': has_more,
+            'last_id': rows[-1].id if rows else last_id,
+            'unread_count': UnreadCounter.get(user.id),
+            # Разнесенная задержка переподключения: после сбоя клиенты не
+            # возвращаются одновременно
+            'reconnect_after_ms': random.randint(
+                settings.NOTIFICATIONS_WS_RECONNECT_MIN_MS,
+                settings.NOTIFICATIONS_WS_RECONNECT_MAX_MS
+            ),
+        }
+
+    def mark_read(self, user, notification_ids=None) -> int:
+        """Отметить прочитанными (все или переданные id) одним UPDATE"""
+        notifications = Notification.objects.filter(recipient=user, is_read=False)
+        if notification_ids is not None:
+            notifications = notifications.filter(id__in=notification_ids)
+        updated = notifications.update(is_read=True, read_at=timezone.now())
+
+        if notification_ids is None:
+            # Пересчет при следующем чтении: не теряем созданные параллельно
+            transaction.on_commit(lambda: UnreadCounter.reset(user.id))
+        else:
+            transaction.on_commit(lambda: UnreadCounter.decr(user.id, updated))
+        return updated
 
     def notify_order_status_change(self, order, old_status, new_status, user):
         """Уведомление об изменении статуса заказа"""
@@ -192,22 +462,21 @@ class NotificationService:
             role__code__in=['manager', 'cashier']
         )
 
-        for user in users_to_notify:
-            self.create_notification(
-                notification_type_code='loyalty_update',
-                title=title,
-                message=message,
-                recipient=user,
-                priority='low',
-                related_object_type='customer',
-                related_object_id=customer.id,
-                action_url=f'/customers/{customer.id}',
-                data={
-                    'customer_name': customer.full_name,
-                    'points_earned': points,
-                    'order_number': order.order_number
-                }
-            )
+        self.create_notifications(
+            notification_type_code='loyalty_update',
+            recipients=users_to_notify,
+            title=title,
+            message=message,
+            priority='low',
+            related_object_type='customer',
+            related_object_id=customer.id,
+            action_url=f'/customers/{customer.id}',
+            data={
+                'customer_name': customer.full_name,
+                'points_earned': points,
+                'order_number': order.order_number
+            }
+        )
 
     def notify_system_alert(self, title, message, priority='normal', shop=None, role_code=None):
         """Системное уведомление"""
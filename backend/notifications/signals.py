@@ -0,0 +1,67 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from shops.models import Shop
+from users.models import User, UserShop
+
+from .middleware import invalidate_user_context, invalidate_user_contexts
+from .models import NotificationType
+from .services import notification_service
+
+
+@receiver(post_save, sender=NotificationType)
+@receiver(post_delete, sender=NotificationType)
+def invalidate_notification_type(sender, instance, **kwargs):
+    notification_service.invalidate_type(instance.code)
+
+
+@receiver(post_save, sender=User)
+def invalidate_socket_user(sender, instance, **kwargs):
+    invalidate_user_context(instance.id)
+
+
+@receiver(post_save, sender=UserShop)
+@receiver(post_delete, sender=UserShop)
+def invalidate_socket_user_shops(sender, instance, **kwargs):
+    invalidate_user_context(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.shops.through)
+def invalidate_socket_user_shop_set(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # user.shops.add/remove/set/clear пишут UserShop без post_save
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_user_context(instance.id)
+    elif action in ("post_add", "post_remove"):
+        invalidate_user_contexts(pk_set)
+    elif action == "pre_clear":
+        invalidate_user_contexts(
+            UserShop.objects.filter(shop=instance).values_list("user_id", flat=True)
+        )
+
+
+@receiver(pre_save, sender=Shop)
+def remember_shop_activity(sender, instance: Shop, update_fields=None, **kwargs):
+    instance._was_active = None
+    if instance.id and (update_fields is None or "is_active" in update_fields):
+        instance._was_active = (
+            sender.objects.filter(id=instance.id)
+            .values_list("is_active", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Shop)
+def invalidate_socket_shop_users(sender, instance: Shop, created, **kwargs):
+    # Неактивный магазин выпадает из групп сокета его пользователей
+    if created or instance._was_active in (None, instance.is_active):
+        return
+    user_ids = set(
+        UserShop.objects.filter(shop=instance).values_list("user_id", flat=True)
+    )
+    user_ids.update(
+        User.objects.filter(current_shop=instance).values_list("id", flat=True)
+    )
+    invalidate_user_contexts(user_ids)
@@ -0,0 +1,22 @@
+from celery import shared_task
+
+from .digest import NotificationDigest
+from .live import DashboardStream
+from .retention import NotificationRetention
+
+
+@shared_task(name="notifications.tasks.flush_notification_digest")
+def flush_notification_digest(bucket: str, meta: dict):
+    notification = NotificationDigest.flush(bucket, meta)
+    return {"notification_id": notification.id if notification else None}
+
+
+@shared_task(name="notifications.tasks.flush_dashboard_deltas")
+def flush_dashboard_deltas(shop_id: int):
+    delta = DashboardStream.flush(shop_id)
+    return {"events": bool(delta)}
+
+
+@shared_task(name="notifications.tasks.apply_retention")
+def apply_retention():
+    return NotificationRetention().run()
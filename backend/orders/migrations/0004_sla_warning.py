@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_sla_warning_type(apps, schema_editor):
+    # Тип уведомления для сканера SLA: без него create_notification молча пропускает
+    NotificationType = apps.get_model("notifications", "NotificationType")
+    NotificationType.objects.get_or_create(
+        code="sla_warning",
+        defaults={
+            "name": "Риск срыва срока",
+            "description": "Заказы, срок готовности которых истекает или истек",
+            "icon": "schedule",
+            "color": "warn",
+        },
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0005_customersegment"),
+        ("device", "0002_device_devices_imei_fa0ada_idx_and_more"),
+        ("notifications", "0001_initial"),
+        ("orders", "0003_repairservice_order_sla_delay_minutes_and_more"),
+        ("shops", "0002_organization_shopsettings_pos_barcode_enabled_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="sla_warning",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "Нет"),
+                    ("soon", "Срок истекает"),
+                    ("overdue", "Просрочен"),
+                ],
+                default="",
+                max_length=10,
+                verbose_name="Предупреждение SLA",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(
+                    models.Q(
+                        ("status__in", ["ready", "completed", "cancelled"]),
+                        _negated=True,
+                    ),
+                    models.Q(("sla_warning", "overdue"), _negated=True),
+                ),
+                fields=["estimated_completion"],
+                name="orders_sla_pending_idx",
+            ),
+        ),
+        migrations.RunPython(create_sla_warning_type, migrations.RunPython.noop),
+    ]
@@ -24,6 +24,11 @@ class Order(models.Model):
         HIGH = "high", "Высокий"
         URGENT = "urgent", "Срочный"
 
+    class SlaWarningChoices(models.TextChoices):
+        NONE = "", "Нет"
+        SOON = "soon", "Срок истекает"
+        OVERDUE = "overdue", "Просрочен"
+
     # Основная информация
     shop = models.ForeignKey(
         "shops.Shop", on_delete=models.PROTECT, verbose_name="Магазин"
@@ -121,6 +126,14 @@ class Order(models.Model):
     sla_on_time = models.BooleanField("В срок", null=True, blank=True)
     sla_delay_minutes = models.IntegerField("Отклонение, мин", null=True, blank=True)
     # положительные — опоздание, отрицательные — раньше, 0 — точно в срок
+    # последнее отправленное предупреждение о срыве SLA (сбрасывается при переносе срока)
+    sla_warning = models.CharField(
+        "Предупреждение SLA",
+        max_length=10,
+        choices=SlaWarningChoices.choices,
+        default=SlaWarningChoices.NONE,
+        blank=True,
+    )
 
     class Meta:
         db_table = "orders"
@@ -133,6 +146,13 @@ class Order(models.Model):
             models.Index(fields=["order_number"]),
             models.Index(fields=["completed_at", "sla_on_time"]),
             models.Index(fields=["estimated_completion"]),
+            # Сканер SLA: только открытые заказы без предупреждения о просрочке
+            models.Index(
+                fields=["estimated_completion"],
+                name="orders_sla_pending_idx",
+                condition=~models.Q(status__in=["ready", "completed", "cancelled"])
+                & ~models.Q(sla_warning="overdue"),
+            ),
         ]
 
     def __str__(self):
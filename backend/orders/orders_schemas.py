@@ -144,6 +144,15 @@ class OrderSchema(Schema):
         return float(obj.remaining_payment)
 
 
+class OrderSummarySchema(Schema):
+    id: int
+    order_number: str
+    status: str
+    customer_name: str
+    total: float
+    created_at: datetime
+
+
 class OrderListSchema(Schema):
     orders: List[OrderSchema]
     pagination: PaginationSchema
@@ -159,3 +168,39 @@ class OrderFilterSchema(Schema):
     created_to: Optional[datetime] = None
     estimated_completion_from: Optional[datetime] = None
     estimated_completion_to: Optional[datetime] = None
+
+
+class OrderBoardCardSchema(Schema):
+    id: int
+    order_number: str
+    priority: str
+    customer_name: str
+    device: str
+    assigned_to_id: Optional[int] = None
+    cost_estimate: float
+    final_cost: Optional[float] = None
+    estimated_completion: Optional[datetime] = None
+    created_at: datetime
+
+
+class OrderBoardColumnSchema(Schema):
+    status: str
+    label: str
+    count: int
+    orders: List[OrderBoardCardSchema]
+
+
+class OrderBoardSchema(Schema):
+    shop_id: int
+    limit: int
+    generated_at: datetime
+    columns: List[OrderBoardColumnSchema]
+
+
+class OrderBoardRowSchema(OrderBoardCardSchema):
+    status: str
+
+    @staticmethod
+    def resolve_device(obj):
+        # В проекции аннотация не может называться как FK-поле device
+        return obj["device_name"]
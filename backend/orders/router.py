@@ -1,26 +1,32 @@
-from typing import List
+from typing import List, Literal, Union
 
-from django.db import models, transaction
+from django.db import transaction
 from django.db.models import Prefetch, Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from ninja import Query, Router
 from ninja.pagination import PageNumberPagination, paginate
 
 from customers.models import Customer
-from device.models import Device, DeviceModel
+from device.models import DeviceModel
+from device.services import DeviceRegistry
 from Schemas.common import ErrorSchema, MessageSchema
 from users.models import User
 
-from .models import AdditionalService, Order, OrderService, RepairService
+from .models import AdditionalService, Order, OrderService
 from .orders_schemas import (
     AdditionalServiceSchema,
+    OrderBoardRowSchema,
+    OrderBoardSchema,
     OrderCreateSchema,
     OrderFilterSchema,
     OrderListSchema,
     OrderSchema,
+    OrderSummarySchema,
     OrderUpdateSchema,
 )
 from .schemas_repair_services import RepairServiceSchema
+from .services import OrderBoardService, OrderProjection, RepairServiceIndex
 
 router = Router(tags=["Заказы"])
 
@@ -29,26 +35,20 @@ class OrderPagination(PageNumberPagination):
     page_size = 20
 
 
-@router.get("/", response=List[OrderSchema])
+@router.get(
+    "/", response=List[Union[OrderSchema, OrderBoardRowSchema, OrderSummarySchema]]
+)
 @paginate(OrderPagination)
-def list_orders(request, filters: OrderFilterSchema = Query(...)):
+def list_orders(
+    request,
+    filters: OrderFilterSchema = Query(...),
+    projection: Literal["summary", "board", "full"] = "full",
+):
     """Получение списка заказов"""
     if not request.auth.has_permission("orders.view_order"):
         raise PermissionError("Нет прав для просмотра заказов")
 
-    # Базовый queryset с оптимизацией запросов
-    queryset = Order.objects.select_related(
-        "customer",
-        "device__model__brand",
-        "device__model__device_type",
-        "shop",
-        "created_by",
-        "assigned_to",
-    ).prefetch_related(
-        Prefetch(
-            "orderservice_set", queryset=OrderService.objects.select_related("service")
-        )
-    )
+    queryset = Order.objects.all()
 
     # Фильтрация по магазинам в зависимости от прав
     if not request.auth.has_permission("orders.view_all_shops"):
@@ -96,10 +96,27 @@ def list_orders(request, filters: OrderFilterSchema = Query(...)):
             estimated_completion__lte=filters.estimated_completion_to
         )
 
-    return queryset.order_by("-created_at")
+    queryset = queryset.order_by("-created_at")
+
+    # Узкие проекции: только нужные колонки, без select_related/prefetch
+    if projection != OrderProjection.FULL:
+        return OrderProjection.apply(queryset, projection)
+
+    return queryset.select_related(
+        "customer",
+        "device__model__brand",
+        "device__model__device_type",
+        "shop",
+        "created_by",
+        "assigned_to",
+    ).prefetch_related(
+        Prefetch(
+            "orderservice_set", queryset=OrderService.objects.select_related("service")
+        )
+    )
 
 
-@router.get("/{order_id}", response=OrderSchema)
+@router.get("/{int:order_id}", response=OrderSchema)
 def get_order(request, order_id: int):
     """Получение заказа по ID"""
     if not request.auth.has_permission("orders.view_order"):
@@ -143,8 +160,8 @@ def create_order(request, data: OrderCreateSchema):
 
             # Создаем или получаем устройство
             device_model = get_object_or_404(DeviceModel, id=data.device.model_id)
-            device = Device.objects.create(
-                model=device_model, **data.device.dict(exclude={"model_id"})
+            device = DeviceRegistry.get_or_create_for_intake(
+                device_model, data.device.dict(exclude={"model_id"})
             )
 
             # Создаем заказ
@@ -174,9 +191,6 @@ def create_order(request, data: OrderCreateSchema):
                         price=service.price,
                     )
 
-            # Обновляем статистику клиента
-            customer.update_statistics()
-
             # Создаем историю взаимодействия клиента с магазином
             from customers.models import CustomerShopHistory
 
@@ -213,7 +227,7 @@ def create_order(request, data: OrderCreateSchema):
 
 
 @router.put(
-    "/{order_id}", response={200: OrderSchema, 400: ErrorSchema, 404: ErrorSchema}
+    "/{int:order_id}", response={200: OrderSchema, 400: ErrorSchema, 404: ErrorSchema}
 )
 def update_order(request, order_id: int, data: OrderUpdateSchema):
     """Обновление заказа"""
@@ -262,10 +276,6 @@ def update_order(request, order_id: int, data: OrderUpdateSchema):
 
         order.save(update_fields=update_fields + ["updated_at"])
 
-        # Обновляем статистику клиента если изменилась стоимость
-        if "final_cost" in update_fields:
-            order.customer.update_statistics()
-
         # Загружаем заказ с полными данными для ответа
         order = (
             Order.objects.select_related(
@@ -361,6 +371,18 @@ def get_orders_statistics(request):
     }
 
 
+@router.get("/board", response={200: OrderBoardSchema, 400: ErrorSchema})
+def get_orders_board(request, limit: int = 10):
+    """Канбан-доска заказов текущего магазина"""
+    if not request.auth.has_permission("orders.view_order"):
+        raise PermissionError("Нет прав для просмотра заказов")
+
+    if not hasattr(request, "current_shop") or not request.current_shop:
+        return 400, {"error": "Не выбран текущий магазин"}
+
+    return OrderBoardService.get_board(request.current_shop.id, limit)
+
+
 @router.get("/repair-services", response=List[RepairServiceSchema])
 def list_repair_services(
     request,
@@ -369,30 +391,18 @@ def list_repair_services(
     model_id: int = None,
     search: str = None,
 ):
-    """Список типовых работ с фильтрами"""
+    """Список типовых работ с фильтрами (из индекса, без SQL)"""
     if not request.auth.has_permission("orders.view_order"):
         raise PermissionError("Нет прав")
 
-    qs = RepairService.objects.filter(is_active=True)
-
-    # доступность в магазине
-    if hasattr(request, "current_shop") and request.current_shop:
-        qs = qs.filter(
-            models.Q(shops__isnull=True) | models.Q(shops=request.current_shop)
-        ).distinct()
-
-    if model_id:
-        qs = qs.filter(models.Q(model_id=model_id) | models.Q(model__isnull=True))
-    if brand_id:
-        qs = qs.filter(models.Q(brand_id=brand_id) | models.Q(brand__isnull=True))
-    if device_type_id:
-        qs = qs.filter(
-            models.Q(device_type_id=device_type_id) | models.Q(device_type__isnull=True)
-        )
-    if search:
-        qs = qs.filter(Q(name__icontains=search) | Q(code__icontains=search))
-
-    return qs.order_by("brand__name", "model__name", "name")
+    shop = getattr(request, "current_shop", None)
+    return RepairServiceIndex.filter(
+        shop_id=shop.id if shop else None,
+        device_type_id=device_type_id,
+        brand_id=brand_id,
+        model_id=model_id,
+        search=search,
+    )
 
 
 @router.get("/repair-services/suggest", response=List[RepairServiceSchema])
@@ -401,21 +411,8 @@ def suggest_repair_services(request, device_model_id: int):
     if not request.auth.has_permission("orders.view_order"):
         raise PermissionError("Нет прав")
 
-    from device.models import DeviceModel
-
-    dm = get_object_or_404(
-        DeviceModel.objects.select_related("brand", "device_type"), id=device_model_id
-    )
-
-    qs = RepairService.objects.filter(is_active=True).filter(
-        models.Q(model=dm)
-        | models.Q(brand=dm.brand, model__isnull=True)
-        | models.Q(device_type=dm.device_type, brand__isnull=True, model__isnull=True)
-    )
-
-    if hasattr(request, "current_shop") and request.current_shop:
-        qs = qs.filter(
-            models.Q(shops__isnull=True) | models.Q(shops=request.current_shop)
-        ).distinct()
-
-    return qs.order_by("name")
+    shop = getattr(request, "current_shop", None)
+    services = RepairServiceIndex.suggest(device_model_id, shop.id if shop else None)
+    if services is None:
+        raise Http404("Модель устройства не найдена")
+    return services
@@ -17,10 +17,15 @@ class RepairServiceSchema(Schema):
     diagnostics_required: bool
     notes: Optional[str] = None
 
+    # obj — модель или строка индекса RepairServiceIndex (dict)
     @staticmethod
     def resolve_default_price(obj):
+        if isinstance(obj, dict):
+            return obj["default_price"]
         return float(obj.default_price)
 
     @staticmethod
     def resolve_avg_hours(obj):
+        if isinstance(obj, dict):
+            return obj["avg_hours"]
         return float(obj.avg_hours)
@@ -0,0 +1,588 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    DecimalField,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import Coalesce, Concat, RowNumber
+from django.utils import timezone
+
+from .models import Order, OrderService, RepairService
+
+# Порядок приоритетов на доске: срочные сверху
+PRIORITY_RANK = Case(
+    When(priority=Order.PriorityChoices.URGENT, then=Value(0)),
+    When(priority=Order.PriorityChoices.HIGH, then=Value(1)),
+    When(priority=Order.PriorityChoices.NORMAL, then=Value(2)),
+    When(priority=Order.PriorityChoices.LOW, then=Value(3)),
+    default=Value(4),
+    output_field=IntegerField(),
+)
+
+
+class OrderProjection:
+    """Узкие проекции списка заказов: values() вместо полных моделей"""
+
+    SUMMARY = "summary"
+    BOARD = "board"
+    FULL = "full"
+
+    FIELDS = {
+        SUMMARY: (
+            "id",
+            "order_number",
+            "status",
+            "customer_name",
+            "total",
+            "created_at",
+        ),
+        BOARD: (
+            "id",
+            "order_number",
+            "status",
+            "priority",
+            "customer_name",
+            "device_name",
+            "assigned_to_id",
+            "cost_estimate",
+            "final_cost",
+            "estimated_completion",
+            "created_at",
+        ),
+    }
+
+    @staticmethod
+    def annotations() -> dict:
+        """Вычисляемые поля; join'ы добавляются только для запрошенных полей"""
+        services_total = (
+            OrderService.objects.filter(order=OuterRef("pk"))
+            .values("order")
+            .annotate(total=Sum(F("price") * F("quantity")))
+            .values("total")
+        )
+        money = DecimalField(max_digits=12, decimal_places=2)
+        return {
+            "customer_name": Concat(
+                "customer__last_name",
+                Value(" "),
+                "customer__first_name",
+                output_field=CharField(),
+            ),
+            "device_name": Concat(
+                "device__model__brand__name",
+                Value(" "),
+                "device__model__name",
+                output_field=CharField(),
+            ),
+            "total": Coalesce("final_cost", "cost_estimate", output_field=money)
+            + Coalesce(Subquery(services_total), Value(0), output_field=money),
+        }
+
+    @classmethod
+    def apply(cls, queryset, projection: str, *extra_fields: str):
+        fields = cls.FIELDS[projection]
+        annotations = {
+            name: expr for name, expr in cls.annotations().items() if name in fields
+        }
+        return queryset.annotate(**annotations).values(*fields, *extra_fields)
+
+
+class OrderBoardService:
+    """Канбан-доска заказов: счетчики по статусам и первые N карточек колонки"""
+
+    CACHE_PREFIX = "orders:board"
+    MAX_LIMIT = 50
+
+    @classmethod
+    def _version_key(cls, shop_id: int) -> str:
+        return f"{cls.CACHE_PREFIX}:version:{shop_id}"
+
+    @classmethod
+    def _cache_key(cls, shop_id: int, limit: int) -> str:
+        version = cache.get(cls._version_key(shop_id)) or "0"
+        return f"{cls.CACHE_PREFIX}:{shop_id}:{version}:{limit}"
+
+    @classmethod
+    def invalidate(cls, shop_id: int):
+        """Сбросить кэш доски магазина (после коммита транзакции)"""
+
+        def _bump():
+            cache.set(cls._version_key(shop_id), uuid4().hex, None)
+
+        transaction.on_commit(_bump)
+
+    @classmethod
+    def get_board(cls, shop_id: int, limit: int = 10) -> dict:
+        limit = max(1, min(limit, cls.MAX_LIMIT))
+        key = cls._cache_key(shop_id, limit)
+
+        board = cache.get(key)
+        if board is None:
+            board = cls.build_board(shop_id, limit)
+            cache.set(key, board, settings.ORDERS_BOARD_CACHE_TTL)
+        return board
+
+    @classmethod
+    def build_board(cls, shop_id: int, limit: int) -> dict:
+        """
+        Один запрос: row_number() и count() по окну partition by status.
+        Фильтр по row_number Django выносит во внешний подзапрос,
+        поэтому счетчики считаются по всем заказам колонки.
+        """
+        queryset = (
+            Order.objects.filter(shop_id=shop_id)
+            .annotate(
+                status_count=Window(Count("id"), partition_by=[F("status")]),
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F("status")],
+                    order_by=[
+                        PRIORITY_RANK.asc(),
+                        F("estimated_completion").asc(nulls_last=True),
+                        F("id").asc(),
+                    ],
+                ),
+            )
+            .filter(position__lte=limit)
+            .order_by("status", "position")
+        )
+        rows = OrderProjection.apply(queryset, OrderProjection.BOARD, "status_count")
+
+        columns = {
+            value: {"status": value, "label": label, "count": 0, "orders": []}
+            for value, label in Order.StatusChoices.choices
+        }
+        for row in rows:
+            column = columns.get(row["status"])
+            if column is None:
+                continue
+            column["count"] = row["status_count"]
+            column["orders"].append(cls._card(row))
+
+        return {
+            "shop_id": shop_id,
+            "limit": limit,
+            "generated_at": timezone.now(),
+            "columns": list(columns.values()),
+        }
+
+    @staticmethod
+    def _card(row: dict) -> dict:
+        return {
+            "id": row["id"],
+            "order_number": row["order_number"],
+            "priority": row["priority"],
+            "customer_name": row["customer_name"],
+            "device": row["device_name"],
+            "assigned_to_id": row["assigned_to_id"],
+            "cost_estimate": float(row["cost_estimate"]),
+            "final_cost": float(row["final_cost"])
+            if row["final_cost"] is not None
+            else None,
+            "estimated_completion": row["estimated_completion"],
+            "created_at": row["created_at"],
+        }
+
+
+class SlaWarningService:
+    """
+    Раннее предупреждение о срыве SLA.
+    Каждый запуск берет открытые заказы с estimated_completion <= now + horizon,
+    по которым еще не отправлено предупреждение в текущем состоянии:
+    «срок истекает» отправляется один раз, «просрочен» — еще раз при
+    наступлении срока. Отправленное состояние хранится в Order.sla_warning;
+    частичный индекс orders_sla_pending_idx покрывает только открытые заказы
+    без предупреждения о просрочке.
+    """
+
+    LOCK_KEY = "orders:sla:lock"
+    MAX_LISTED_ORDERS = 10
+
+    # Готовые к выдаче заказы уже отремонтированы — предупреждать некого
+    CLOSED_STATUSES = (
+        Order.StatusChoices.READY,
+        Order.StatusChoices.COMPLETED,
+        Order.StatusChoices.CANCELLED,
+    )
+
+    @classmethod
+    def scan(cls) -> dict:
+        if not cache.add(cls.LOCK_KEY, "1", 55):
+            return {"skipped": "locked"}
+        try:
+            return cls._scan()
+        finally:
+            cache.delete(cls.LOCK_KEY)
+
+    @classmethod
+    def _scan(cls) -> dict:
+        from notifications.services import notification_service
+
+        now = timezone.now()
+        horizon = timedelta(minutes=settings.ORDERS_SLA_WARNING_HORIZON_MINUTES)
+        upper = now + horizon
+        states = Order.SlaWarningChoices
+
+        rows = list(
+            Order.objects.filter(estimated_completion__lte=upper)
+            .exclude(status__in=cls.CLOSED_STATUSES)
+            .exclude(sla_warning=states.OVERDUE)
+            .filter(Q(estimated_completion__lte=now) | ~Q(sla_warning=states.SOON))
+            .order_by("estimated_completion")
+            .values(
+                "id",
+                "order_number",
+                "shop_id",
+                "assigned_to_id",
+                "estimated_completion",
+            )
+        )
+        if not rows:
+            return {"orders": 0, "notifications": 0}
+
+        # Группируем: назначенные — исполнителю, остальные — магазину
+        by_technician, by_shop = {}, {}
+        for row in rows:
+            if row["assigned_to_id"]:
+                by_technician.setdefault(row["assigned_to_id"], []).append(row)
+            else:
+                by_shop.setdefault(row["shop_id"], []).append(row)
+
+        from shops.models import Shop
+        from users.models import User
+
+        technicians = User.objects.in_bulk(list(by_technician))
+        shops = Shop.objects.in_bulk(list(by_shop))
+
+        overdue_ids = [r["id"] for r in rows if r["estimated_completion"] <= now]
+        soon_ids = [r["id"] for r in rows if r["estimated_completion"] > now]
+
+        sent = 0
+        with transaction.atomic():
+            for user_id, orders in by_technician.items():
+                cls._notify(
+                    notification_service, orders, now, recipient=technicians[user_id]
+                )
+                sent += 1
+            for shop_id, orders in by_shop.items():
+                cls._notify(notification_service, orders, now, shop=shops[shop_id])
+                sent += 1
+
+            # Запоминаем отправленное состояние — повторно не предупреждаем
+            if overdue_ids:
+                Order.objects.filter(id__in=overdue_ids).update(
+                    sla_warning=states.OVERDUE
+                )
+            if soon_ids:
+                Order.objects.filter(id__in=soon_ids).update(sla_warning=states.SOON)
+
+        return {"orders": len(rows), "notifications": sent}
+
+    @classmethod
+    def _notify(cls, service, orders, now, recipient=None, shop=None):
+        overdue = [o for o in orders if o["estimated_completion"] <= now]
+        numbers = [o["order_number"] for o in orders[: cls.MAX_LISTED_ORDERS]]
+        if len(orders) > cls.MAX_LISTED_ORDERS:
+            numbers.append(f"и еще {len(orders) - cls.MAX_LISTED_ORDERS}")
+
+        service.create_notification(
+            notification_type_code="sla_warning",
+            title=f"Риск срыва срока: {len(orders)} заказ(ов)",
+            message=f"Просрочено: {len(overdue)}, "
+            f"срок истекает скоро: {len(orders) - len(overdue)}. "
+            f"Заказы: {', '.join(numbers)}",
+            recipient=recipient,
+            shop=shop,
+            priority="urgent" if overdue else "high",
+            related_object_type="order",
+            action_url="/orders",
+            data={
+                "order_ids": [o["id"] for o in orders],
+                "overdue_count": len(overdue),
+            },
+        )
+
+
+class RepairServiceIndex:
+    """
+    Индекс типовых работ в кэше (общий для процессов через Redis):
+    device_model_id -> упорядоченные id применимых работ + маски магазинов.
+    Подсказки и список работ фильтруются в памяти без SQL.
+    Индекс обновляется точечно при изменении работы или модели устройства.
+    """
+
+    INDEX_KEY = "orders:repair_index"
+    VERSION_KEY = "orders:repair_index:version"
+    LOCK_KEY = "orders:repair_index:lock"
+
+    SERVICE_FIELDS = (
+        "id",
+        "code",
+        "name",
+        "device_type_id",
+        "brand_id",
+        "model_id",
+        "default_price",
+        "avg_hours",
+        "warranty_days",
+        "diagnostics_required",
+        "notes",
+    )
+
+    # Локальная копия процесса: (version, index)
+    _local = (None, None)
+
+    # --- чтение ---
+
+    @classmethod
+    def get_index(cls) -> dict:
+        version = cache.get(cls.VERSION_KEY)
+        local_version, local_index = cls._local
+        if version is not None and version == local_version:
+            return local_index
+
+        index = cache.get(cls.INDEX_KEY) if version is not None else None
+        if index is None or index["version"] != version:
+            index = cls.rebuild()
+        cls._local = (index["version"], index)
+        return index
+
+    @classmethod
+    def suggest(cls, device_model_id: int, shop_id: int = None):
+        """Работы под модель; None — если модели нет"""
+        index = cls.get_index()
+        if device_model_id not in index["device_models"]:
+            return None
+        services = index["services"]
+        return [
+            services[service_id]
+            for service_id in index["by_model"].get(device_model_id, ())
+            if cls._available(index, service_id, shop_id)
+        ]
+
+    @classmethod
+    def filter(
+        cls,
+        shop_id: int = None,
+        device_type_id: int = None,
+        brand_id: int = None,
+        model_id: int = None,
+        search: str = None,
+    ) -> list:
+        """Аналог фильтров list_repair_services по индексу"""
+        index = cls.get_index()
+        needle = search.casefold() if search else None
+
+        result = []
+        for service in index["ordered"]:
+            if model_id and service["model_id"] not in (model_id, None):
+                continue
+            if brand_id and service["brand_id"] not in (brand_id, None):
+                continue
+            if device_type_id and service["device_type_id"] not in (
+                device_type_id,
+                None,
+            ):
+                continue
+            if needle and not (
+                needle in service["name"].casefold()
+                or needle in service["code"].casefold()
+            ):
+                continue
+            if not cls._available(index, service["id"], shop_id):
+                continue
+            result.append(service)
+        return result
+
+    @staticmethod
+    def _available(index: dict, service_id: int, shop_id: int = None) -> bool:
+        # Пустой список магазинов — работа доступна везде
+        mask = index["shops"].get(service_id)
+        return not mask or shop_id is None or shop_id in mask
+
+    # --- построение ---
+
+    @classmethod
+    def rebuild(cls) -> dict:
+        """Полная сборка: три запроса, дальше только словари"""
+        from device.models import DeviceModel
+
+        index = {
+            "services": {},
+            "shops": {},
+            "device_models": {},
+            "by_model": {},
+            "ordered": [],
+        }
+        for row in DeviceModel.objects.values(
+            "id", "brand_id", "device_type_id", "name", "brand__name"
+        ):
+            index["device_models"][row["id"]] = cls._model_entry(row)
+
+        for row in RepairService.objects.filter(is_active=True).values(
+            *cls.SERVICE_FIELDS, "brand__name", "model__name"
+        ):
+            index["services"][row["id"]] = cls._service_entry(row)
+
+        through = RepairService.shops.through.objects.filter(
+            repairservice_id__in=list(index["services"])
+        ).values_list("repairservice_id", "shop_id")
+        for service_id, shop_id in through:
+            index["shops"].setdefault(service_id, set()).add(shop_id)
+
+        for model_id in index["device_models"]:
+            cls._fill_model(index, model_id)
+        cls._sort(index)
+        return cls._store(index)
+
+    @classmethod
+    def refresh_service(cls, service_id: int):
+        """Точечное обновление одной работы (после коммита)"""
+
+        def _update(index):
+            index["services"].pop(service_id, None)
+            index["shops"].pop(service_id, None)
+            for ids in index["by_model"].values():
+                if service_id in ids:
+                    ids.remove(service_id)
+
+            row = (
+                RepairService.objects.filter(id=service_id, is_active=True)
+                .values(*cls.SERVICE_FIELDS, "brand__name", "model__name")
+                .first()
+            )
+            if row is None:
+                return
+            index["services"][service_id] = cls._service_entry(row)
+            shop_ids = set(
+                RepairService.shops.through.objects.filter(
+                    repairservice_id=service_id
+                ).values_list("shop_id", flat=True)
+            )
+            if shop_ids:
+                index["shops"][service_id] = shop_ids
+            for model_id, model in index["device_models"].items():
+                if cls._applies(index["services"][service_id], model, model_id):
+                    index["by_model"].setdefault(model_id, []).append(service_id)
+
+        cls._update(_update)
+
+    @classmethod
+    def refresh_model(cls, model_id: int):
+        """Точечное обновление модели устройства (после коммита)"""
+        from device.models import DeviceModel
+
+        def _update(index):
+            index["device_models"].pop(model_id, None)
+            index["by_model"].pop(model_id, None)
+            row = (
+                DeviceModel.objects.filter(id=model_id)
+                .values("id", "brand_id", "device_type_id", "name", "brand__name")
+                .first()
+            )
+            if row is None:
+                return
+            index["device_models"][model_id] = cls._model_entry(row)
+            cls._fill_model(index, model_id)
+            # Переименование модели меняет сортировку списка работ
+            for service in index["services"].values():
+                if service["model_id"] == model_id:
+                    service["model_name"] = row["name"]
+
+        cls._update(_update)
+
+    @classmethod
+    def _update(cls, apply):
+        def _run():
+            # Параллельная правка: проще сбросить индекс, чем потерять изменение
+            if not cache.add(cls.LOCK_KEY, "1", 30):
+                cache.delete(cls.VERSION_KEY)
+                return
+            try:
+                index = cache.get(cls.INDEX_KEY)
+                if index is None or index["version"] != cache.get(cls.VERSION_KEY):
+                    cls.rebuild()
+                    return
+                apply(index)
+                cls._sort(index)
+                cls._store(index)
+            finally:
+                cache.delete(cls.LOCK_KEY)
+
+        transaction.on_commit(_run)
+
+    @classmethod
+    def _store(cls, index: dict) -> dict:
+        index["version"] = uuid4().hex
+        cache.set(cls.INDEX_KEY, index, None)
+        cache.set(cls.VERSION_KEY, index["version"], None)
+        cls._local = (index["version"], index)
+        return index
+
+    @staticmethod
+    def _model_entry(row: dict) -> dict:
+        return {
+            "brand_id": row["brand_id"],
+            "device_type_id": row["device_type_id"],
+        }
+
+    @staticmethod
+    def _service_entry(row: dict) -> dict:
+        entry = {field: row[field] for field in RepairServiceIndex.SERVICE_FIELDS}
+        entry["default_price"] = float(row["default_price"])
+        entry["avg_hours"] = float(row["avg_hours"])
+        entry["brand_name"] = row["brand__name"]
+        entry["model_name"] = row["model__name"]
+        return entry
+
+    @staticmethod
+    def _applies(service: dict, model: dict, model_id: int) -> bool:
+        """Та же логика, что и OR-фильтр suggest_repair_services"""
+        if service["model_id"] is not None:
+            return service["model_id"] == model_id
+        if service["brand_id"] is not None:
+            return service["brand_id"] == model["brand_id"]
+        return service["device_type_id"] == model["device_type_id"]
+
+    @classmethod
+    def _fill_model(cls, index: dict, model_id: int):
+        model = index["device_models"][model_id]
+        ids = [
+            service_id
+            for service_id, service in index["services"].items()
+            if cls._applies(service, model, model_id)
+        ]
+        if ids:
+            index["by_model"][model_id] = ids
+
+    @staticmethod
+    def _sort(index: dict):
+        services = index["services"]
+        for ids in index["by_model"].values():
+            ids.sort(key=lambda service_id: services[service_id]["name"])
+        index["ordered"] = sorted(
+            services.values(),
+            key=lambda s: (
+                # как ORDER BY в PostgreSQL: NULL в конце
+                s["brand_name"] is None,
+                s["brand_name"] or "",
+                s["model_name"] is None,
+                s["model_name"] or "",
+                s["name"],
+            ),
+        )
@@ -1,25 +1,67 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
 from communications.services import communication_service
+from customers.services import CustomerStatsService
+from device.models import DeviceModel
 from loyalty.services import LoyaltyService
+from notifications.live import DashboardStream
 from notifications.services import notification_service
 
-from .models import Order
+from .models import Order, RepairService
+from .services import OrderBoardService, RepairServiceIndex
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender, instance: Order, **kwargs):
+    # Состояние до сохранения: для уведомлений и дельт статистики клиента
+    instance._previous_state = None
+    if instance.id:
+        instance._previous_state = (
+            sender.objects.filter(id=instance.id)
+            .values(*CustomerStatsService.ORDER_STATE_FIELDS, "estimated_completion")
+            .first()
+        )
 
 
 @receiver(pre_save, sender=Order)
 def notify_status_change(sender, instance: Order, **kwargs):
-    if not instance.id:
-        return
-    old = sender.objects.get(id=instance.id)
-    if old.status != instance.status:
+    old = instance._previous_state
+    if old and old["status"] != instance.status:
         notification_service.notify_order_status_change(
-            instance, old.status, instance.status, instance.created_by
+            instance, old["status"], instance.status, instance.created_by
         )
 
 
+@receiver(post_save, sender=Order)
+def update_customer_stats(sender, instance: Order, created, **kwargs):
+    previous = None if created else getattr(instance, "_previous_state", None)
+    if not created and previous is None:
+        return
+    CustomerStatsService.order_saved(instance, previous)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted_stats(sender, instance: Order, **kwargs):
+    CustomerStatsService.order_deleted(instance)
+
+
+@receiver(post_save, sender=Order)
+def push_order_status_delta(sender, instance: Order, created, **kwargs):
+    previous = None if created else getattr(instance, "_previous_state", None)
+    if not created and previous is None:
+        return
+    DashboardStream.order_status_changed(
+        instance.shop_id, previous and previous["status"], instance.status
+    )
+
+
+@receiver(post_delete, sender=Order)
+def push_order_deleted_delta(sender, instance: Order, **kwargs):
+    DashboardStream.order_status_changed(instance.shop_id, instance.status, None)
+
+
 @receiver(post_save, sender=Order)
 def post_order_saved(sender, instance: Order, created, **kwargs):
     # Начисление баллов при выдаче (completed)
@@ -52,3 +94,48 @@ def post_order_saved(sender, instance: Order, created, **kwargs):
             Order.objects.filter(pk=instance.pk).update(
                 sla_on_time=None, sla_delay_minutes=None
             )
+
+
+@receiver(post_save, sender=Order)
+def reset_sla_warning(sender, instance: Order, created, **kwargs):
+    # Новый срок готовности — сканер SLA предупреждает заново
+    old = instance._previous_state
+    if (
+        old
+        and instance.sla_warning
+        and old["estimated_completion"] != instance.estimated_completion
+    ):
+        instance.sla_warning = Order.SlaWarningChoices.NONE
+        Order.objects.filter(pk=instance.pk).update(sla_warning=instance.sla_warning)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_order_board(sender, instance: Order, **kwargs):
+    OrderBoardService.invalidate(instance.shop_id)
+
+
+@receiver(post_save, sender=RepairService)
+@receiver(post_delete, sender=RepairService)
+def refresh_repair_service_index(sender, instance: RepairService, **kwargs):
+    RepairServiceIndex.refresh_service(instance.id)
+
+
+@receiver(m2m_changed, sender=RepairService.shops.through)
+def refresh_repair_service_shops(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    # reverse: shop.repairservice_set.add(...) — в pk_set id работ
+    if not reverse:
+        RepairServiceIndex.refresh_service(instance.id)
+    elif pk_set:
+        for service_id in pk_set:
+            RepairServiceIndex.refresh_service(service_id)
+    else:
+        RepairServiceIndex.rebuild()
+
+
+@receiver(post_save, sender=DeviceModel)
+@receiver(post_delete, sender=DeviceModel)
+def refresh_device_model_index(sender, instance: DeviceModel, **kwargs):
+    RepairServiceIndex.refresh_model(instance.id)
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .services import SlaWarningService
+
+
+@shared_task(name="orders.tasks.scan_sla_breaches")
+def scan_sla_breaches():
+    return SlaWarningService.scan()
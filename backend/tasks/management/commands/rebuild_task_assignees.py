@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tasks.services import TaskAssigneeIndex
+
+
+class Command(BaseCommand):
+    help = "Пересборка таблицы исполнителей задач (TaskAssignee)"
+
+    def handle(self, *args, **options):
+        users = TaskAssigneeIndex.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Пользователей: {users}"))
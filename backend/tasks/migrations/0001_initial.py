@@ -0,0 +1,486 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:00
+
+# До этой миграции у приложения tasks не было миграций, и таблицы задач
+# создавались только через migrate --run-syncdb. На таких базах начальная
+# миграция применяется как уже выполненная: migrate --fake-initial
+# (так запускается docker-compose) или migrate tasks 0001 --fake.
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("customers", "0005_customersegment"),
+        ("orders", "0004_sla_warning"),
+        ("shops", "0002_organization_shopsettings_pos_barcode_enabled_and_more"),
+        ("users", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskCategory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100, unique=True, verbose_name="Название"
+                    ),
+                ),
+                ("description", models.TextField(blank=True, verbose_name="Описание")),
+                (
+                    "color",
+                    models.CharField(
+                        default="#007bff", max_length=7, verbose_name="Цвет"
+                    ),
+                ),
+                (
+                    "icon",
+                    models.CharField(blank=True, max_length=50, verbose_name="Иконка"),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(default=True, verbose_name="Активна"),
+                ),
+            ],
+            options={
+                "verbose_name": "Категория задач",
+                "verbose_name_plural": "Категории задач",
+            },
+        ),
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=200, verbose_name="Заголовок")),
+                ("description", models.TextField(verbose_name="Описание")),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Низкий"),
+                            ("normal", "Обычный"),
+                            ("high", "Высокий"),
+                            ("urgent", "Срочный"),
+                        ],
+                        default="normal",
+                        max_length=10,
+                        verbose_name="Приоритет",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("in_progress", "В работе"),
+                            ("completed", "Выполнена"),
+                            ("cancelled", "Отменена"),
+                            ("overdue", "Просрочена"),
+                        ],
+                        default="pending",
+                        max_length=15,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "assignment_type",
+                    models.CharField(
+                        choices=[
+                            ("individual", "Конкретному сотруднику"),
+                            ("shop", "Магазину"),
+                            ("all_shops", "Всем магазинам"),
+                            ("role", "По роли"),
+                        ],
+                        max_length=15,
+                        verbose_name="Тип назначения",
+                    ),
+                ),
+                (
+                    "due_date",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Срок выполнения"
+                    ),
+                ),
+                (
+                    "estimated_hours",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        verbose_name="Оценка времени (часы)",
+                    ),
+                ),
+                (
+                    "actual_hours",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        verbose_name="Фактическое время (часы)",
+                    ),
+                ),
+                (
+                    "progress_percent",
+                    models.PositiveIntegerField(default=0, verbose_name="Прогресс %"),
+                ),
+                (
+                    "attachments",
+                    models.JSONField(blank=True, default=list, verbose_name="Вложения"),
+                ),
+                (
+                    "is_recurring",
+                    models.BooleanField(default=False, verbose_name="Повторяющаяся"),
+                ),
+                (
+                    "recurrence_pattern",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Шаблон повторения"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Начато"),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Завершено"
+                    ),
+                ),
+                (
+                    "assigned_role",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="users.role",
+                        verbose_name="Назначено роли",
+                    ),
+                ),
+                (
+                    "assigned_shop",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="shops.shop",
+                        verbose_name="Назначено магазину",
+                    ),
+                ),
+                (
+                    "assigned_to",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="assigned_tasks",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Назначено пользователю",
+                    ),
+                ),
+                (
+                    "completed_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="completed_tasks",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Выполнил",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="created_tasks",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Создал",
+                    ),
+                ),
+                (
+                    "parent_task",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="tasks.task",
+                        verbose_name="Родительская задача",
+                    ),
+                ),
+                (
+                    "related_customer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="customers.customer",
+                        verbose_name="Связанный клиент",
+                    ),
+                ),
+                (
+                    "related_order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="orders.order",
+                        verbose_name="Связанный заказ",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="tasks.taskcategory",
+                        verbose_name="Категория",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Задача",
+                "verbose_name_plural": "Задачи",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="TaskComment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("text", models.TextField(verbose_name="Текст комментария")),
+                (
+                    "attachments",
+                    models.JSONField(blank=True, default=list, verbose_name="Вложения"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="comments",
+                        to="tasks.task",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Комментарий к задаче",
+                "verbose_name_plural": "Комментарии к задачам",
+                "ordering": ["created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="TaskTemplate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200, verbose_name="Название")),
+                (
+                    "title_template",
+                    models.CharField(max_length=200, verbose_name="Шаблон заголовка"),
+                ),
+                (
+                    "description_template",
+                    models.TextField(verbose_name="Шаблон описания"),
+                ),
+                (
+                    "default_priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Низкий"),
+                            ("normal", "Обычный"),
+                            ("high", "Высокий"),
+                            ("urgent", "Срочный"),
+                        ],
+                        default="normal",
+                        max_length=10,
+                        verbose_name="Приоритет по умолчанию",
+                    ),
+                ),
+                (
+                    "default_assignment_type",
+                    models.CharField(
+                        choices=[
+                            ("individual", "Конкретному сотруднику"),
+                            ("shop", "Магазину"),
+                            ("all_shops", "Всем магазинам"),
+                            ("role", "По роли"),
+                        ],
+                        default="individual",
+                        max_length=15,
+                        verbose_name="Тип назначения по умолчанию",
+                    ),
+                ),
+                (
+                    "estimated_hours",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        verbose_name="Оценка времени (часы)",
+                    ),
+                ),
+                (
+                    "auto_create_trigger",
+                    models.CharField(
+                        blank=True,
+                        help_text="Например: order_created, customer_registered",
+                        max_length=50,
+                        verbose_name="Триггер автосоздания",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(default=True, verbose_name="Активен"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="tasks.taskcategory",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Шаблон задачи",
+                "verbose_name_plural": "Шаблоны задач",
+            },
+        ),
+        migrations.CreateModel(
+            name="TaskTimeLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField(verbose_name="Начало")),
+                (
+                    "ended_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Окончание"
+                    ),
+                ),
+                (
+                    "duration_minutes",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Длительность (мин)"
+                    ),
+                ),
+                (
+                    "description",
+                    models.TextField(blank=True, verbose_name="Описание работы"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="time_logs",
+                        to="tasks.task",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Лог времени",
+                "verbose_name_plural": "Логи времени",
+                "ordering": ["-started_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["assigned_to", "status"], name="tasks_task_assigne_b3b2bc_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["assigned_shop", "status"], name="tasks_task_assigne_888bfb_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["due_date"], name="tasks_task_due_dat_bce847_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["status", "priority"], name="tasks_task_status_01b536_idx"
+            ),
+        ),
+    ]
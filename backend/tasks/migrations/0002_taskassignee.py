@@ -0,0 +1,165 @@
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def fill_task_assignees(apps, schema_editor):
+    """
+    Первичное заполнение по правилам Task.get_assignees_queryset:
+    исполнитель, активные пользователи активного магазина, роли или все
+    активные; assigned_to — при любом типе назначения.
+    Дальше строки поддерживает TaskAssigneeIndex (сигналы tasks).
+    """
+    Task = apps.get_model("tasks", "Task")
+    TaskAssignee = apps.get_model("tasks", "TaskAssignee")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    UserShop = apps.get_model("users", "UserShop")
+
+    active = User.objects.filter(is_active=True)
+    active_ids = list(active.values_list("id", flat=True))
+    by_role, by_shop = defaultdict(list), defaultdict(list)
+    for user_id, role_id in active.exclude(role=None).values_list("id", "role_id"):
+        by_role[role_id].append(user_id)
+    shop_users = UserShop.objects.filter(user__is_active=True, shop__is_active=True)
+    for user_id, shop_id in shop_users.values_list("user_id", "shop_id"):
+        by_shop[shop_id].append(user_id)
+
+    batch = []
+    tasks = Task.objects.values_list(
+        "id",
+        "assignment_type",
+        "assigned_to_id",
+        "assigned_shop_id",
+        "assigned_role_id",
+        "status",
+        "due_date",
+        "priority",
+    )
+    for (
+        task_id,
+        assignment_type,
+        assigned_to_id,
+        shop_id,
+        role_id,
+        status,
+        due_date,
+        priority,
+    ) in tasks.iterator(chunk_size=BATCH_SIZE):
+        if assignment_type == "shop":
+            user_ids = by_shop.get(shop_id, [])
+        elif assignment_type == "all_shops":
+            user_ids = active_ids
+        elif assignment_type == "role":
+            user_ids = by_role.get(role_id, [])
+        else:
+            user_ids = []
+        if assigned_to_id:
+            user_ids = [*user_ids, assigned_to_id]
+        batch.extend(
+            TaskAssignee(
+                task_id=task_id,
+                user_id=user_id,
+                status=status,
+                due_date=due_date,
+                priority=priority,
+            )
+            for user_id in set(user_ids)
+        )
+        if len(batch) >= BATCH_SIZE:
+            TaskAssignee.objects.bulk_create(batch)
+            batch = []
+    TaskAssignee.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tasks", "0001_initial"),
+        ("users", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskAssignee",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("in_progress", "В работе"),
+                            ("completed", "Выполнена"),
+                            ("cancelled", "Отменена"),
+                            ("overdue", "Просрочена"),
+                        ],
+                        max_length=15,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "due_date",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Срок выполнения"
+                    ),
+                ),
+                (
+                    "priority",
+                    models.CharField(
+                        choices=[
+                            ("low", "Низкий"),
+                            ("normal", "Обычный"),
+                            ("high", "Высокий"),
+                            ("urgent", "Срочный"),
+                        ],
+                        max_length=10,
+                        verbose_name="Приоритет",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="assignee_rows",
+                        to="tasks.task",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_assignments",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Исполнитель задачи",
+                "verbose_name_plural": "Исполнители задач",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "status", "due_date"],
+                        name="tasks_taska_user_id_58311b_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "task"), name="tasks_assignee_user_task_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_task_assignees, migrations.RunPython.noop),
+    ]
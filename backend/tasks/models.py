@@ -180,33 +180,35 @@ class Task(models.Model):
             return timezone.now() > self.due_date
         return False
 
-    def get_assignees(self):
-        """Получить всех исполнителей задачи"""
-        assignees = []
-
-        if self.assignment_type == self.AssignmentType.INDIVIDUAL and self.assigned_to:
-            assignees.append(self.assigned_to)
-
-        elif self.assignment_type == self.AssignmentType.SHOP and self.assigned_shop:
-            # Все пользователи магазина
-            from users.models import UserShop
-
-            shop_users = User.objects.filter(
-                usershop__shop=self.assigned_shop, is_active=True
+    def get_assignees_queryset(self):
+        """Исполнители задачи одним запросом (для массовых уведомлений)"""
+        if (
+            self.assignment_type == self.AssignmentType.INDIVIDUAL
+            and self.assigned_to_id
+        ):
+            return User.objects.filter(id=self.assigned_to_id)
+
+        if self.assignment_type == self.AssignmentType.SHOP and self.assigned_shop_id:
+            # Все пользователи магазина (как get_available_shops — только активного)
+            return User.objects.filter(
+                usershop__shop_id=self.assigned_shop_id,
+                usershop__shop__is_active=True,
+                is_active=True,
             )
-            assignees.extend(shop_users)
 
-        elif self.assignment_type == self.AssignmentType.ALL_SHOPS:
+        if self.assignment_type == self.AssignmentType.ALL_SHOPS:
             # Все активные пользователи
-            assignees.extend(User.objects.filter(is_active=True))
+            return User.objects.filter(is_active=True)
 
-        elif self.assignment_type == self.AssignmentType.ROLE and self.assigned_role:
+        if self.assignment_type == self.AssignmentType.ROLE and self.assigned_role_id:
             # Пользователи с определенной ролью
-            assignees.extend(
-                User.objects.filter(role=self.assigned_role, is_active=True)
-            )
+            return User.objects.filter(role_id=self.assigned_role_id, is_active=True)
 
-        return assignees
+        return User.objects.none()
+
+    def get_assignees(self):
+        """Получить всех исполнителей задачи"""
+        return list(self.get_assignees_queryset())
 
     def save(self, *args, **kwargs):
         # Автоматически обновляем статус на просроченный
@@ -224,6 +226,39 @@ class Task(models.Model):
         super().save(*args, **kwargs)
 
 
+class TaskAssignee(models.Model):
+    """
+    Исполнители задачи, развернутые при записи (fan-out-on-write):
+    «мои задачи» и сводка читаются по индексу (user, status, due_date)
+    вместо OR по четырем типам назначения. Статус, срок и приоритет
+    копируются из задачи; строки поддерживает TaskAssigneeIndex.
+    """
+
+    task = models.ForeignKey(
+        Task, on_delete=models.CASCADE, related_name="assignee_rows"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="task_assignments"
+    )
+    status = models.CharField("Статус", max_length=15, choices=Task.Status.choices)
+    due_date = models.DateTimeField("Срок выполнения", null=True, blank=True)
+    priority = models.CharField(
+        "Приоритет", max_length=10, choices=Task.Priority.choices
+    )
+
+    class Meta:
+        verbose_name = "Исполнитель задачи"
+        verbose_name_plural = "Исполнители задач"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "task"], name="tasks_assignee_user_task_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "status", "due_date"]),
+        ]
+
+
 class TaskComment(models.Model):
     """Комментарии к задачам"""
 
@@ -1,15 +1,14 @@
 from typing import List, Optional
 
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from ninja import Query, Router
 from ninja.pagination import paginate
 
 from .models import Task, TaskCategory, TaskComment, TaskTemplate
 from .schemas import TaskCreateSchema, TaskSchema, TaskUpdateSchema
-from .services import TaskService
+from .services import TaskAssigneeIndex, TaskService
 
 router = Router(tags=["Задачи"])
 
@@ -26,20 +25,8 @@ def list_tasks(request, status: str = None, assigned_to_me: bool = False):
     ).prefetch_related("comments")
 
     if assigned_to_me:
-        # Задачи, назначенные текущему пользователю
-        user_tasks = Q(assigned_to=request.auth)
-
-        # Задачи магазинов пользователя
-        user_shops = request.auth.get_available_shops()
-        shop_tasks = Q(assignment_type="shop", assigned_shop__in=user_shops)
-
-        # Задачи для всех
-        all_tasks = Q(assignment_type="all_shops")
-
-        # Задачи по роли
-        role_tasks = Q(assignment_type="role", assigned_role=request.auth.role)
-
-        queryset = queryset.filter(user_tasks | shop_tasks | all_tasks | role_tasks)
+        # Задачи пользователя — по развернутой таблице исполнителей
+        queryset = queryset.filter(assignee_rows__user=request.auth)
 
     elif not request.auth.is_director:
         # Ограничиваем видимость для обычных пользователей
@@ -157,41 +144,7 @@ def get_my_tasks_summary(request):
     if not request.auth.has_permission("tasks.view_task"):
         raise PermissionError("Нет прав для просмотра задач")
 
-    # Задачи, назначенные пользователю
-    user_tasks = Q(assigned_to=request.auth)
-    user_shops = request.auth.get_available_shops()
-    shop_tasks = Q(assignment_type="shop", assigned_shop__in=user_shops)
-    all_tasks = Q(assignment_type="all_shops")
-    role_tasks = Q(assignment_type="role", assigned_role=request.auth.role)
-
-    my_tasks = Task.objects.filter(user_tasks | shop_tasks | all_tasks | role_tasks)
-
-    # Статистика по статусам
-    status_stats = my_tasks.values("status").annotate(count=Count("id"))
-
-    # Просроченные задачи
-    overdue_tasks = my_tasks.filter(
-        due_date__lt=timezone.now(),
-        status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS],
-    ).count()
-
-    # Задачи на сегодня
-    today = timezone.now().date()
-    today_tasks = my_tasks.filter(
-        due_date__date=today, status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS]
-    ).count()
-
-    return {
-        "total_tasks": my_tasks.count(),
-        "status_breakdown": {item["status"]: item["count"] for item in status_stats},
-        "overdue_tasks": overdue_tasks,
-        "due_today": today_tasks,
-        "priority_breakdown": dict(
-            my_tasks.values("priority")
-            .annotate(count=Count("id"))
-            .values_list("priority", "count")
-        ),
-    }
+    return TaskAssigneeIndex.summary(request.auth)
 
 
 @router.get("/templates", response=List[dict])
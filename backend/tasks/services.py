@@ -1,11 +1,18 @@
-from django.db import models
-from django.db.models import Q
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 
 from inventory.models import StockBalance
 from notifications.services import notification_service
+from users.models import UserShop
+
+from .models import Task, TaskAssignee, TaskCategory, TaskTemplate
 
-from .models import Task, TaskCategory, TaskTemplate
+User = get_user_model()
 
 
 class TaskService:
@@ -13,25 +20,22 @@ class TaskService:
 
     def notify_assignees(self, task):
         """Уведомить исполнителей о новой задаче"""
-        assignees = task.get_assignees()
-
-        for assignee in assignees:
-            notification_service.create_notification(
-                notification_type_code="task_assigned",
-                title=f"Новая задача: {task.title}",
-                message=f'Вам назначена задача "{task.title}"',
-                recipient=assignee,
-                priority="normal",
-                related_object_type="task",
-                related_object_id=task.id,
-                action_url=f"/tasks/{task.id}",
-                data={
-                    "task_id": task.id,
-                    "task_title": task.title,
-                    "priority": task.priority,
-                    "due_date": task.due_date.isoformat() if task.due_date else None,
-                },
-            )
+        notification_service.create_notifications(
+            notification_type_code="task_assigned",
+            recipients=task.get_assignees_queryset(),
+            title=f"Новая задача: {task.title}",
+            message=f'Вам назначена задача "{task.title}"',
+            priority="normal",
+            related_object_type="task",
+            related_object_id=task.id,
+            action_url=f"/tasks/{task.id}",
+            data={
+                "task_id": task.id,
+                "task_title": task.title,
+                "priority": task.priority,
+                "due_date": task.due_date.isoformat() if task.due_date else None,
+            },
+        )
 
     def notify_status_change(self, task, old_status):
         """Уведомить о смене статуса задачи"""
@@ -50,26 +54,23 @@ class TaskService:
 
     def notify_new_comment(self, task, comment):
         """Уведомить о новом комментарии"""
-        # Собираем всех участников обсуждения
-        participants = set()
-        participants.add(task.created_by)
-        participants.update(task.get_assignees())
-        participants.update(task.comments.values_list("author", flat=True))
-
-        # Исключаем автора комментария
-        participants.discard(comment.author)
+        # Участники обсуждения (кроме автора комментария) — одним запросом
+        participants = User.objects.filter(
+            Q(id=task.created_by_id)
+            | Q(id__in=task.get_assignees_queryset().values("id"))
+            | Q(id__in=task.comments.values("author_id"))
+        ).exclude(id=comment.author_id)
 
-        for participant in participants:
-            notification_service.create_notification(
-                notification_type_code="task_comment",
-                title=f"Новый комментарий к задаче: {task.title}",
-                message=f"{comment.author.get_full_name()} добавил комментарий",
-                recipient=participant,
-                priority="low",
-                related_object_type="task",
-                related_object_id=task.id,
-                action_url=f"/tasks/{task.id}",
-            )
+        notification_service.create_notifications(
+            notification_type_code="task_comment",
+            recipients=participants,
+            title=f"Новый комментарий к задаче: {task.title}",
+            message=f"{comment.author.get_full_name()} добавил комментарий",
+            priority="low",
+            related_object_type="task",
+            related_object_id=task.id,
+            action_url=f"/tasks/{task.id}",
+        )
 
     def auto_create_tasks_for_order(self, order):
         """Автоматическое создание задач при создании заказа"""
@@ -94,30 +95,65 @@ class TaskService:
                 assigned_shop=order.shop,
             )
 
-    def check_overdue_tasks(self):
-        """Проверить просроченные задачи (для cron)"""
-        overdue_tasks = Task.objects.filter(
-            due_date__lt=timezone.now(),
-            status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS],
-        ).exclude(status=Task.Status.OVERDUE)
-
-        for task in overdue_tasks:
-            task.status = Task.Status.OVERDUE
-            task.save()
-
-            # Уведомляем о просрочке
-            assignees = task.get_assignees()
-            for assignee in assignees:
-                notification_service.create_notification(
-                    notification_type_code="task_overdue",
-                    title=f"Задача просрочена: {task.title}",
-                    message=f'Задача "{task.title}" просрочена на {(timezone.now() - task.due_date).days} дней',
-                    recipient=assignee,
-                    priority="high",
-                    related_object_type="task",
-                    related_object_id=task.id,
-                    action_url=f"/tasks/{task.id}",
-                )
+    def check_overdue_tasks(self, now=None) -> dict:
+        """
+        Перевести просроченные задачи в OVERDUE и уведомить исполнителей
+        (по расписанию). Статусы меняются одним UPDATE ... RETURNING,
+        исполнители всех задач читаются одним запросом из TaskAssignee,
+        уведомления — одна массовая вставка.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            tasks = self.mark_overdue(now)
+
+            # UPDATE в обход save(): копию статуса в TaskAssignee — тоже пачкой
+            affected = TaskAssignee.objects.filter(
+                task__status=Task.Status.OVERDUE
+            ).exclude(status=Task.Status.OVERDUE)
+            assignees = defaultdict(list)
+            for task_id, user_id in affected.values_list("task_id", "user_id"):
+                assignees[task_id].append(user_id)
+            affected.update(status=Task.Status.OVERDUE)
+            recipients = {
+                user_id for user_ids in assignees.values() for user_id in user_ids
+            }
+            TaskAssigneeIndex.invalidate(recipients)
+
+            notification_service.create_notifications_many(
+                "task_overdue",
+                recipients,
+                [
+                    {
+                        "recipient_ids": assignees.get(task.id, []),
+                        "title": f"Задача просрочена: {task.title}",
+                        "message": f'Задача "{task.title}" просрочена на {(now - task.due_date).days} дней',
+                        "related_object_id": task.id,
+                        "action_url": f"/tasks/{task.id}",
+                    }
+                    for task in tasks
+                ],
+                priority="high",
+                related_object_type="task",
+            )
+        return {"overdue": len(tasks)}
+
+    @staticmethod
+    def mark_overdue(now) -> list:
+        """Сменить статус просроченных задач; вернуть их (id, title, due_date)"""
+        return list(
+            Task.objects.raw(
+                f"UPDATE {Task._meta.db_table} SET status = %s, updated_at = %s "
+                "WHERE due_date < %s AND status IN (%s, %s) "
+                "RETURNING id, title, due_date",
+                [
+                    Task.Status.OVERDUE,
+                    now,
+                    now,
+                    Task.Status.PENDING,
+                    Task.Status.IN_PROGRESS,
+                ],
+            )
+        )
 
     def create_low_stock_tasks(self):
         """Создать/обновить задачи по товарам с низким остатком"""
@@ -171,3 +207,152 @@ class TaskService:
             )
             created += 1
         return created
+
+
+class TaskAssigneeIndex:
+    """
+    Поддержка TaskAssignee: строки задачи пересчитываются при ее сохранении,
+    строки пользователя — при смене магазинов, роли или активности.
+    Сводка «мои задачи» — один запрос с условной агрегацией, кэш на пользователя.
+    """
+
+    SUMMARY_KEY = "tasks:summary:{}"
+    SUMMARY_TTL = 60 * 5
+    OPEN_STATUSES = (Task.Status.PENDING, Task.Status.IN_PROGRESS)
+
+    @classmethod
+    def refresh_task(cls, task: Task):
+        """Синхронизировать исполнителей задачи и скопированные поля"""
+        target = set(task.get_assignees_queryset().values_list("id", flat=True))
+        if task.assigned_to_id:
+            # «Мои задачи»: assigned_to учитывается при любом типе назначения
+            target.add(task.assigned_to_id)
+        rows = TaskAssignee.objects.filter(task=task)
+        current = set(rows.values_list("user_id", flat=True))
+
+        if current - target:
+            rows.filter(user_id__in=current - target).delete()
+        if current & target:
+            rows.update(
+                status=task.status, due_date=task.due_date, priority=task.priority
+            )
+        TaskAssignee.objects.bulk_create(
+            [
+                TaskAssignee(
+                    task=task,
+                    user_id=user_id,
+                    status=task.status,
+                    due_date=task.due_date,
+                    priority=task.priority,
+                )
+                for user_id in target - current
+            ],
+            ignore_conflicts=True,
+        )
+        cls.invalidate(current | target)
+
+    @classmethod
+    def refresh_user(cls, user_id: int):
+        """Пересобрать задачи пользователя (магазины, роль, активность)"""
+        user = User.objects.filter(id=user_id).values("is_active", "role_id").first()
+        if user is None:
+            return
+
+        # Те же правила, что в Task.get_assignees_queryset, плюс assigned_to
+        # при любом типе назначения (как прежний фильтр «мои задачи»)
+        assigned = Q(assigned_to_id=user_id)
+        if user["is_active"]:
+            assigned |= Q(assignment_type=Task.AssignmentType.ALL_SHOPS) | Q(
+                assignment_type=Task.AssignmentType.SHOP,
+                assigned_shop_id__in=UserShop.objects.filter(
+                    user_id=user_id, shop__is_active=True
+                ).values("shop_id"),
+            )
+            if user["role_id"]:
+                assigned |= Q(
+                    assignment_type=Task.AssignmentType.ROLE,
+                    assigned_role_id=user["role_id"],
+                )
+        target = {
+            task_id: (status, due_date, priority)
+            for task_id, status, due_date, priority in Task.objects.filter(
+                assigned
+            ).values_list("id", "status", "due_date", "priority")
+        }
+        rows = TaskAssignee.objects.filter(user_id=user_id)
+        current = set(rows.values_list("task_id", flat=True))
+
+        if current - target.keys():
+            rows.filter(task_id__in=current - target.keys()).delete()
+        TaskAssignee.objects.bulk_create(
+            [
+                TaskAssignee(
+                    task_id=task_id,
+                    user_id=user_id,
+                    status=target[task_id][0],
+                    due_date=target[task_id][1],
+                    priority=target[task_id][2],
+                )
+                for task_id in target.keys() - current
+            ],
+            ignore_conflicts=True,
+        )
+        cls.invalidate([user_id])
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Пересобрать таблицу целиком (первичное заполнение)"""
+        users = 0
+        for user_id in User.objects.values_list("id", flat=True).iterator():
+            cls.refresh_user(user_id)
+            users += 1
+        return users
+
+    @classmethod
+    def invalidate(cls, user_ids):
+        keys = [cls.SUMMARY_KEY.format(user_id) for user_id in user_ids]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @classmethod
+    def summary(cls, user) -> dict:
+        """Сводка по задачам пользователя: один агрегат по TaskAssignee"""
+        key = cls.SUMMARY_KEY.format(user.id)
+        today = timezone.localdate()
+        cached = cache.get(key)
+        if cached and cached["date"] == today.isoformat():
+            return cached["summary"]
+
+        is_open = Q(status__in=cls.OPEN_STATUSES)
+        aggregates = {
+            "total_tasks": Count("id"),
+            "overdue_tasks": Count(
+                "id", filter=is_open & Q(due_date__lt=timezone.now())
+            ),
+            "due_today": Count("id", filter=is_open & Q(due_date__date=today)),
+        }
+        for status in Task.Status.values:
+            aggregates[f"status_{status}"] = Count("id", filter=Q(status=status))
+        for priority in Task.Priority.values:
+            aggregates[f"priority_{priority}"] = Count(
+                "id", filter=Q(priority=priority)
+            )
+        totals = TaskAssignee.objects.filter(user=user).aggregate(**aggregates)
+
+        summary = {
+            "total_tasks": totals["total_tasks"],
+            "status_breakdown": {
+                status: totals[f"status_{status}"]
+                for status in Task.Status.values
+                if totals[f"status_{status}"]
+            },
+            "overdue_tasks": totals["overdue_tasks"],
+            "due_today": totals["due_today"],
+            "priority_breakdown": {
+                priority: totals[f"priority_{priority}"]
+                for priority in Task.Priority.values
+                if totals[f"priority_{priority}"]
+            },
+        }
+        cache.set(key, {"date": today.isoformat(), "summary": summary}, cls.SUMMARY_TTL)
+        return summary
@@ -0,0 +1,83 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from shops.models import Shop
+from users.models import User, UserShop
+
+from .models import Task
+from .services import TaskAssigneeIndex
+
+
+@receiver(post_save, sender=Task)
+def refresh_task_assignees(sender, instance: Task, **kwargs):
+    TaskAssigneeIndex.refresh_task(instance)
+
+
+@receiver(pre_delete, sender=Task)
+def forget_task_assignees(sender, instance: Task, **kwargs):
+    TaskAssigneeIndex.invalidate(
+        list(instance.assignee_rows.values_list("user_id", flat=True))
+    )
+
+
+@receiver(post_save, sender=UserShop)
+@receiver(post_delete, sender=UserShop)
+def refresh_user_shop_tasks(sender, instance: UserShop, **kwargs):
+    TaskAssigneeIndex.refresh_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.shops.through)
+def refresh_user_shop_set_tasks(sender, instance, action, reverse, pk_set, **kwargs):
+    # user.shops.add/remove/set/clear пишут UserShop без post_save
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            TaskAssigneeIndex.refresh_user(instance.id)
+        return
+    if action == "pre_clear":
+        # После очистки пользователей магазина уже не найти
+        instance._cleared_user_ids = list(
+            UserShop.objects.filter(shop=instance).values_list("user_id", flat=True)
+        )
+        return
+    if action == "post_clear":
+        pk_set = instance._cleared_user_ids
+    elif action not in ("post_add", "post_remove"):
+        return
+    for user_id in pk_set:
+        TaskAssigneeIndex.refresh_user(user_id)
+
+
+@receiver(post_save, sender=User)
+def refresh_user_tasks(sender, instance: User, update_fields=None, **kwargs):
+    # Вход (last_login) и прочие частичные сохранения не меняют назначения
+    if update_fields is not None and not {"role", "is_active"} & set(update_fields):
+        return
+    TaskAssigneeIndex.refresh_user(instance.id)
+
+
+@receiver(pre_save, sender=Shop)
+def remember_shop_activity(sender, instance: Shop, update_fields=None, **kwargs):
+    instance._tasks_was_active = None
+    if instance.id and (update_fields is None or "is_active" in update_fields):
+        instance._tasks_was_active = (
+            sender.objects.filter(id=instance.id)
+            .values_list("is_active", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Shop)
+def refresh_shop_user_tasks(sender, instance: Shop, created, **kwargs):
+    # Задачи неактивного магазина выпадают из «моих задач» его пользователей
+    if created or instance._tasks_was_active in (None, instance.is_active):
+        return
+    for user_id in UserShop.objects.filter(shop=instance).values_list(
+        "user_id", flat=True
+    ):
+        TaskAssigneeIndex.refresh_user(user_id)
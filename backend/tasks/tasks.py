@@ -8,3 +8,8 @@ def low_stock_scan():
     service = TaskService()
     created = service.create_low_stock_tasks()
     return {"created": created}
+
+
+@shared_task(name="tasks.tasks.check_overdue_tasks")
+def check_overdue_tasks():
+    return TaskService().check_overdue_tasks()
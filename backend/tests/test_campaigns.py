@@ -0,0 +1,149 @@
+import smtplib
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from communications.campaigns import CampaignService
+from communications.gateways import FakeSmsGateway, get_sms_gateway
+from communications.models import Campaign, CampaignMessage
+from communications.tasks import send_campaign_batch
+from customers.models import Customer
+
+
+class CampaignTestCase(TestCase):
+    def setUp(self):
+        Customer.objects.create(
+            first_name="Ivan",
+            last_name="Petrov",
+            phone="+79991112233",
+            email="ivan@example.com",
+            marketing_consent=True,
+        )
+        Customer.objects.create(
+            first_name="Anna",
+            last_name="Smirnova",
+            phone="+79994445566",
+            email="anna@example.com",
+            marketing_consent=True,
+            preferred_channel="sms",
+        )
+        Customer.objects.create(
+            first_name="Oleg",
+            last_name="Sidorov",
+            phone="+79997778899",
+            email="oleg@example.com",
+            marketing_consent=False,
+        )
+
+    def _launch(self, campaign):
+        with mock.patch("communications.tasks.send_campaign_batch.delay") as delay:
+            CampaignService.launch(campaign)
+        for call in delay.call_args_list:
+            CampaignService.send_batch(*call.args)
+        campaign.refresh_from_db()
+
+    def test_email_campaign_respects_consent_and_channel(self):
+        """Тест email-рассылки: согласие, предпочтительный канал, статусы"""
+        campaign = Campaign.objects.create(
+            name="Promo",
+            channel=Campaign.Channel.EMAIL,
+            subject="Скидка для {{ first_name }}",
+            body="{{ full_name }}, ждем вас!",
+        )
+
+        self._launch(campaign)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Скидка для Ivan")
+        self.assertEqual(campaign.status, Campaign.Status.COMPLETED)
+        self.assertEqual(campaign.sent_count, 1)
+        self.assertEqual(
+            CampaignMessage.objects.filter(status=CampaignMessage.Status.SENT).count(),
+            1,
+        )
+
+    @override_settings(
+        COMMUNICATIONS_SMS_GATEWAY="communications.gateways.FakeSmsGateway"
+    )
+    def test_sms_campaign_uses_gateway(self):
+        """Тест SMS-рассылки через фейковый шлюз"""
+        get_sms_gateway.cache_clear()
+        self.addCleanup(get_sms_gateway.cache_clear)
+        campaign = Campaign.objects.create(
+            name="Promo", channel=Campaign.Channel.SMS, body="Привет, {{ first_name }}"
+        )
+
+        self._launch(campaign)
+
+        gateway = get_sms_gateway()
+        self.assertIsInstance(gateway, FakeSmsGateway)
+        self.assertEqual(
+            sorted(m["body"] for m in gateway.outbox),
+            ["Привет, Anna", "Привет, Ivan"],
+        )
+        self.assertEqual(campaign.sent_count, 2)
+        self.assertEqual(FakeSmsGateway().outbox, [])
+
+    @override_settings(
+        COMMUNICATIONS_SMS_GATEWAY="communications.gateways.TwilioGateway",
+        TWILIO_ACCOUNT_SID="",
+    )
+    def test_sms_batch_fails_when_gateway_is_not_configured(self):
+        """Тест SMS-рассылки: ошибка создания шлюза помечает пачку FAILED"""
+        get_sms_gateway.cache_clear()
+        self.addCleanup(get_sms_gateway.cache_clear)
+        campaign = Campaign.objects.create(
+            name="Promo", channel=Campaign.Channel.SMS, body="Привет"
+        )
+
+        self._launch(campaign)
+
+        self.assertEqual(campaign.failed_count, 2)
+        self.assertEqual(campaign.status, Campaign.Status.COMPLETED)
+        self.assertEqual(
+            set(CampaignMessage.objects.values_list("error", flat=True)),
+            {"Twilio не настроен"},
+        )
+
+    def test_email_batch_retries_when_smtp_is_down(self):
+        """Тест email-рассылки: недоступный SMTP — retry, затем FAILED по лимиту"""
+        campaign = Campaign.objects.create(
+            name="Promo", channel=Campaign.Channel.EMAIL, subject="S", body="B"
+        )
+        with mock.patch("communications.tasks.send_campaign_batch.delay") as delay:
+            CampaignService.launch(campaign)
+        connection = mock.Mock()
+        connection.open.side_effect = smtplib.SMTPServerDisconnected("refused")
+
+        with mock.patch(
+            "communications.campaigns.get_connection", return_value=connection
+        ), mock.patch.object(
+            send_campaign_batch, "retry", wraps=send_campaign_batch.retry
+        ) as retry:
+            result = send_campaign_batch.apply(args=delay.call_args.args).get()
+
+        self.assertEqual(retry.call_count, settings.CAMPAIGNS_MAX_ATTEMPTS - 1)
+        self.assertEqual(result, {"sent": 0, "failed": 1, "retry": False})
+        message = CampaignMessage.objects.get()
+        self.assertEqual(message.status, CampaignMessage.Status.FAILED)
+        self.assertEqual(message.attempts, settings.CAMPAIGNS_MAX_ATTEMPTS)
+        self.assertEqual(message.error, "refused")
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, Campaign.Status.COMPLETED)
+        self.assertEqual(campaign.failed_count, 1)
+        connection.close.assert_not_called()
+
+    def test_launch_is_claimed_once(self):
+        """Тест запуска: устаревший экземпляр не запускает рассылку повторно"""
+        campaign = Campaign.objects.create(
+            name="Promo", channel=Campaign.Channel.EMAIL, subject="S", body="B"
+        )
+        stale = Campaign.objects.get(id=campaign.id)
+
+        self._launch(campaign)
+
+        with self.assertRaisesMessage(ValueError, "Рассылка уже запущена"):
+            CampaignService.launch(stale)
+        self.assertEqual(CampaignMessage.objects.count(), 1)
@@ -0,0 +1,314 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from customers.importer import CustomerImporter, read_rows
+from customers.models import Customer
+
+User = get_user_model()
+
+
+class CustomerImportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        Customer.objects.create(
+            first_name="John",
+            last_name="Doe",
+            phone="+79991234567",
+            email="john@example.com",
+        )
+
+    def test_import_reports_duplicates_and_errors(self):
+        """Тест импорта: дубликаты по телефону/email и ошибки по строкам"""
+        content = (
+            "first_name;last_name;phone;email\n"
+            "Ivan;Petrov;8 (999) 111-22-33;ivan@example.com\n"
+            "Ivan;Petrov;+7 999 111 22 33;\n"
+            "Jane;Doe;+79991234567;\n"
+            "Jack;Doe;+79990000001;JOHN@example.com\n"
+            ";Noname;+79990000002;\n"
+            "Bad;Phone;123;\n"
+        ).encode()
+
+        report = CustomerImporter(created_by=self.user).run(
+            read_rows(io.BytesIO(content), "customers.csv")
+        )
+
+        self.assertEqual(report["total"], 6)
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["duplicates"], 3)
+        self.assertEqual(sorted(e["row"] for e in report["errors"]), [3, 4, 5, 6, 7])
+        self.assertTrue(Customer.objects.filter(phone="+79991112233").exists())
+
+    def test_import_validates_fields_per_row(self):
+        """Тест импорта: длина, справочники и email проверяются по строкам"""
+        content = (
+            "first_name;last_name;phone;email;source;preferred_channel\n"
+            f"{'x' * 51};Petrov;+79990000011;;;\n"
+            "Ivan;Petrov;+79990000012;;tv;\n"
+            "Ivan;Petrov;+79990000013;;;fax\n"
+            "Ivan;Petrov;+79990000014;not-an-email;;\n"
+            "Ivan;Petrov;+79990000015;ivan@example.com;Referral;SMS\n"
+        ).encode()
+
+        report = CustomerImporter(created_by=self.user).run(
+            read_rows(io.BytesIO(content), "customers.csv")
+        )
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual([e["row"] for e in report["errors"]], [2, 3, 4, 5])
+        customer = Customer.objects.get(phone="+79990000015")
+        self.assertEqual(customer.source, "referral")
+        self.assertEqual(customer.preferred_channel, "sms")
+
+    def test_created_counts_only_inserted_rows(self):
+        """Тест импорта: строка, занятая параллельной вставкой, не считается"""
+        importer = CustomerImporter(created_by=self.user)
+        rows = [
+            (2, Customer(first_name="Jane", last_name="Doe", phone="+79991234567")),
+            (3, Customer(first_name="Ivan", last_name="Petrov", phone="+79990000021")),
+        ]
+
+        created = importer._insert(rows)
+
+        self.assertEqual([c.phone for c in created], ["+79990000021"])
+        self.assertEqual(importer.report["duplicates"], 1)
+        self.assertEqual(importer.report["errors"][0]["row"], 2)
+
+
+class CustomerProjectionTestCase(TestCase):
+    def test_list_projections(self):
+        """Тест проекций списка клиентов: набор полей и число запросов"""
+        import jwt
+        from django.conf import settings
+        from ninja.testing import TestClient
+
+        from core.api_app import api
+
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        for index in range(3):
+            Customer.objects.create(
+                first_name="Ivan", last_name="Petrov", phone=f"+7999111220{index}"
+            )
+        token = jwt.encode(
+            {"user_id": admin.id}, settings.SECRET_KEY, algorithm="HS256"
+        )
+        client = TestClient(api)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Пользователь, COUNT пагинации и один SELECT
+        with self.assertNumQueries(3):
+            response = client.get("/customers/?projection=summary", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        items = response.json()["items"]
+        self.assertEqual(len(items), 3)
+        self.assertEqual(
+            set(items[0]),
+            {
+                "id",
+                "first_name",
+                "last_name",
+                "middle_name",
+                "phone",
+                "email",
+                "orders_count",
+            },
+        )
+        self.assertEqual(items[0]["phone"], "+79991112202")
+
+        with self.assertNumQueries(3):
+            response = client.get("/customers/?projection=full", headers=headers)
+        item = response.json()["items"][0]
+        self.assertIn("total_spent", item)
+        self.assertIn("marketing_consent", item)
+
+
+class CustomerDedupeTestCase(TestCase):
+    def test_near_duplicates_are_proposed_and_merged(self):
+        """Тест дедупликации: опечатка в фамилии + тот же email, перенос заказов"""
+        from customers.dedupe import CustomerDedupeEngine, CustomerMergeService
+        from customers.models import CustomerMergeProposal
+        from device.models import Device, DeviceBrand, DeviceModel, DeviceType
+        from orders.models import Order
+        from shops.models import Shop
+
+        primary = Customer.objects.create(
+            first_name="Ivan", last_name="Petrov", phone="+79991112233"
+        )
+        duplicate = Customer.objects.create(
+            first_name="Ivan",
+            last_name="Petrow",
+            phone="+79997776655",
+            email="ivan@example.com",
+        )
+        Customer.objects.create(
+            first_name="Ivan", last_name="Petrow", phone="+79990001122"
+        )
+        Customer.objects.filter(id=primary.id).update(email="Ivan+crm@example.com")
+        Customer.objects.create(
+            first_name="Anna", last_name="Smirnova", phone="+79995554433"
+        )
+
+        stats = CustomerDedupeEngine().run()
+        proposal = CustomerMergeProposal.objects.get(
+            primary=primary, duplicate_id=duplicate.id
+        )
+        self.assertIn("email", proposal.reasons)
+        self.assertEqual(stats["proposals"], CustomerMergeProposal.objects.count())
+
+        user = User.objects.create_user(username="u", password="p")
+        brand = DeviceBrand.objects.create(name="Apple")
+        device_type = DeviceType.objects.create(name="iPhone")
+        model = DeviceModel.objects.create(
+            brand=brand, device_type=device_type, name="X"
+        )
+        Order.objects.create(
+            shop=Shop.objects.create(name="Shop", code="S1"),
+            customer=duplicate,
+            device=Device.objects.create(model=model),
+            problem_description="Test",
+            cost_estimate=1000,
+            created_by=user,
+        )
+
+        from django.core.cache import cache
+
+        from communications.models import Campaign, CampaignMessage
+        from customers.services import CustomerOverviewService
+
+        shared, single = [
+            Campaign.objects.create(name=name, channel="email", body="Текст")
+            for name in ("Общая", "Только дубликат")
+        ]
+        for campaign, customer in [
+            (shared, primary),
+            (shared, duplicate),
+            (single, duplicate),
+        ]:
+            CampaignMessage.objects.create(
+                campaign=campaign, customer=customer, address="ivan@example.com"
+            )
+        cache.set(CustomerOverviewService.cache_key(primary.id), {"stale": True})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            merged = CustomerMergeService.merge(primary, duplicate, user=user)
+
+        self.assertFalse(Customer.objects.filter(id=duplicate.id).exists())
+        self.assertEqual(merged.orders_count, 1)
+        proposal.refresh_from_db()
+        self.assertEqual(proposal.status, CustomerMergeProposal.Status.MERGED)
+        self.assertEqual(
+            set(
+                CampaignMessage.objects.filter(customer=primary).values_list(
+                    "campaign_id", flat=True
+                )
+            ),
+            {shared.id, single.id},
+        )
+        self.assertIsNone(cache.get(CustomerOverviewService.cache_key(primary.id)))
+
+
+class CustomerOverviewTestCase(TestCase):
+    def test_overview_cache_invalidated_by_order(self):
+        """Тест карточки 360: кэш сбрасывается при появлении заказа"""
+        from django.core.cache import cache
+
+        from customers.services import CustomerOverviewService
+        from device.models import Device, DeviceBrand, DeviceModel, DeviceType
+        from orders.models import Order
+        from shops.models import Shop
+
+        cache.clear()
+        customer = Customer.objects.create(
+            first_name="John", last_name="Doe", phone="+79991234567"
+        )
+        overview = CustomerOverviewService.get_overview(customer.id)
+        self.assertEqual(overview["recent_orders"], [])
+        self.assertIsNone(overview["loyalty"])
+
+        brand = DeviceBrand.objects.create(name="Apple")
+        device_type = DeviceType.objects.create(name="iPhone")
+        model = DeviceModel.objects.create(
+            brand=brand, device_type=device_type, name="X"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(
+                shop=Shop.objects.create(name="Shop", code="S1"),
+                customer=customer,
+                device=Device.objects.create(model=model),
+                problem_description="Test",
+                cost_estimate=1000,
+                prepayment=400,
+                created_by=User.objects.create_user(username="u", password="p"),
+            )
+
+        overview = CustomerOverviewService.get_overview(customer.id)
+        self.assertEqual(len(overview["recent_orders"]), 1)
+        self.assertEqual(overview["open_balances"]["total"], 600)
+
+        # Перенос заказа сбрасывает карточки обоих клиентов
+        other = Customer.objects.create(
+            first_name="Jane", last_name="Doe", phone="+79997654321"
+        )
+        order = Order.objects.get(id=order.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.customer = other
+            order.save()
+        overview = CustomerOverviewService.get_overview(customer.id)
+        self.assertEqual(overview["recent_orders"], [])
+
+
+class CustomerSegmentationTestCase(TestCase):
+    def test_rfm_segments_are_upserted(self):
+        """Тест RFM: векторный расчет и повторный запуск без дублей"""
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from customers.models import CustomerSegment
+        from customers.segmentation import RfmSegmentation
+        from device.models import Device, DeviceBrand, DeviceModel, DeviceType
+        from orders.models import Order
+        from shops.models import Shop
+
+        user = User.objects.create_user(username="u", password="p")
+        shop = Shop.objects.create(name="Shop", code="S1")
+        brand = DeviceBrand.objects.create(name="Apple")
+        device_type = DeviceType.objects.create(name="iPhone")
+        model = DeviceModel.objects.create(
+            brand=brand, device_type=device_type, name="X"
+        )
+        device = Device.objects.create(model=model)
+
+        now = timezone.now()
+        customers = []
+        for i in range(10):
+            customer = Customer.objects.create(
+                first_name=f"C{i}", last_name="Test", phone=f"+7999000000{i}"
+            )
+            customers.append(customer)
+            for n in range(i + 1):
+                order = Order.objects.create(
+                    shop=shop,
+                    customer=customer,
+                    device=device,
+                    problem_description="Test",
+                    cost_estimate=1000 * (i + 1),
+                    created_by=user,
+                )
+                Order.objects.filter(id=order.id).update(
+                    status=Order.StatusChoices.COMPLETED,
+                    completed_at=now - timedelta(days=300 - 30 * i + n),
+                )
+
+        RfmSegmentation(now=now).run()
+        result = RfmSegmentation(now=now).run()
+
+        self.assertEqual(result["customers"], 10)
+        self.assertEqual(CustomerSegment.objects.count(), 10)
+        best = CustomerSegment.objects.get(customer=customers[-1])
+        self.assertEqual(best.segment, CustomerSegment.Segment.CHAMPIONS)
+        self.assertEqual(best.frequency, 10)
+        worst = CustomerSegment.objects.get(customer=customers[0])
+        self.assertEqual(worst.r_score, 1)
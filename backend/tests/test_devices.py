@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from customers.models import Customer
+from device.models import Device, DeviceBrand, DeviceModel, DeviceType
+from device.services import DeviceRegistry
+from orders.models import Order, RepairService
+from shops.models import Shop
+
+User = get_user_model()
+
+
+class DeviceRegistryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        self.shop = Shop.objects.create(name="Test Shop", code="TEST01")
+        self.customer = Customer.objects.create(
+            first_name="John", last_name="Doe", phone="+79991234567"
+        )
+        brand = DeviceBrand.objects.create(name="Apple")
+        device_type = DeviceType.objects.create(name="iPhone")
+        self.model = DeviceModel.objects.create(
+            brand=brand, device_type=device_type, name="iPhone 12"
+        )
+
+    def test_intake_reuses_device_by_normalized_imei(self):
+        """Тест повторной приемки: IMEI в другом формате находит то же устройство"""
+        first = DeviceRegistry.get_or_create_for_intake(
+            self.model, {"imei": "35-209900-176148-1"}
+        )
+        second = DeviceRegistry.get_or_create_for_intake(
+            self.model, {"imei": "352099001761481", "color": "Black"}
+        )
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Device.objects.count(), 1)
+        self.assertEqual(second.color, "Black")
+
+    def test_intake_rejects_imei_of_other_model(self):
+        """Тест приемки: IMEI известного устройства другой модели — конфликт"""
+        DeviceRegistry.get_or_create_for_intake(self.model, {"imei": "352099001761481"})
+        other = DeviceModel.objects.create(
+            brand=self.model.brand, device_type=self.model.device_type, name="iPhone 13"
+        )
+
+        with self.assertRaisesMessage(ValueError, "Apple iPhone 12"):
+            DeviceRegistry.get_or_create_for_intake(other, {"imei": "352099001761481"})
+        self.assertEqual(Device.objects.count(), 1)
+
+    def test_lookup_warranty_from_repair_service(self):
+        """Тест гарантии: срок берется из типовой работы модели"""
+        RepairService.objects.create(
+            code="SCREEN", name="Замена экрана", model=self.model, warranty_days=30
+        )
+        device = Device.objects.create(model=self.model, imei="352099001761481")
+        order = Order.objects.create(
+            shop=self.shop,
+            customer=self.customer,
+            device=device,
+            problem_description="Экран",
+            cost_estimate=5000,
+            created_by=self.user,
+        )
+        completed_at = timezone.now() - timezone.timedelta(days=10)
+        Order.objects.filter(id=order.id).update(completed_at=completed_at)
+
+        result = DeviceRegistry.lookup(imei="352099001761481")
+
+        self.assertTrue(result["under_warranty"])
+        self.assertEqual(
+            result["warranty_until"], completed_at + timezone.timedelta(days=30)
+        )
+
+    def test_dedupe_command_merges_orders(self):
+        """Тест команды: дубликаты объединяются, заказы переносятся"""
+        keep = Device.objects.create(model=self.model, imei="352099001761481")
+        duplicate = Device.objects.create(model=self.model, imei="352099001761481")
+        Order.objects.create(
+            shop=self.shop,
+            customer=self.customer,
+            device=duplicate,
+            problem_description="Test",
+            cost_estimate=1000,
+            created_by=self.user,
+        )
+
+        call_command("dedupe_devices", stdout=open("/dev/null", "w"))
+
+        self.assertFalse(Device.objects.filter(id=duplicate.id).exists())
+        self.assertEqual(Order.objects.get().device_id, keep.id)
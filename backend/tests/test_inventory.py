@@ -0,0 +1,54 @@
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from ninja.testing import TestClient
+
+from core.api_app import api
+from inventory.models import Category, InventoryItem
+
+User = get_user_model()
+
+
+class InventoryItemListTestCase(TestCase):
+    def setUp(self):
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        category = Category.objects.create(name="Дисплеи")
+        for index in range(3):
+            InventoryItem.objects.create(
+                name=f"Дисплей {index}",
+                sku=f"LCD-{index}",
+                item_type=InventoryItem.ItemType.COMPONENT,
+                category=category,
+                purchase_price=1000,
+                selling_price=1500,
+            )
+
+        token = jwt.encode({"user_id": admin.id}, settings.SECRET_KEY, algorithm="HS256")
+        self.client = TestClient(api)
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def test_summary_projection_skips_stock_aggregates(self):
+        """Тест узкой проекции: только поля справочника, без подсчета остатков"""
+        # Пользователь, COUNT пагинации и один SELECT
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                "/inventory/items?projection=summary", headers=self.headers
+            )
+        self.assertEqual(response.status_code, 200)
+        items = response.json()["items"]
+        self.assertEqual(len(items), 3)
+        self.assertEqual(
+            set(items[0]),
+            {"id", "name", "sku", "item_type", "category_id", "selling_price"},
+        )
+
+    def test_full_projection_keeps_stock_and_relations(self):
+        """Тест полной проекции: категория и остаток по каждому товару"""
+        response = self.client.get(
+            "/inventory/items?projection=full", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        item = response.json()["items"][0]
+        self.assertEqual(item["category_name"], "Дисплеи")
+        self.assertEqual(item["total_stock"], 0)
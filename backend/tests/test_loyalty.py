@@ -0,0 +1,396 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from customers.models import Customer
+from device.models import Device, DeviceBrand, DeviceModel, DeviceType
+from loyalty.ledger import LoyaltyLedger
+from loyalty.models import (
+    CustomerLoyalty,
+    CustomerReward,
+    LoyaltyProgram,
+    LoyaltyReward,
+    PointsBalanceCheckpoint,
+    PointsTransaction,
+)
+from loyalty.services import LoyaltyService, RewardEligibility
+from loyalty.simulation import LoyaltySimulator, SimulationConfig
+from orders.models import Order
+from shops.models import Shop
+
+User = get_user_model()
+
+
+class LoyaltyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        self.shop = Shop.objects.create(name="Test Shop", code="TEST01")
+        self.customer = Customer.objects.create(
+            first_name="John", last_name="Doe", phone="+79991234567"
+        )
+        brand = DeviceBrand.objects.create(name="Apple")
+        device_type = DeviceType.objects.create(name="iPhone")
+        model = DeviceModel.objects.create(
+            brand=brand, device_type=device_type, name="iPhone 12"
+        )
+        self.device = Device.objects.create(model=model)
+        self.program = LoyaltyProgram.objects.create(
+            name="Base", earn_rate=Decimal("5.00")
+        )
+
+    def _completed_order(self, cost):
+        order = Order.objects.create(
+            shop=self.shop,
+            customer=self.customer,
+            device=self.device,
+            problem_description="Test",
+            cost_estimate=cost,
+            created_by=self.user,
+        )
+        order.status = Order.StatusChoices.COMPLETED
+        order.final_cost = Decimal(cost)
+        return order
+
+    def test_award_points_uses_cached_program(self):
+        """Тест начисления: снимок программы из кэша, одна блокировка строки"""
+        CustomerLoyalty.objects.create(customer=self.customer, program=self.program)
+        order = self._completed_order(10000)
+        LoyaltyService.get_program_snapshot()
+
+        # 4 запроса + SAVEPOINT/RELEASE от atomic внутри тестовой транзакции
+        with self.assertNumQueries(6):
+            tx = LoyaltyService.award_points_for_order(order)
+
+        self.assertEqual(tx.points, 500)
+        loyalty = CustomerLoyalty.objects.get(customer=self.customer)
+        self.assertEqual(loyalty.available_points, 500)
+        self.assertEqual(LoyaltyService.award_points_for_order(order).id, tx.id)
+
+    def test_first_award_survives_concurrent_enrollment(self):
+        """Тест первого начисления: участие, созданное параллельно, переиспользуется"""
+        from unittest import mock
+
+        from django.db.models.query import QuerySet
+
+        order = self._completed_order(10000)
+        original_get = QuerySet.get
+        raced = []
+
+        def racing_get(queryset, *args, **kwargs):
+            # Параллельная транзакция успевает создать участие между SELECT и INSERT
+            if queryset.model is CustomerLoyalty and not raced:
+                raced.append(True)
+                CustomerLoyalty.objects.create(
+                    customer=self.customer, program=self.program
+                )
+                raise CustomerLoyalty.DoesNotExist
+            return original_get(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "get", racing_get):
+            tx = LoyaltyService.award_points_for_order(order)
+
+        self.assertEqual(tx.points, 500)
+        loyalty = CustomerLoyalty.objects.get(customer=self.customer)
+        self.assertEqual(loyalty.available_points, 500)
+
+    def test_tier_upgrade_awards_bonus_and_snapshot_invalidation(self):
+        """Тест повышения уровня и сброса снимка при изменении программы"""
+        order = self._completed_order(20000)
+        LoyaltyService.award_points_for_order(order)
+
+        loyalty = CustomerLoyalty.objects.get(customer=self.customer)
+        self.assertEqual(loyalty.tier_level, CustomerLoyalty.TierLevel.SILVER)
+        self.assertEqual(loyalty.available_points, 1000 + 500)
+        self.assertTrue(
+            PointsTransaction.objects.filter(
+                transaction_type=PointsTransaction.TransactionType.BONUS
+            ).exists()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.program.earn_rate = Decimal("10.00")
+            self.program.save()
+        self.assertEqual(LoyaltyService.get_program_snapshot().earn_rate, 10)
+
+    def test_redeem_fifo_and_set_based_expiry(self):
+        """Тест FIFO-списания по лотам и сгорания остатков"""
+        loyalty = CustomerLoyalty.objects.create(
+            customer=self.customer, program=self.program, available_points=300
+        )
+        now = timezone.now()
+        old_lot, new_lot = PointsTransaction.objects.bulk_create(
+            [
+                PointsTransaction(
+                    customer_loyalty=loyalty,
+                    transaction_type=PointsTransaction.TransactionType.EARNED,
+                    points=points,
+                    remaining_points=points,
+                    expires_at=now + timedelta(days=days),
+                )
+                for points, days in ((100, 1), (200, 30))
+            ]
+        )
+
+        LoyaltyService.redeem_points(loyalty, 150, self._completed_order(10000))
+        old_lot.refresh_from_db()
+        new_lot.refresh_from_db()
+        self.assertEqual((old_lot.remaining_points, new_lot.remaining_points), (0, 150))
+        self.assertEqual(loyalty.available_points, 150)
+
+        # Карточка 360 в кэше: сгорание сырым SQL должно ее сбросить
+        from customers.services import CustomerOverviewService
+
+        CustomerOverviewService.get_overview(self.customer.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = LoyaltyService.expire_points(now=now + timedelta(days=60))
+        self.assertEqual(stats, {"lots": 1, "customers": 1, "points": 150})
+        overview = CustomerOverviewService.get_overview(self.customer.id)
+        self.assertEqual(overview["loyalty"]["available_points"], 0)
+
+        loyalty.refresh_from_db()
+        new_lot.refresh_from_db()
+        self.assertEqual(loyalty.available_points, 0)
+        self.assertEqual((new_lot.points, new_lot.remaining_points), (200, 0))
+        expired = PointsTransaction.objects.get(
+            transaction_type=PointsTransaction.TransactionType.EXPIRED
+        )
+        self.assertEqual(expired.points, -150)
+        self.assertEqual(
+            LoyaltyService.expire_points(now=now + timedelta(days=60))["lots"], 0
+        )
+
+    def test_ledger_reconciliation_and_running_balance(self):
+        """Тест сверки счетчиков с журналом и баланса по контрольной точке"""
+        LoyaltyService.award_points_for_order(self._completed_order(10000))
+        loyalty = CustomerLoyalty.objects.get(customer=self.customer)
+        LoyaltyService.redeem_points(loyalty, 200, self._completed_order(10000))
+        CustomerLoyalty.objects.filter(id=loyalty.id).update(
+            total_points=9999, available_points=1, used_points=0
+        )
+
+        stats = LoyaltyLedger(chunk_size=1).run()
+        self.assertEqual(stats, {"customers": 1, "mismatched": 1, "checkpoints": 1})
+        loyalty.refresh_from_db()
+        self.assertEqual(
+            (loyalty.total_points, loyalty.available_points, loyalty.used_points),
+            (500, 300, 200),
+        )
+        self.assertEqual(PointsBalanceCheckpoint.objects.get().balance, 300)
+        self.assertEqual(LoyaltyLedger().run()["checkpoints"], 0)
+
+        tx = PointsTransaction.objects.create(
+            customer_loyalty=loyalty,
+            transaction_type=PointsTransaction.TransactionType.BONUS,
+            points=50,
+        )
+        with self.assertNumQueries(2):
+            LoyaltyLedger.annotate_running_balance([tx])
+        self.assertEqual(tx.balance_after, 350)
+
+    def test_legacy_expiry_is_not_debited_twice(self):
+        """Тест миграции: старое сгорание (обнуленное начисление + EXPIRED) не меняет сверку"""
+        from importlib import import_module
+
+        from django.apps import apps
+
+        migration = import_module(
+            "loyalty.migrations.0005_restore_legacy_expired_points"
+        )
+
+        # Так оставляла журнал прежняя expire_points: счетчики верны, журнал — нет
+        loyalty = CustomerLoyalty.objects.create(
+            customer=self.customer,
+            program=self.program,
+            total_points=150,
+            available_points=50,
+        )
+        earned = PointsTransaction.objects.create(
+            customer_loyalty=loyalty,
+            transaction_type=PointsTransaction.TransactionType.EARNED,
+            points=0,
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        PointsTransaction.objects.create(
+            customer_loyalty=loyalty,
+            transaction_type=PointsTransaction.TransactionType.EARNED,
+            points=50,
+            remaining_points=50,
+        )
+        PointsTransaction.objects.create(
+            customer_loyalty=loyalty,
+            transaction_type=PointsTransaction.TransactionType.EXPIRED,
+            points=-100,
+            description="Истечение срока действия баллов от "
+            f"{earned.created_at.date()}",
+        )
+
+        migration.restore_legacy_expired_points(apps, None)
+        stats = LoyaltyLedger().run()
+
+        self.assertEqual(stats["mismatched"], 0)
+        earned.refresh_from_db()
+        self.assertEqual((earned.points, earned.remaining_points), (100, 0))
+        loyalty.refresh_from_db()
+        self.assertEqual((loyalty.total_points, loyalty.available_points), (150, 50))
+
+    def test_merge_drops_stale_checkpoints(self):
+        """Тест объединения клиентов: точки баланса target сбрасываются"""
+        from customers.dedupe import CustomerMergeService
+
+        LoyaltyService.award_points_for_order(self._completed_order(10000))
+        LoyaltyLedger().run()
+        duplicate = Customer.objects.create(
+            first_name="John", last_name="Doe", phone="+79990000000"
+        )
+        source = CustomerLoyalty.objects.create(
+            customer=duplicate,
+            program=self.program,
+            total_points=70,
+            available_points=70,
+        )
+        PointsTransaction.objects.create(
+            customer_loyalty=source,
+            transaction_type=PointsTransaction.TransactionType.BONUS,
+            points=70,
+            remaining_points=70,
+        )
+
+        CustomerMergeService.merge(self.customer, duplicate)
+
+        self.assertFalse(PointsBalanceCheckpoint.objects.exists())
+        self.assertEqual(LoyaltyLedger().run()["mismatched"], 0)
+        checkpoint = PointsBalanceCheckpoint.objects.get()
+        self.assertEqual(checkpoint.balance, 570)
+
+    def test_reward_eligibility_batch_and_award_path(self):
+        """Тест выдачи наград: при начислении и ночным прогоном по новым наградам"""
+        gift = LoyaltyReward.objects.create(
+            program=self.program,
+            name="Gift",
+            reward_type=LoyaltyReward.RewardType.GIFT,
+            description="",
+            required_points=100,
+        )
+        LoyaltyService.award_points_for_order(self._completed_order(10000))
+        loyalty = CustomerLoyalty.objects.get(customer=self.customer)
+        self.assertTrue(CustomerReward.objects.filter(reward=gift).exists())
+
+        other = Customer.objects.create(
+            first_name="Jane", last_name="Roe", phone="+79997654321"
+        )
+        CustomerLoyalty.objects.create(
+            customer=other, program=self.program, total_points=5000, orders_count=3
+        )
+        self.assertEqual(RewardEligibility.evaluate_launched()["granted"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            silver = LoyaltyReward.objects.create(
+                program=self.program,
+                name="Silver discount",
+                reward_type=LoyaltyReward.RewardType.DISCOUNT,
+                description="",
+                required_points=1000,
+            )
+        # Старая награда уже выдана всем, новая — только клиенту с 5000 баллов
+        stats = RewardEligibility.evaluate_launched()
+        self.assertEqual((stats["rewards"], stats["granted"]), (1, 1))
+        self.assertFalse(
+            CustomerReward.objects.filter(
+                customer_loyalty=loyalty, reward=silver
+            ).exists()
+        )
+        self.assertEqual(RewardEligibility.evaluate_all()["granted"], 0)
+
+    def test_simulator_matches_award_replay(self):
+        """Тест симулятора: текущие параметры дают то же, что начисление по заказам"""
+        start = timezone.now() - timedelta(days=100)
+        for day, cost in enumerate((5000, 16000, 30000, 40, 9000)):
+            order = self._completed_order(cost)
+            order.save()
+            Order.objects.filter(id=order.id).update(
+                completed_at=start + timedelta(days=day)
+            )
+            LoyaltyService.award_points_for_order(order)
+        loyalty = CustomerLoyalty.objects.get(customer=self.customer)
+
+        simulator = LoyaltySimulator(years=1)
+        current = simulator.simulate(SimulationConfig.from_program(self.program))
+        self.assertEqual(
+            current["earned_points"] + current["bonus_points"], loyalty.total_points
+        )
+        self.assertEqual(current["tier_distribution"][loyalty.tier_level], 1)
+
+        # Кэш процесса: следующий расчет не читает заказы из БД
+        LoyaltySimulator._history.clear()
+        self.addCleanup(LoyaltySimulator._history.clear)
+        LoyaltySimulator(years=1, cached=True).load()
+        with self.assertNumQueries(0):
+            cached = LoyaltySimulator(years=1, cached=True)
+            cached.simulate(SimulationConfig.from_program(self.program))
+        self.assertEqual(cached.amounts.size, 5)
+
+        candidate = simulator.simulate(
+            SimulationConfig.from_program(self.program, 0.5).with_overrides(
+                earn_rate=10, tier_thresholds={"gold": 40000}
+            )
+        )
+        self.assertEqual(candidate["tier_distribution"]["gold"], 1)
+        self.assertEqual(
+            candidate["liability_points"] * 2,
+            candidate["earned_points"] + candidate["bonus_points"],
+        )
+
+
+class DuplicateRewardMigrationTestCase(TransactionTestCase):
+    def test_used_duplicate_reward_is_kept(self):
+        """Тест миграции 0004: из повторов остается использованная награда"""
+        from importlib import import_module
+
+        from django.apps import apps
+
+        migration = import_module("loyalty.migrations.0004_customer_reward_unique")
+        (constraint,) = CustomerReward._meta.constraints
+        # SQLite пересоздает таблицу по _meta: ограничение убираем и оттуда
+        with mock.patch.object(CustomerReward._meta, "constraints", []):
+            with connection.schema_editor() as editor:
+                editor.remove_constraint(CustomerReward, constraint)
+        self.addCleanup(self._restore_constraint, constraint)
+
+        program = LoyaltyProgram.objects.create(name="Base")
+        customer = Customer.objects.create(
+            first_name="John", last_name="Doe", phone="+79991234567"
+        )
+        loyalty = CustomerLoyalty.objects.create(customer=customer, program=program)
+        gift = LoyaltyReward.objects.create(
+            program=program,
+            name="Gift",
+            reward_type=LoyaltyReward.RewardType.GIFT,
+            description="",
+        )
+        CustomerReward.objects.create(customer_loyalty=loyalty, reward=gift)
+        used = CustomerReward.objects.create(
+            customer_loyalty=loyalty,
+            reward=gift,
+            is_used=True,
+            used_at=timezone.now(),
+        )
+        CustomerReward.objects.create(customer_loyalty=loyalty, reward=gift)
+
+        with self.assertLogs(migration.__name__, "WARNING") as logs:
+            migration.drop_duplicate_rewards(apps, None)
+
+        self.assertEqual(
+            list(CustomerReward.objects.values_list("id", flat=True)), [used.id]
+        )
+        self.assertIn("Удалено повторных наград клиентов: 2", logs.output[-1])
+
+    def _restore_constraint(self, constraint):
+        with connection.schema_editor() as editor:
+            editor.add_constraint(CustomerReward, constraint)
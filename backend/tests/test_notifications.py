@@ -0,0 +1,343 @@
+from datetime import datetime, time, timedelta
+from unittest import mock
+
+import jwt
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from inventory.models import Category, InventoryItem, StockBalance
+from inventory.services import InventoryService
+from notifications.consumers import NotificationConsumer
+from notifications.counters import UnreadCounter
+from notifications.digest import NotificationDigest, in_quiet_hours, seconds_until
+from notifications.live import DashboardStream
+from notifications.middleware import (
+    CONTEXT_CACHE_KEY,
+    JWTAuthMiddleware,
+    load_user_context,
+)
+from notifications.models import (
+    Notification,
+    NotificationArchive,
+    NotificationRetentionPolicy,
+    NotificationSettings,
+    NotificationType,
+)
+from notifications.retention import NotificationRetention
+from notifications.routing import websocket_urlpatterns
+from notifications.services import notification_service
+from shops.models import Shop
+from users.models import Role, UserShop
+
+User = get_user_model()
+
+
+class NotificationFanOutTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = Shop.objects.create(name="Test Shop", code="TEST01")
+        role = Role.objects.create(name="Менеджер", code=Role.RoleType.MANAGER)
+        self.users = [
+            User.objects.create_user(username=f"user{i}", password="pass", role=role)
+            for i in range(3)
+        ]
+        for user in self.users:
+            UserShop.objects.create(user=user, shop=self.shop)
+        NotificationSettings.objects.create(user=self.users[0], loyalty_updates=False)
+        NotificationType.objects.create(name="Лояльность", code="loyalty_update")
+
+    def test_batch_fan_out_filters_muted_and_publishes_once(self):
+        """Тест массовой рассылки: один INSERT, фильтр настроек, одна публикация"""
+        notification_service.get_type("loyalty_update")
+        layer = notification_service.channel_layer
+
+        with mock.patch.object(layer, "group_send") as group_send:
+            with self.captureOnCommitCallbacks(execute=True):
+                # выборка получателей с фильтром настроек + bulk INSERT
+                with self.assertNumQueries(2):
+                    notifications = notification_service.create_notifications(
+                        "loyalty_update",
+                        User.objects.filter(shops=self.shop),
+                        title="Начислены бонусные баллы",
+                        message="Тест",
+                        priority="high",
+                    )
+
+        self.assertEqual(len(notifications), 2)
+        self.assertTrue(all(n.is_sent and n.sent_at for n in notifications))
+        self.assertFalse(Notification.objects.filter(recipient=self.users[0]).exists())
+        self.assertEqual(
+            sorted(call.args[0] for call in group_send.call_args_list),
+            [f"user_{self.users[1].id}", f"user_{self.users[2].id}"],
+        )
+
+    def test_unknown_type_is_cached(self):
+        """Тест кэша типов: отсутствующий тип не запрашивается повторно"""
+        self.assertIsNone(notification_service.get_type("missing"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(notification_service.get_type("missing"))
+        self.assertEqual(
+            notification_service.create_notifications("missing", self.users, "t", "m"),
+            [],
+        )
+
+    @mock.patch("notifications.tasks.flush_notification_digest.apply_async")
+    def test_digest_schedule_failure_is_retried_by_next_event(self, apply_async):
+        """Тест дайджеста: сбой брокера логируется, следующее событие планирует снова"""
+        meta = {
+            "type": "loyalty_update",
+            "related_object_type": "customer",
+            "related_object_id": 7,
+            "recipient_id": self.users[0].id,
+        }
+        bucket = NotificationDigest.bucket_key(meta)
+        apply_async.side_effect = OSError("broker down")
+
+        with self.assertLogs("notifications.digest", "ERROR"):
+            NotificationDigest.add(meta, {"title": "t", "message": "m"})
+        self.assertIsNone(cache.get(f"{bucket}:scheduled"))
+
+        apply_async.side_effect = None
+        NotificationDigest.add(meta, {"title": "t", "message": "m"})
+        self.assertEqual(apply_async.call_count, 2)
+        self.assertEqual(cache.get(f"{bucket}:scheduled"), 1)
+
+    @mock.patch("notifications.tasks.flush_notification_digest.apply_async")
+    def test_low_priority_events_coalesce_into_digest(self, apply_async):
+        """Тест дайджеста: пачка событий по объекту — одно уведомление на адресата"""
+        NotificationSettings.objects.filter(user=self.users[0]).update(
+            loyalty_updates=True,
+            quiet_hours_start=time(0, 0),
+            quiet_hours_end=time(0, 0),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for points in (10, 20, 30):
+                notification_service.create_notifications(
+                    "loyalty_update",
+                    self.users,
+                    title="Начислены бонусные баллы",
+                    message=f"Начислено {points} баллов",
+                    priority="low",
+                    related_object_type="customer",
+                    related_object_id=7,
+                    data={"points_earned": points},
+                )
+        self.assertFalse(Notification.objects.exists())
+        # Одна запланированная доставка на корзину получателя
+        self.assertEqual(apply_async.call_count, 3)
+
+        bucket, meta = apply_async.call_args_list[0].kwargs["args"]
+        digest = NotificationDigest.flush(bucket, meta)
+        self.assertEqual(digest.data["count"], 3)
+        self.assertEqual(digest.title, "Начислены бонусные баллы (+2)")
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertIsNone(NotificationDigest.flush(bucket, meta))
+
+    def test_quiet_hours_defer_until_end(self):
+        """Тест тихих часов: интервал через полночь и отсрочка до конца"""
+        night = timezone.make_aware(datetime(2026, 1, 10, 23, 30))
+
+        self.assertTrue(in_quiet_hours(time(22, 0), time(7, 0), now=night))
+        self.assertFalse(in_quiet_hours(time(8, 0), time(20, 0), now=night))
+        self.assertEqual(seconds_until(time(7, 0), now=night), 7.5 * 3600 + 1)
+        self.assertTrue(NotificationDigest.should_buffer("high", quiet=True))
+        self.assertFalse(NotificationDigest.should_buffer("urgent", quiet=True))
+
+    def test_unread_counter_and_keyset_feed(self):
+        """Тест счетчика непрочитанных в кэше и keyset-ленты"""
+        user = self.users[1]
+        self.assertEqual(UnreadCounter.get(user.id), 0)
+        with mock.patch.object(notification_service.channel_layer, "group_send"):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(5):
+                    notification_service.create_notifications(
+                        "loyalty_update", [user], f"n{i}", "m", priority="high"
+                    )
+        with self.assertNumQueries(0):
+            self.assertEqual(UnreadCounter.get(user.id), 5)
+
+        first, cursor = notification_service.feed(user, limit=3)
+        second, last_cursor = notification_service.feed(user, cursor=cursor, limit=3)
+        self.assertEqual(
+            [n.title for n in first + second], [f"n{i}" for i in range(4, -1, -1)]
+        )
+        self.assertIsNone(last_cursor)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                notification_service.mark_read(user, [first[0].id, first[1].id]), 2
+            )
+        self.assertEqual(UnreadCounter.get(user.id), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(notification_service.mark_read(user), 3)
+        self.assertEqual(UnreadCounter.get(user.id), 0)
+
+    def test_resume_backlog_is_one_capped_frame(self):
+        """Тест догрузки при переподключении: только новее last_id, с лимитом"""
+        user = self.users[1]
+        with mock.patch.object(notification_service.channel_layer, "group_send"):
+            with self.captureOnCommitCallbacks(execute=True):
+                created = [
+                    notification_service.create_notifications(
+                        "loyalty_update", [user], f"n{i}", "m", priority="high"
+                    )[0]
+                    for i in range(5)
+                ]
+
+        backlog = notification_service.backlog(user, last_id=created[1].id, limit=2)
+        self.assertEqual([n["title"] for n in backlog["notifications"]], ["n3", "n4"])
+        self.assertTrue(backlog["has_more"])
+        self.assertEqual(backlog["last_id"], created[4].id)
+        self.assertEqual(backlog["unread_count"], 5)
+
+        backlog = notification_service.backlog(user, last_id=created[4].id)
+        self.assertEqual(backlog["notifications"], [])
+        self.assertFalse(backlog["has_more"])
+        self.assertEqual(backlog["last_id"], created[4].id)
+
+    def test_socket_connect_uses_jwt_and_cached_context(self):
+        """Тест WebSocket: JWT из query string, группы магазинов и роли без запросов"""
+        user = self.users[1]
+        token = jwt.encode({"user_id": user.id}, settings.SECRET_KEY, algorithm="HS256")
+        application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+        async def connect(query):
+            communicator = WebsocketCommunicator(
+                application, f"/ws/notifications/?{query}"
+            )
+            connected, _ = await communicator.connect()
+            frame = await communicator.receive_json_from() if connected else None
+            await communicator.disconnect()
+            return connected, frame
+
+        self.assertEqual(async_to_sync(connect)("token=broken"), (False, None))
+        connected, frame = async_to_sync(connect)(f"token={token}")
+        self.assertTrue(connected)
+        self.assertEqual(frame["type"], "backlog")
+
+        # Повторное подключение: контекст пользователя из кэша
+        with self.assertNumQueries(0):
+            context = load_user_context(user.id)
+        self.assertEqual(context.socket_shop_ids, [self.shop.id])
+        consumer = NotificationConsumer()
+        consumer.user = context
+        self.assertEqual(
+            consumer.get_group_names(),
+            [
+                f"user_{user.id}",
+                "role_manager",
+                f"shop_{self.shop.id}",
+                f"shop_{self.shop.id}_role_manager",
+            ],
+        )
+
+    def test_socket_context_cache_is_slim_and_follows_shop_access(self):
+        """Тест контекста сокета: в кэше без пароля, сброс при смене магазинов"""
+        user = self.users[1]
+        load_user_context(user.id)
+        cached = cache.get(CONTEXT_CACHE_KEY.format(user.id))
+        self.assertEqual(
+            cached,
+            {"id": user.id, "role_code": "manager", "shop_ids": [self.shop.id]},
+        )
+
+        other = Shop.objects.create(name="Other Shop", code="TEST02")
+        user.shops.add(other)
+        self.assertEqual(
+            load_user_context(user.id).socket_shop_ids,
+            sorted([self.shop.id, other.id]),
+        )
+
+        other.is_active = False
+        other.save()
+        self.assertEqual(load_user_context(user.id).socket_shop_ids, [self.shop.id])
+
+        # Обратная сторона связи: контексты всех пользователей магазина
+        self.shop.user_set.clear()
+        self.assertEqual(load_user_context(user.id).socket_shop_ids, [])
+
+    def test_retention_archives_expired_read_notifications(self):
+        """Тест сроков хранения: старые прочитанные — в сжатый архив и удаление"""
+        notification_type = NotificationType.objects.get(code="loyalty_update")
+        Notification.objects.bulk_create(
+            Notification(
+                notification_type=notification_type,
+                recipient=self.users[1],
+                title=title,
+                message="m",
+                priority=priority,
+                is_read=is_read,
+            )
+            for title, priority, is_read in (
+                ("low", "low", True),
+                ("low", "low", True),
+                ("high", "high", True),
+                ("unread", "low", False),
+            )
+        )
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=40))
+        NotificationRetentionPolicy.objects.create(priority="low", days=30)
+
+        stats = NotificationRetention(chunk_size=1).run()
+
+        self.assertEqual(stats["archived"], 2)
+        self.assertEqual(
+            sorted(Notification.objects.values_list("title", flat=True)),
+            ["high", "unread"],
+        )
+        archived = [
+            row
+            for archive in NotificationArchive.objects.all()
+            for row in archive.rows()
+        ]
+        self.assertEqual([row["title"] for row in archived], ["low", "low"])
+
+
+class DashboardStreamTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = Shop.objects.create(name="Test Shop", code="TEST01")
+        self.user = User.objects.create_user(username="storekeeper", password="pass")
+        category = Category.objects.create(name="Дисплеи")
+        item = InventoryItem.objects.create(
+            name="Дисплей",
+            sku="LCD-1",
+            item_type="part",
+            category=category,
+            purchase_price=1000,
+            selling_price=2000,
+        )
+        self.balance = StockBalance.objects.get(shop=self.shop, item=item)
+        self.balance.quantity, self.balance.min_quantity = 10, 5
+        self.balance.save()
+
+    @mock.patch("notifications.tasks.flush_dashboard_deltas.apply_async")
+    def test_events_coalesce_into_one_delta_per_window(self, apply_async):
+        """Тест дельт дашборда: события окна сливаются в одно сообщение"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for change in (-3, -4, 2):
+                InventoryService().create_movement(
+                    self.balance.id, "adjustment", change, "", self.user
+                )
+            DashboardStream.order_status_changed(self.shop.id, None, "received")
+            DashboardStream.order_status_changed(self.shop.id, "received", "ready")
+        apply_async.assert_called_once()
+
+        with mock.patch.object(
+            notification_service.channel_layer, "group_send"
+        ) as group_send:
+            delta = DashboardStream.flush(self.shop.id)
+
+        group_send.assert_called_once()
+        self.assertEqual(group_send.call_args.args[0], f"dashboard_{self.shop.id}")
+        item = delta["stock"][str(self.balance.item_id)]
+        self.assertEqual((item["quantity"], item["low_stock"]), (5, True))
+        self.assertEqual(delta["totals"], {"total_quantity": -5, "low_stock_count": 1})
+        self.assertEqual(delta["order_status_counts"], {"ready": 1})
+        self.assertIsNone(DashboardStream.flush(self.shop.id))
@@ -68,3 +68,245 @@ class OrderTestCase(TestCase):
 
         self.assertEqual(order.total_cost, 5000.00)
         self.assertEqual(order.remaining_payment, 4000.00)
+
+    def test_board_counts_and_top_rows(self):
+        """Тест доски: счетчики по всей колонке, карточки — первые N"""
+        from orders.services import OrderBoardService
+
+        for priority in ["low", "urgent", "normal"]:
+            Order.objects.create(
+                shop=self.shop,
+                customer=self.customer,
+                device=self.device,
+                problem_description="Test",
+                cost_estimate=1000.00,
+                priority=priority,
+                created_by=self.user,
+            )
+
+        board = OrderBoardService.build_board(self.shop.id, limit=2)
+        columns = {column["status"]: column for column in board["columns"]}
+
+        received = columns[Order.StatusChoices.RECEIVED]
+        self.assertEqual(received["count"], 3)
+        self.assertEqual(
+            [card["priority"] for card in received["orders"]], ["urgent", "normal"]
+        )
+        self.assertEqual(columns[Order.StatusChoices.READY]["count"], 0)
+
+    def test_sla_scan_picks_orders_inside_horizon(self):
+        """Тест сканера SLA: открытые заказы в горизонте, повтор при просрочке"""
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from notifications.models import Notification
+        from orders.services import SlaWarningService
+
+        now = timezone.now()
+        orders = []
+        for minutes, status in [
+            (30, Order.StatusChoices.IN_REPAIR),
+            (-10, Order.StatusChoices.RECEIVED),
+            (30, Order.StatusChoices.CANCELLED),
+            (600, Order.StatusChoices.RECEIVED),
+        ]:
+            orders.append(
+                Order.objects.create(
+                    shop=self.shop,
+                    customer=self.customer,
+                    device=self.device,
+                    problem_description="Test",
+                    cost_estimate=1000.00,
+                    status=status,
+                    estimated_completion=now + timedelta(minutes=minutes),
+                    assigned_to=self.user,
+                    created_by=self.user,
+                )
+            )
+        soon, overdue = orders[0], orders[1]
+        warnings = Notification.objects.filter(
+            recipient=self.user, notification_type__code="sla_warning"
+        ).order_by("id")
+
+        result = SlaWarningService._scan()
+        self.assertEqual(result, {"orders": 2, "notifications": 1})
+        self.assertEqual(warnings.count(), 1)
+        self.assertEqual(warnings[0].priority, "urgent")
+        self.assertEqual(warnings[0].data["order_ids"], [overdue.id, soon.id])
+
+        # Повторный запуск ничего не шлет
+        self.assertEqual(SlaWarningService._scan()["orders"], 0)
+
+        # Срок наступил — второе, срочное предупреждение по тому же заказу
+        Order.objects.filter(id=soon.id).update(
+            estimated_completion=now - timedelta(minutes=1)
+        )
+        self.assertEqual(SlaWarningService._scan()["orders"], 1)
+        self.assertEqual(warnings.count(), 2)
+        self.assertEqual(warnings.last().data["order_ids"], [soon.id])
+        self.assertEqual(warnings.last().priority, "urgent")
+
+        # Перенос срока сбрасывает состояние — снова «срок истекает»
+        overdue.refresh_from_db()
+        overdue.estimated_completion = now + timedelta(minutes=20)
+        overdue.save()
+        result = SlaWarningService._scan()
+        self.assertEqual(result["orders"], 1)
+        self.assertEqual(warnings.last().data["order_ids"], [overdue.id])
+        self.assertEqual(warnings.last().priority, "high")
+
+    def test_repair_service_index_suggest_and_refresh(self):
+        """Тест индекса типовых работ: подсказки без SQL и точечное обновление"""
+        from orders.models import RepairService
+        from orders.services import RepairServiceIndex
+
+        model = self.device.model
+        other_shop = Shop.objects.create(name="Other", code="TEST02")
+        with self.captureOnCommitCallbacks(execute=True):
+            RepairService.objects.create(code="A", name="Экран", model=model)
+            battery = RepairService.objects.create(
+                code="B", name="Батарея", brand=model.brand
+            )
+            RepairService.objects.create(
+                code="C", name="Чистка", device_type=model.device_type
+            )
+            RepairService.objects.create(code="D", name="Чужая", brand=None)
+        RepairServiceIndex.rebuild()
+
+        with self.assertNumQueries(0):
+            names = [s["name"] for s in RepairServiceIndex.suggest(model.id)]
+        self.assertEqual(names, ["Батарея", "Чистка", "Экран"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            battery.shops.add(other_shop)
+        names = [s["name"] for s in RepairServiceIndex.suggest(model.id, self.shop.id)]
+        self.assertEqual(names, ["Чистка", "Экран"])
+
+    def test_customer_stats_follow_order_changes(self):
+        """Тест статистики клиента: дельты при создании, переоценке и отмене"""
+        from decimal import Decimal
+
+        from django.core.management import call_command
+
+        order = Order.objects.create(
+            shop=self.shop,
+            customer=self.customer,
+            device=self.device,
+            problem_description="Test",
+            cost_estimate=Decimal("1000.00"),
+            created_by=self.user,
+        )
+        order.final_cost = Decimal("1500.00")
+        order.save(update_fields=["final_cost"])
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.orders_count, 1)
+        self.assertEqual(self.customer.total_spent, Decimal("1500.00"))
+
+        order.status = Order.StatusChoices.CANCELLED
+        order.save(update_fields=["status"])
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_spent, Decimal("0.00"))
+
+        Customer.objects.filter(id=self.customer.id).update(orders_count=7)
+        call_command("recompute_customer_stats", stdout=open("/dev/null", "w"))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.orders_count, 1)
+
+    def _api_client(self):
+        """Тестовый клиент API и заголовок авторизации администратора"""
+        import jwt
+        from django.conf import settings
+        from ninja.testing import TestClient
+
+        from core.api_app import api
+
+        admin = User.objects.create_superuser(
+            username="admin", password="adminpass123", first_name="A", last_name="B"
+        )
+        token = jwt.encode({"user_id": admin.id}, settings.SECRET_KEY, algorithm="HS256")
+        return TestClient(api), {"Authorization": f"Bearer {token}"}
+
+    def test_board_endpoint_is_routed(self):
+        """Тест API доски: /orders/board не перехватывается маршрутом заказа"""
+        client, headers = self._api_client()
+        for _ in range(3):
+            Order.objects.create(
+                shop=self.shop,
+                customer=self.customer,
+                device=self.device,
+                problem_description="Test",
+                cost_estimate=1000.00,
+                created_by=self.user,
+            )
+
+        response = client.get(
+            "/orders/board?limit=2", headers=headers, current_shop=self.shop
+        )
+
+        self.assertEqual(response.status_code, 200)
+        columns = {column["status"]: column for column in response.json()["columns"]}
+        self.assertEqual(columns[Order.StatusChoices.RECEIVED]["count"], 3)
+        self.assertEqual(len(columns[Order.StatusChoices.RECEIVED]["orders"]), 2)
+
+        response = client.get("/orders/board", headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_projections(self):
+        """Тест проекций списка заказов: набор полей и число запросов"""
+        client, headers = self._api_client()
+        for _ in range(3):
+            Order.objects.create(
+                shop=self.shop,
+                customer=self.customer,
+                device=self.device,
+                problem_description="Test",
+                cost_estimate=1000.00,
+                created_by=self.user,
+            )
+
+        expected = {
+            "summary": {
+                "id",
+                "order_number",
+                "status",
+                "customer_name",
+                "total",
+                "created_at",
+            },
+            "board": {
+                "id",
+                "order_number",
+                "status",
+                "priority",
+                "customer_name",
+                "device",
+                "assigned_to_id",
+                "cost_estimate",
+                "final_cost",
+                "estimated_completion",
+                "created_at",
+            },
+        }
+        for projection, fields in expected.items():
+            # Пользователь, COUNT пагинации и один SELECT без prefetch
+            with self.assertNumQueries(3):
+                response = client.get(
+                    f"/orders/?projection={projection}",
+                    headers=headers,
+                    current_shop=self.shop,
+                )
+            self.assertEqual(response.status_code, 200)
+            items = response.json()["items"]
+            self.assertEqual(len(items), 3)
+            self.assertEqual(set(items[0]), fields)
+
+        self.assertEqual(items[0]["customer_name"], "Doe John")
+        self.assertEqual(items[0]["device"], "Apple iPhone 12")
+
+        response = client.get(
+            "/orders/?projection=full", headers=headers, current_shop=self.shop
+        )
+        item = response.json()["items"][0]
+        self.assertEqual(item["customer"]["id"], self.customer.id)
+        self.assertIn("additional_services", item)
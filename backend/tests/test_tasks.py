@@ -0,0 +1,185 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from notifications.models import Notification, NotificationType
+from notifications.services import notification_service
+from shops.models import Shop
+from tasks.models import Task, TaskAssignee
+from tasks.services import TaskAssigneeIndex, TaskService
+from users.models import Role, UserShop
+
+User = get_user_model()
+
+
+class OverdueSweepTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        NotificationType.objects.create(name="Просрочка", code="task_overdue")
+        self.shop = Shop.objects.create(name="Test Shop", code="TEST01")
+        self.role = Role.objects.create(name="Техник", code=Role.RoleType.TECHNICIAN)
+        self.author = User.objects.create_user(username="author", password="pass")
+        self.master = User.objects.create_user(
+            username="master", password="pass", role=self.role
+        )
+        self.clerk = User.objects.create_user(username="clerk", password="pass")
+        UserShop.objects.create(user=self.clerk, shop=self.shop)
+
+    def create_task(self, title, **assignment):
+        return Task.objects.create(
+            title=title,
+            description="-",
+            created_by=self.author,
+            due_date=timezone.now() + timedelta(days=1),
+            **assignment,
+        )
+
+    def test_sweep_marks_overdue_and_notifies_in_bulk(self):
+        """Тест просрочки: один UPDATE, исполнители одним запросом, пачка уведомлений"""
+        individual = self.create_task(
+            "individual", assignment_type="individual", assigned_to=self.master
+        )
+        shop = self.create_task("shop", assignment_type="shop", assigned_shop=self.shop)
+        role = self.create_task("role", assignment_type="role", assigned_role=self.role)
+        everyone = self.create_task("all", assignment_type="all_shops")
+        later = self.create_task("later", assignment_type="all_shops")
+        Task.objects.exclude(id=later.id).update(
+            due_date=timezone.now() - timedelta(days=2)
+        )
+
+        notification_service.get_type("task_overdue")
+        with mock.patch.object(notification_service.channel_layer, "group_send"):
+            with self.captureOnCommitCallbacks(execute=True):
+                # UPDATE задач, исполнители, UPDATE исполнителей, настройки,
+                # INSERT и SAVEPOINT/RELEASE тестовой транзакции
+                with self.assertNumQueries(7):
+                    stats = TaskService().check_overdue_tasks()
+
+        self.assertEqual(stats, {"overdue": 4})
+        self.assertEqual(
+            set(Task.objects.filter(status="overdue").values_list("id", flat=True)),
+            {individual.id, shop.id, role.id, everyone.id},
+        )
+        notified = {
+            (n.related_object_id, n.recipient_id)
+            for n in Notification.objects.filter(related_object_type="task")
+        }
+        users = {self.author.id, self.master.id, self.clerk.id}
+        self.assertEqual(
+            notified,
+            {(individual.id, self.master.id), (shop.id, self.clerk.id)}
+            | {(role.id, self.master.id)}
+            | {(everyone.id, user_id) for user_id in users},
+        )
+        self.assertEqual(TaskService().check_overdue_tasks(), {"overdue": 0})
+
+    def test_assignee_rows_follow_shops_and_summary_is_one_query(self):
+        """Тест fan-out исполнителей: магазины пользователя и сводка одним запросом"""
+        shop_task = self.create_task(
+            "shop", assignment_type="shop", assigned_shop=self.shop
+        )
+        self.create_task("role", assignment_type="role", assigned_role=self.role)
+        self.assertEqual(
+            set(shop_task.assignee_rows.values_list("user_id", flat=True)),
+            {self.clerk.id},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserShop.objects.create(user=self.master, shop=self.shop)
+        with self.assertNumQueries(1):
+            summary = TaskAssigneeIndex.summary(self.master)
+        self.assertEqual(summary["total_tasks"], 2)
+        self.assertEqual(summary["status_breakdown"], {"pending": 2})
+        with self.assertNumQueries(0):
+            TaskAssigneeIndex.summary(self.master)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            shop_task.status = Task.Status.COMPLETED
+            shop_task.save()
+        summary = TaskAssigneeIndex.summary(self.master)
+        self.assertEqual(summary["status_breakdown"], {"pending": 1, "completed": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserShop.objects.filter(user=self.master).delete()
+        self.assertEqual(
+            list(
+                Task.objects.filter(assignee_rows__user=self.master).values_list(
+                    "title", flat=True
+                )
+            ),
+            ["role"],
+        )
+
+    def test_assignee_rows_follow_shop_relation_changes(self):
+        """Тест fan-out исполнителей: user.shops.add/remove и очистка магазина"""
+        self.create_task("shop", assignment_type="shop", assigned_shop=self.shop)
+
+        def shop_task_users():
+            return set(
+                Task.objects.filter(title="shop").values_list(
+                    "assignee_rows__user_id", flat=True
+                )
+            )
+
+        self.master.shops.add(self.shop)
+        self.assertEqual(shop_task_users(), {self.clerk.id, self.master.id})
+        self.master.shops.remove(self.shop)
+        self.assertEqual(shop_task_users(), {self.clerk.id})
+        self.shop.user_set.clear()
+        self.assertEqual(shop_task_users(), {None})
+
+    def test_assignee_rows_skip_inactive_shops_and_keep_assigned_to(self):
+        """Тест fan-out исполнителей: неактивный магазин и assigned_to любого типа"""
+        self.create_task("shop", assignment_type="shop", assigned_shop=self.shop)
+        # assigned_to при назначении на роль — задача исполнителя, как и раньше
+        self.create_task(
+            "role", assignment_type="role", assigned_role=None, assigned_to=self.clerk
+        )
+
+        def clerk_tasks():
+            return set(
+                Task.objects.filter(assignee_rows__user=self.clerk).values_list(
+                    "title", flat=True
+                )
+            )
+
+        self.assertEqual(clerk_tasks(), {"shop", "role"})
+        self.shop.is_active = False
+        self.shop.save()
+        self.assertEqual(clerk_tasks(), {"role"})
+        TaskAssigneeIndex.rebuild()
+        self.assertEqual(clerk_tasks(), {"role"})
+        self.shop.is_active = True
+        self.shop.save(update_fields=["is_active"])
+        self.assertEqual(clerk_tasks(), {"shop", "role"})
+
+    def test_assignee_migration_backfill_matches_index(self):
+        """Тест первичного заполнения TaskAssignee миграцией"""
+        closed = Shop.objects.create(name="Closed", code="TEST02", is_active=False)
+        UserShop.objects.create(user=self.clerk, shop=closed)
+        from importlib import import_module
+
+        from django.apps import apps
+
+        migration = import_module("tasks.migrations.0002_taskassignee")
+
+        self.create_task("shop", assignment_type="shop", assigned_shop=self.shop)
+        self.create_task("role", assignment_type="role", assigned_role=self.role)
+        self.create_task("all", assignment_type="all_shops")
+        self.create_task("mine", assignment_type="individual", assigned_to=self.clerk)
+        self.create_task(
+            "closed",
+            assignment_type="shop",
+            assigned_shop=closed,
+            assigned_to=self.master,
+        )
+        fields = ("task_id", "user_id", "status", "due_date", "priority")
+        expected = set(TaskAssignee.objects.values_list(*fields))
+
+        TaskAssignee.objects.all().delete()
+        migration.fill_task_assignees(apps, None)
+        self.assertEqual(set(TaskAssignee.objects.values_list(*fields)), expected)
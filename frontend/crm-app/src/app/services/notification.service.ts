@@ -16,6 +16,14 @@ export interface Notification {
   data?: any;
 }
 
+export interface NotificationBacklog {
+  notifications: Notification[];
+  unread_count: number;
+  has_more: boolean;
+  last_id: number | null;
+  reconnect_after_ms: number;
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -24,6 +32,9 @@ export class NotificationService {
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
   private reconnectInterval = 5000;
+  // Последнее полученное уведомление: с него сервер досылает пропущенное
+  private lastId: number | null = null;
+  private hasGap = false;
 
   private notificationsSubject = new BehaviorSubject<Notification[]>([]);
   private unreadCountSubject = new BehaviorSubject<number>(0);
@@ -43,9 +54,14 @@ export class NotificationService {
       return;
     }
 
-    const wsUrl = environment.production
+    const baseUrl = environment.production
       ? `wss://${window.location.host}/ws/notifications/`
-      : `ws://localhost:8030/ws/notifications/`;
+      : 'ws://localhost:8030/ws/notifications/';
+    const params = new URLSearchParams({ token });
+    if (this.lastId !== null) {
+      params.set('last_id', this.lastId.toString());
+    }
+    const wsUrl = `${baseUrl}?${params.toString()}`;
 
     this.socket = new WebSocket(wsUrl);
 
@@ -53,9 +69,7 @@ export class NotificationService {
       console.log('WebSocket connected');
       this.connectionStatusSubject.next(true);
       this.reconnectAttempts = 0;
-
-      // Запрашиваем количество непрочитанных уведомлений
-      this.sendMessage({ action: 'get_unread_count' });
+      // Пропущенное и счетчик непрочитанных сервер присылает кадром backlog
     };
 
     this.socket.onmessage = (event) => {
@@ -83,6 +97,10 @@ export class NotificationService {
       case 'notification':
         this.addNotification(data.notification);
         this.showBrowserNotification(data.notification);
+        this.rememberId(data.notification.id);
+        break;
+      case 'backlog':
+        this.handleBacklog(data);
         break;
       case 'unread_count':
         this.unreadCountSubject.next(data.count);
@@ -93,6 +111,30 @@ export class NotificationService {
     }
   }
 
+  private handleBacklog(backlog: NotificationBacklog): void {
+    const known = new Set(this.notificationsSubject.value.map(notification => notification.id));
+    // Сервер присылает кадр от старых к новым, в ленте новые сверху
+    const missed = backlog.notifications
+      .filter(notification => !known.has(notification.id))
+      .reverse();
+    this.notificationsSubject.next([...missed, ...this.notificationsSubject.value].slice(0, 50));
+    this.unreadCountSubject.next(backlog.unread_count);
+    if (backlog.last_id !== null) {
+      this.rememberId(backlog.last_id);
+    }
+    // has_more: история с разрывом, ленту нужно перечитать через REST
+    this.hasGap = backlog.has_more;
+    if (backlog.reconnect_after_ms) {
+      this.reconnectInterval = backlog.reconnect_after_ms;
+    }
+  }
+
+  private rememberId(notificationId: number): void {
+    if (this.lastId === null || notificationId > this.lastId) {
+      this.lastId = notificationId;
+    }
+  }
+
   private addNotification(notification: Notification): void {
     const currentNotifications = this.notificationsSubject.value;
     const updatedNotifications = [notification, ...currentNotifications].slice(0, 50); // Keep last 50
@@ -140,6 +182,14 @@ export class NotificationService {
     }
   }
 
+  public resume(): void {
+    this.sendMessage({ action: 'resume', last_id: this.lastId });
+  }
+
+  public get hasMissedNotifications(): boolean {
+    return this.hasGap;
+  }
+
   private sendMessage(message: any): void {
     if (this.socket && this.socket.readyState === WebSocket.OPEN) {
       this.socket.send(JSON.stringify(message));